@@ -15,12 +15,6 @@ Example:
 from logging import getLogger
 from typing import Optional
 from flask import Flask
-from sqlalchemy_utils import database_exists, create_database
-
-from .config import app_config
-from .routes import v1
-from .models import db
-from . import views
 
 logger = getLogger(__name__)
 
@@ -32,9 +26,29 @@ def create_app(environment: Optional[str] = "development") -> Flask:
         environment: The configuration environment to set up the
             Flask application. Default is 'development'.
 
+    Creating the application does not connect to the database: engines
+    open their first connection on the first query, and the database and
+    its tables are provisioned separately with `flask db create`.
+
     Returns:
         Flask: Configured Flask application instance.
     """
+    # Imported here so that importing the package (e.g. for `app.asgi` or
+    # `app.utils`) does not load the blueprints and every module they use.
+    # pylint: disable=import-outside-toplevel
+    from .config import app_config
+    from .routes import v1
+    from .models import db
+    from .models.routing import routing
+    from .cache import cache
+    from .metrics import metrics
+    from .admission import admission
+    from .group_commit import group_commit
+    from .profiler import profiler
+    from .search import search_index
+    from .segments import segments
+    from .cli import archive_cli, campaigns_cli, changes_cli, db_cli, stats_cli
+    from . import views
 
     app = Flask(__name__)
     app.config.from_object(app_config[environment])
@@ -44,17 +58,19 @@ def create_app(environment: Optional[str] = "development") -> Flask:
 
     logger.debug("%s configurations loaded successfully.", environment.capitalize())
 
-    db_url = app.config["SQLALCHEMY_DATABASE_URI"]
-    db_name = app.config["MYSQL_DATABASE"]
-
-    if not database_exists(db_url):
-        create_database(db_url)
-
-        logger.debug("'%s' database created successfully.", db_name)
-
+    routing.init_app(app)
     db.init_app(app)
-
-    with app.app_context():
-        db.create_all()
+    metrics.init_app(app)
+    admission.init_app(app)
+    group_commit.init_app(app)
+    profiler.init_app(app)
+    cache.init_app(app)
+    search_index.init_app(app)
+    segments.init_app(app)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(campaigns_cli)
+    app.cli.add_command(changes_cli)
+    app.cli.add_command(archive_cli)
 
     return app
@@ -0,0 +1,473 @@
+"""Admission control
+
+Module deciding, before a `v1` request is handled, whether to handle it
+now, make it wait, or turn it away, so that a burst of traffic is answered
+with fast 429 and 503 responses instead of slowing every request down
+until they all time out waiting for a database connection.
+
+Two limits are applied, in this order:
+
+* A token bucket per client (`ADMISSION_RATE` requests per second, with
+  bursts of `ADMISSION_BURST`): a client over its rate gets 429 Too Many
+  Requests, with a `Retry-After` header telling when a request would be
+  accepted again. Clients are identified by the `ADMISSION_CLIENT_HEADER`
+  header when set (e.g. an API key, or the first `X-Forwarded-For` address
+  behind a proxy), otherwise by their address.
+* A limit on the requests handled at once by the worker process
+  (`ADMISSION_MAX_CONCURRENCY`, by default the size of the primary
+  database pool plus its overflow, so admitted requests never wait for a
+  connection). Requests over the limit wait in a queue of at most
+  `ADMISSION_MAX_QUEUE` requests for up to `ADMISSION_QUEUE_TIMEOUT`
+  seconds, then get 503 Service Unavailable with a `Retry-After` header.
+
+Requests are admitted from the queue by priority: reads first, then
+single-candidate writes, then bulk operations (imports, batch writes and
+exports), which may also only use half of the slots.
+When the queue is full, a request evicts the lowest-priority request
+waiting after it, if any, rather than being turned away.
+
+Streamed responses hold their slot until the server closes them, after
+their last byte or unread (e.g. for HEAD requests), except for the change
+stream, which holds no database connection between polls. Monitoring
+routes are never limited. Each worker process admits requests on its own:
+with several workers, the limits apply per worker. Under gunicorn,
+requests beyond the threads of a worker wait in the listen backlog,
+unseen: give workers more threads than the concurrency limit, so excess
+requests wait in the priority queue instead.
+
+Decisions are counted per priority class (see `AdmissionControl.stats`),
+and exported at `/metrics` as `admitdash_admission_decisions_total`.
+
+Classes:
+    TokenBuckets: Request rate limits of the clients.
+    ConcurrencyLimiter: Limit on the requests handled at once, with a
+        priority queue.
+    AdmissionControl: Flask extension applying both to `v1` requests.
+
+Example:
+    >>> from app.admission import admission
+    >>> admission.init_app(app)
+    >>> admission.stats()
+    {'enabled': True, 'max_concurrency': 30, ...}
+"""
+
+import bisect
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+from flask import Flask, Response, current_app, g, jsonify, request
+from prometheus_client import Counter as PrometheusCounter
+from prometheus_client import Histogram
+from app.metrics import NAMESPACE
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, from the first admitted to the last.
+READ, WRITE, BULK = "read", "write", "bulk"
+PRIORITIES = {READ: 0, WRITE: 1, BULK: 2}
+
+BULK_ENDPOINTS = frozenset(
+    (
+        "v1.import_candidates_in_bulk",
+        "v1.update_candidates_in_batch",
+        "v1.delete_candidates_in_batch",
+        "v1.export_candidates",
+    )
+)
+# Rate limited, but holding no slot while streaming.
+UNSLOTTED_ENDPOINTS = frozenset(("v1.stream_candidate_changes",))
+# Never limited, so the service can be observed while it sheds load.
+EXEMPT_ENDPOINTS = frozenset(
+    (
+        "v1.get_admission_stats",
+        "v1.get_cache_stats",
+        "v1.get_db_stats",
+        "v1.get_db_profile",
+    )
+)
+
+# Admission decisions. ConcurrencyLimiter.acquire returns all but the
+# first: a request is admitted at once or after waiting, turned away
+# because the queue is full, evicted from the queue by a request of a
+# higher priority, or turned away once its wait timed out.
+RATE_LIMITED = "rate_limited"
+ADMITTED, WAITED = "admitted", "admitted_after_wait"
+QUEUE_FULL, EVICTED, TIMEOUT = "queue_full", "evicted", "timeout"
+
+ADMISSION_DECISIONS = PrometheusCounter(
+    "admission_decisions",
+    "Admission decisions on v1 requests, by priority class.",
+    ("priority", "decision"),
+    namespace=NAMESPACE,
+)
+ADMISSION_QUEUE_WAIT = Histogram(
+    "admission_queue_wait_seconds",
+    "Time requests waited in the admission queue, whether admitted or not.",
+    ("priority",),
+    namespace=NAMESPACE,
+)
+
+
+class TokenBuckets:
+    """Request rate limits of the clients.
+
+    Buckets of the least recently seen clients are dropped beyond
+    `max_clients`, which resets their limit.
+
+    Args:
+        rate: Requests per second each client is allowed on average.
+        burst: Requests a client may send at once after being idle.
+        max_clients: Maximum number of buckets kept (default is 10000).
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """Take a token from the bucket of `client`, if it has one.
+
+        Returns:
+            float: 0 if the request is allowed, otherwise the number of
+                seconds until the bucket holds a token again.
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = [self.burst, now]
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+                tokens, updated = bucket
+                bucket[0] = min(self.burst, tokens + (now - updated) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return 0.0
+            return (1 - bucket[0]) / self.rate
+
+
+class _Waiter:
+    """A request waiting for a slot."""
+
+    __slots__ = ("key", "bulk", "event", "granted", "evicted")
+
+    def __init__(self, key: tuple, bulk: bool):
+        self.key = key
+        self.bulk = bulk
+        self.event = threading.Event()
+        self.granted = False
+        self.evicted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class ConcurrencyLimiter:
+    """Limit on the requests handled at once, with a priority queue.
+
+    Args:
+        limit: Maximum number of requests holding a slot.
+        max_queue: Maximum number of requests waiting for one.
+        bulk_limit: Maximum number of bulk requests holding a slot.
+    """
+
+    def __init__(self, limit: int, max_queue: int, bulk_limit: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.bulk_limit = bulk_limit
+        self.in_flight = 0
+        self.bulk_in_flight = 0
+        self._lock = threading.Lock()
+        self._waiters: List[_Waiter] = []
+        self._order = itertools.count()
+
+    @property
+    def queued(self) -> int:
+        """Number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    def _available(self, bulk: bool) -> bool:
+        return self.in_flight < self.limit and (
+            not bulk or self.bulk_in_flight < self.bulk_limit
+        )
+
+    def _take(self, bulk: bool) -> None:
+        self.in_flight += 1
+        if bulk:
+            self.bulk_in_flight += 1
+
+    def _grant(self) -> None:
+        """Hand free slots to the first waiters that may take them."""
+        index = 0
+        while index < len(self._waiters) and self.in_flight < self.limit:
+            waiter = self._waiters[index]
+            if not self._available(waiter.bulk):
+                index += 1
+                continue
+            del self._waiters[index]
+            self._take(waiter.bulk)
+            waiter.granted = True
+            waiter.event.set()
+
+    def acquire(self, priority: int, bulk: bool, timeout: float) -> str:
+        """Take a slot, waiting for one for up to `timeout` seconds.
+
+        Args:
+            priority: Priority of the request (lower is admitted first).
+            bulk: Whether the request is a bulk operation.
+            timeout: Longest wait for a slot, in seconds.
+
+        Returns:
+            str: ADMITTED or WAITED, in which case `release` must be called
+                once the request is handled; or QUEUE_FULL, EVICTED or
+                TIMEOUT.
+        """
+        with self._lock:
+            if self._available(bulk):
+                self._take(bulk)
+                return ADMITTED
+            waiter = _Waiter((priority, next(self._order)), bulk)
+            if len(self._waiters) >= self.max_queue:
+                last = self._waiters[-1]
+                if not waiter < last:
+                    return QUEUE_FULL
+                self._waiters.pop()
+                last.evicted = True
+                last.event.set()
+            bisect.insort(self._waiters, waiter)
+
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.granted:
+                return WAITED
+            if waiter.evicted:
+                return EVICTED
+            self._waiters.remove(waiter)
+            return TIMEOUT
+
+    def release(self, bulk: bool) -> None:
+        """Give back a slot taken by `acquire`."""
+        with self._lock:
+            self.in_flight -= 1
+            if bulk:
+                self.bulk_in_flight -= 1
+            self._grant()
+
+
+class _Ticket:
+    """The slot held by an admitted request."""
+
+    __slots__ = ("limiter", "bulk", "released", "deferred")
+
+    def __init__(self, limiter: ConcurrencyLimiter, bulk: bool):
+        self.limiter = limiter
+        self.bulk = bulk
+        self.released = False
+        self.deferred = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.limiter.release(self.bulk)
+
+
+def _priority_class() -> str:
+    if request.endpoint in BULK_ENDPOINTS:
+        return BULK
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    return WRITE
+
+
+def _pool_capacity(app: Flask) -> Optional[int]:
+    """Connections the primary engine can open at once, if bounded."""
+    with app.app_context():
+        pool = db.engine.pool
+    size, overflow = getattr(pool, "size", None), getattr(pool, "_max_overflow", None)
+    if not callable(size) or overflow is None or overflow < 0:
+        return None
+    return size() + overflow
+
+
+class AdmissionControl:
+    """Flask extension applying admission control to `v1` requests.
+
+    Must be initialized after `db.init_app`, whose pool sizes the default
+    concurrency limit, and after `metrics.init_app`, so turned away
+    requests are measured too.
+
+    Settings:
+        ADMISSION_CONTROL_ENABLED: Whether to limit requests at all.
+        ADMISSION_MAX_CONCURRENCY: Requests handled at once by a worker
+            (0 for the size of the database pool plus its overflow).
+        ADMISSION_MAX_QUEUE: Requests waiting for a slot (0 for twice the
+            concurrency).
+        ADMISSION_QUEUE_TIMEOUT: Longest wait for a slot, in seconds.
+        ADMISSION_RATE: Requests per second per client (0 for no limit).
+        ADMISSION_BURST: Requests a client may send at once (0 for twice
+            the rate).
+        ADMISSION_CLIENT_HEADER: Header identifying clients.
+        ADMISSION_RETRY_AFTER: `Retry-After` of 503 responses, in seconds.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Create the limiters and register the request hooks if enabled."""
+        if not app.config.get("ADMISSION_CONTROL_ENABLED", True):
+            return
+
+        limit = int(app.config.get("ADMISSION_MAX_CONCURRENCY", 0))
+        if limit <= 0:
+            limit = _pool_capacity(app) or 32
+        max_queue = int(app.config.get("ADMISSION_MAX_QUEUE", 0)) or 2 * limit
+        rate = float(app.config.get("ADMISSION_RATE", 0))
+        burst = float(app.config.get("ADMISSION_BURST", 0)) or 2 * rate
+        app.extensions["admission"] = {
+            "limiter": ConcurrencyLimiter(limit, max_queue, max(limit // 2, 1)),
+            "buckets": TokenBuckets(rate, burst) if rate > 0 else None,
+            "queue_timeout": float(app.config.get("ADMISSION_QUEUE_TIMEOUT", 5)),
+            "client_header": app.config.get("ADMISSION_CLIENT_HEADER"),
+            "retry_after": int(app.config.get("ADMISSION_RETRY_AFTER", 1)),
+            "counters": Counter(),
+            "lock": threading.Lock(),
+        }
+        app.before_request(_admit)
+        app.after_request(_defer_release)
+        app.teardown_request(_release)
+        logger.info(
+            "Admission control: %s requests at once, %s queued", limit, max_queue
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the current application limits its requests."""
+        return "admission" in current_app.extensions
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the limits, current load and decision counters of this
+        worker.
+
+        Returns:
+            Dict[str, Any]: The limits, the requests `in_flight` and
+                `queued` now, and per priority class the number of
+                requests `admitted` (at once or after waiting), `queued`
+                (whether admitted or not) and `shed`, by reason.
+        """
+        state = current_app.extensions.get("admission")
+        if state is None:
+            return {"enabled": False}
+        limiter, buckets = state["limiter"], state["buckets"]
+        with state["lock"]:
+            counters = dict(state["counters"])
+        classes = {}
+        for name in PRIORITIES:
+            shed = {
+                reason: counters.get((name, reason), 0)
+                for reason in (RATE_LIMITED, QUEUE_FULL, EVICTED, TIMEOUT)
+            }
+            waited = counters.get((name, WAITED), 0)
+            classes[name] = {
+                "admitted": counters.get((name, ADMITTED), 0) + waited,
+                "queued": waited + shed[EVICTED] + shed[TIMEOUT],
+                "shed": shed,
+            }
+        return {
+            "enabled": True,
+            "max_concurrency": limiter.limit,
+            "max_bulk_concurrency": limiter.bulk_limit,
+            "max_queue": limiter.max_queue,
+            "queue_timeout": state["queue_timeout"],
+            "rate": buckets.rate if buckets else None,
+            "burst": buckets.burst if buckets else None,
+            "in_flight": limiter.in_flight,
+            "queued": limiter.queued,
+            "classes": classes,
+        }
+
+
+def _count(state: dict, priority: str, decision: str) -> None:
+    with state["lock"]:
+        state["counters"][(priority, decision)] += 1
+    ADMISSION_DECISIONS.labels(priority, decision).inc()
+
+
+def _client() -> str:
+    header = current_app.extensions["admission"]["client_header"]
+    if header:
+        value = request.headers.get(header)
+        if value:
+            return value.split(",")[0].strip()
+    return request.remote_addr or "unknown"
+
+
+def _shed(status: int, message: str, retry_after: float) -> Response:
+    response = jsonify({"message": message})
+    response.status_code = status
+    response.headers["Retry-After"] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+def _admit() -> Optional[Response]:
+    """Admit a `v1` request, or answer it right away."""
+    if request.blueprint != "v1" or request.endpoint in EXEMPT_ENDPOINTS:
+        return None
+    state = current_app.extensions["admission"]
+    priority = _priority_class()
+
+    buckets = state["buckets"]
+    if buckets is not None:
+        wait = buckets.take(_client())
+        if wait:
+            _count(state, priority, RATE_LIMITED)
+            return _shed(429, "Too many requests. Please slow down.", wait)
+
+    if request.endpoint in UNSLOTTED_ENDPOINTS:
+        _count(state, priority, ADMITTED)
+        return None
+
+    limiter, bulk = state["limiter"], priority == BULK
+    started = time.perf_counter()
+    decision = limiter.acquire(PRIORITIES[priority], bulk, state["queue_timeout"])
+    if decision in (WAITED, EVICTED, TIMEOUT):
+        ADMISSION_QUEUE_WAIT.labels(priority).observe(time.perf_counter() - started)
+    _count(state, priority, decision)
+    if decision in (ADMITTED, WAITED):
+        g.admission_ticket = _Ticket(limiter, bulk)
+        return None
+    return _shed(503, "Server is overloaded. Please retry later.", state["retry_after"])
+
+
+def _defer_release(response: Response) -> Response:
+    """Keep the slot of a streamed response until the server closes it.
+
+    The server closes the response once its last byte is sent, and also
+    when the body is never read (HEAD requests, 204 and 304 responses) or
+    the client disconnects.
+    """
+    ticket = g.get("admission_ticket")
+    if ticket is not None and response.is_streamed:
+        ticket.deferred = True
+        response.call_on_close(ticket.release)
+    return response
+
+
+def _release(
+    exception: Optional[BaseException],
+) -> None:  # pylint: disable=unused-argument
+    """Give back the slot of a handled request."""
+    ticket = g.get("admission_ticket")
+    if ticket is not None and not ticket.deferred:
+        ticket.release()
+
+
+admission = AdmissionControl()
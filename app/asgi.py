@@ -0,0 +1,53 @@
+"""Initialize the asyncio (ASGI) application.
+
+This module contains the factory of an alternative application serving the
+`/v1/candidates` API on an asyncio stack (Quart) with an async database
+driver, so a worker keeps serving other requests while queries are in
+flight instead of blocking a thread on each of them.
+
+It shares the configuration, models, cache and signals of the Flask
+application created by `app.create_app`. Bulk import, export and search
+are only served by the Flask application.
+
+Functions:
+    create_asgi_app: Factory function to create and configure an ASGI app
+        instance based on the specified environment.
+
+Example:
+    To serve the ASGI application with uvicorn:
+    $ uvicorn --factory app.asgi:create_asgi_app
+"""
+
+from logging import getLogger
+from typing import Optional
+from quart import Quart
+
+from .config import app_config
+from .routes import async_v1
+from .models.async_db import async_db
+from .cache import cache
+
+logger = getLogger(__name__)
+
+
+def create_asgi_app(environment: Optional[str] = "development") -> Quart:
+    """Create and configure the ASGI instance based on environment.
+
+    Args:
+        environment: The configuration environment to set up the
+            application. Default is 'development'.
+
+    Returns:
+        Quart: Configured ASGI application instance.
+    """
+    app = Quart(__name__)
+    app.config.from_object(app_config[environment])
+
+    app.register_blueprint(async_v1.blueprint, url_prefix="/v1")
+
+    logger.debug("%s configurations loaded successfully.", environment.capitalize())
+
+    async_db.init_app(app)
+    cache.init_app(app)
+
+    return app
@@ -0,0 +1,307 @@
+"""Candidate cache
+
+Module providing the read-through cache placed in front of single-candidate
+lookups.
+
+Entries are bounded both in number (least recently used entries are evicted
+first) and in age (entries expire after a TTL). The storage backend is
+selected with the `CANDIDATE_CACHE_BACKEND` setting:
+
+* 'memory' (default): an in-process LRU dictionary. Each worker process has
+  its own copy, so a write handled by one worker only invalidates that
+  worker's entry; other workers may serve the old value until it expires.
+* 'sqlite': a SQLite file shared by every worker on the host, used as a local
+  key-value store so invalidations are seen by all of them.
+* 'none': caching disabled.
+
+Entries of candidates are invalidated when the `candidate_updated` and
+`candidate_deleted` signals are received.
+
+Functions:
+    candidate_cache_key: Return the cache key of a candidate.
+
+Classes:
+    CacheStats: Hit, miss and eviction counters.
+    MemoryBackend: In-process LRU cache with TTL.
+    SQLiteBackend: Host-local cache shared between worker processes.
+    NullBackend: Backend that never stores anything.
+    CandidateCache: Flask extension exposing the configured backend.
+
+Example:
+    >>> from app.cache import cache
+    >>> cache.init_app(app)
+    >>> cache.set("candidate:1", {"id": 1})
+    >>> cache.get("candidate:1")
+    {'id': 1}
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from flask import Flask, current_app
+from app.signals import candidate_deleted, candidate_updated
+
+
+def candidate_cache_key(candidate_id: int) -> str:
+    """Return the cache key of a candidate."""
+    return f"candidate:{candidate_id}"
+
+
+class CacheStats:
+    """Hit, miss and eviction counters."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        """Return the counters as a dictionary."""
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class MemoryBackend:
+    """In-process LRU cache with TTL.
+
+    Args:
+        max_size: Maximum number of entries kept.
+        ttl: Seconds after which an entry expires.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None if absent or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting the least recently used entry."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Host-local cache shared between worker processes.
+
+    Values are stored JSON-encoded in a SQLite file opened in WAL mode, so
+    every worker on the host reads and invalidates the same entries.
+    Counters are kept per process.
+
+    Args:
+        path: Path of the SQLite file.
+        max_size: Maximum number of entries kept.
+        ttl: Seconds after which an entry expires.
+    """
+
+    # Trim the table back to `max_size` once every this many writes.
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path: str, max_size: int, ttl: float):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._local = threading.local()
+        self._writes = 0
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or getattr(self._local, "pid", None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None if absent or expired."""
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < now:
+            self.stats.misses += 1
+            return None
+        connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        self.stats.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`, evicting least recently used entries."""
+        now = time.time()
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now + self.ttl, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICTION_INTERVAL == 0:
+            self._evict(connection, now)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        connection.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        excess = len(self) - self.max_size
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            self.stats.evictions += excess
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        self._connection().execute("DELETE FROM cache")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class NullBackend:
+    """Backend that never stores anything."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    # pylint: disable=unused-argument
+    def get(self, key: str) -> None:
+        """Always miss."""
+        self.stats.misses += 1
+
+    def set(self, key: str, value: Any) -> None:
+        """Discard the value."""
+
+    def delete(self, key: str) -> None:
+        """Nothing to remove."""
+
+    def clear(self) -> None:
+        """Nothing to remove."""
+
+    def __len__(self) -> int:
+        return 0
+
+
+class CandidateCache:
+    """Flask extension exposing the configured cache backend.
+
+    Settings:
+        CANDIDATE_CACHE_BACKEND: 'memory', 'sqlite' or 'none'.
+        CANDIDATE_CACHE_MAX_SIZE: Maximum number of cached entries.
+        CANDIDATE_CACHE_TTL: Seconds after which an entry expires.
+        CANDIDATE_CACHE_PATH: SQLite file used by the 'sqlite' backend.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Create the configured backend for `app`."""
+        name = app.config.get("CANDIDATE_CACHE_BACKEND", "memory")
+        max_size = int(app.config.get("CANDIDATE_CACHE_MAX_SIZE", 10000))
+        ttl = float(app.config.get("CANDIDATE_CACHE_TTL", 300))
+
+        if name == "memory":
+            backend = MemoryBackend(max_size, ttl)
+        elif name == "sqlite":
+            path = app.config.get("CANDIDATE_CACHE_PATH") or os.path.join(
+                tempfile.gettempdir(), "admitdash-candidate-cache.db"
+            )
+            backend = SQLiteBackend(path, max_size, ttl)
+        elif name == "none":
+            backend = NullBackend()
+        else:
+            raise ValueError(f"Unknown CANDIDATE_CACHE_BACKEND: '{name}'")
+
+        app.extensions["candidate_cache"] = backend
+
+    @property
+    def backend(self):
+        """The backend of the current application."""
+        return current_app.extensions["candidate_cache"]
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the current application caches anything."""
+        return not isinstance(self.backend, NullBackend)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for `key`, or None on a miss."""
+        return self.backend.get(key)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store `value` under `key`."""
+        self.backend.set(key, value)
+
+    def delete(self, key: str) -> None:
+        """Remove `key` from the cache."""
+        self.backend.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the counters and current size of the cache."""
+        backend = self.backend
+        return {
+            "backend": current_app.config.get("CANDIDATE_CACHE_BACKEND", "memory"),
+            "size": len(backend),
+            **backend.stats.to_dict(),
+        }
+
+
+cache = CandidateCache()
+
+
+# pylint: disable=unused-argument
+@candidate_updated.connect
+@candidate_deleted.connect
+def _invalidate_candidate(app: Flask, candidate: dict, **extra) -> None:
+    """Drop the cached copy of a candidate that was written."""
+    backend = app.extensions.get("candidate_cache")
+    if backend is not None:
+        backend.delete(candidate_cache_key(candidate["id"]))
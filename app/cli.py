@@ -0,0 +1,198 @@
+"""Command line interface
+
+Module defining the `flask` CLI commands of the application.
+
+Commands:
+    flask db create: Create the database and the tables that do not exist
+        yet.
+    flask db upgrade: Add the columns and indexes missing from existing
+        tables (e.g. after upgrading the application), and create missing
+        tables.
+    flask stats reconcile: Recompute the materialized candidate statistics
+        and repair (or only report) drift, once or periodically.
+    flask campaigns queue: Render and queue the messages of a campaign.
+    flask campaigns dispatch: Send queued campaign messages over SMTP.
+    flask changes purge: Delete the tombstones of long-deleted candidates.
+    flask archive run: Move the candidates of past intakes to the archive.
+
+Example:
+    $ flask --app "app:create_app()" db create
+    $ flask --app "app:create_app()" db upgrade
+    $ flask --app "app:create_app()" stats reconcile --every 3600
+    $ flask --app "app:create_app()" campaigns dispatch --workers 16
+"""
+
+import json
+import signal
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import make_url
+from werkzeug.exceptions import HTTPException
+from app.dispatcher import CampaignDispatcher
+from app.handlers.archive import archive_candidates
+from app.handlers.campaigns import queue_campaign
+from app.handlers.changes import purge_tombstones
+from app.handlers.stats import reconcile_stats
+from app.models import db
+from app.models.schema import seed_collection_versions, upgrade_schema
+from app.models.stats import CandidateStat
+
+db_cli = AppGroup("db", help="Provision the database.")
+
+
+@db_cli.command("create")
+def create_database_command():
+    """Create the database and the tables that do not exist yet.
+
+    Existing tables are left untouched, so the command is safe to run on
+    every deployment, before the application servers start.
+    """
+    # Only needed here: keep it out of the application's import time.
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy_utils import create_database, database_exists
+
+    url = current_app.config["SQLALCHEMY_DATABASE_URI"]
+    if not database_exists(url):
+        create_database(url)
+        click.echo(f"Database '{make_url(url).database}' created.")
+
+    db.create_all()
+    seed_collection_versions()
+    click.echo("Tables created.")
+
+
+@db_cli.command("upgrade")
+def upgrade_database_command():
+    """Bring the tables of an existing database up to date.
+
+    Creates the missing tables, and adds the columns and indexes that were
+    added to the models of existing tables (which `flask db create` leaves
+    untouched). Safe to run on every deployment, before the application
+    servers start: an up-to-date database is not changed.
+    """
+    changes = upgrade_schema()
+    for change in changes:
+        click.echo(change)
+    click.echo(f"Schema up to date ({len(changes)} changes made).")
+    if f"CREATE TABLE {CandidateStat.__tablename__}" in changes:
+        # The existing candidates are not counted in the new statistics.
+        reconcile_stats(fix=True)
+        click.echo("Candidate statistics built.")
+
+
+stats_cli = AppGroup("stats", help="Manage the materialized candidate statistics.")
+
+
+@stats_cli.command("reconcile")
+@click.option("--dry-run", is_flag=True, help="Report drift without fixing it.")
+@click.option(
+    "--every",
+    type=click.FloatRange(min=1),
+    help="Keep running and reconcile every N seconds.",
+)
+def reconcile_stats_command(dry_run: bool, every: float):
+    """Rebuild the candidate statistics from scratch and report drift.
+
+    Prints one JSON report per run. A single dry run exits with status 1
+    when drift is found, so it can be used as a monitoring check.
+    """
+    while True:
+        report = reconcile_stats(fix=not dry_run)
+        click.echo(json.dumps(report))
+        if every is None:
+            break
+        time.sleep(every)
+
+    if dry_run and report["drift"]:
+        raise SystemExit(1)
+
+
+campaigns_cli = AppGroup("campaigns", help="Queue and send email campaigns.")
+
+
+@campaigns_cli.command("queue")
+@click.argument("campaign_id", type=int)
+def queue_campaign_command(campaign_id: int):
+    """Render and queue a message for every candidate of the audience."""
+    try:
+        report = queue_campaign(
+            campaign_id,
+            batch_size=current_app.config["CAMPAIGN_QUEUE_BATCH_SIZE"],
+            lease_seconds=current_app.config["CAMPAIGN_LEASE_SECONDS"],
+        )
+    except HTTPException as e:
+        raise click.ClickException(e.description) from e
+    click.echo(json.dumps(report))
+
+
+@campaigns_cli.command("dispatch")
+@click.option("--once", is_flag=True, help="Exit once no message is due.")
+@click.option("--workers", type=click.IntRange(min=1), help="SMTP connections.")
+@click.option("--batch-size", type=click.IntRange(min=1), help="Messages per claim.")
+def dispatch_campaigns_command(once: bool, workers: int, batch_size: int):
+    """Send queued campaign messages over SMTP.
+
+    Runs until interrupted (finishing the current batch on SIGINT or
+    SIGTERM), then prints the number of messages per outcome. Several
+    dispatchers may run at once, on one or more hosts.
+    """
+    overrides = {"workers": workers, "batch_size": batch_size}
+    dispatcher = CampaignDispatcher.from_config(
+        current_app.config,
+        **{name: value for name, value in overrides.items() if value is not None},
+    )
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: dispatcher.stop())
+    click.echo(json.dumps(dispatcher.run(once=once)))
+
+
+changes_cli = AppGroup("changes", help="Manage the candidate change feed.")
+
+
+@changes_cli.command("purge")
+@click.option(
+    "--days",
+    type=click.FloatRange(min=0),
+    help="Keep tombstones this many days (default: CHANGE_FEED_TOMBSTONE_DAYS).",
+)
+def purge_tombstones_command(days: float):
+    """Delete the tombstones of candidates deleted long ago.
+
+    Syncing clients whose change token predates the purged tombstones are
+    asked to sync from scratch. Meant to run daily, e.g. from cron.
+    """
+    if days is None:
+        days = current_app.config["CHANGE_FEED_TOMBSTONE_DAYS"]
+    try:
+        report = purge_tombstones(days)
+    except HTTPException as e:
+        raise click.ClickException(e.description) from e
+    click.echo(json.dumps(report))
+
+
+archive_cli = AppGroup("archive", help="Manage the candidate archive.")
+
+
+@archive_cli.command("run")
+@click.option(
+    "--days",
+    type=click.FloatRange(min=0),
+    help="Archive candidates older than this (default: ARCHIVE_AFTER_DAYS).",
+)
+@click.option("--chunk-size", type=click.IntRange(min=1), help="Candidates per chunk.")
+def archive_candidates_command(days: float, chunk_size: int):
+    """Move the candidates created and last updated long ago to the archive.
+
+    Candidates are moved in chunks of one transaction each, so the command
+    can be interrupted and run again. Meant to run daily, e.g. from cron.
+    """
+    try:
+        report = archive_candidates(
+            current_app.config["ARCHIVE_AFTER_DAYS"] if days is None else days,
+            chunk_size=chunk_size or current_app.config["ARCHIVE_CHUNK_SIZE"],
+        )
+    except HTTPException as e:
+        raise click.ClickException(e.description) from e
+    click.echo(json.dumps(report))
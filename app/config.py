@@ -17,14 +17,162 @@ class BaseConfig:
     MYSQL_USER = get_config("MYSQL_USER", required=True)
     MYSQL_PASSWORD = get_config("MYSQL_PASSWORD", required=True)
     MYSQL_HOST = get_config("MYSQL_HOST", required=True)
-    SQLALCHEMY_DATABASE_URI = (
-        f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}"
+    SQLALCHEMY_DATABASE_URI = get_config(
+        "DATABASE_URL",
+        default_value=(
+            f"mysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}/{MYSQL_DATABASE}"
+        ),
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_POOL_PRE_PING = get_config("DATABASE_POOL_PRE_PING", default_value="true")
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(get_config("DATABASE_POOL_SIZE", default_value="10")),
+        "max_overflow": int(get_config("DATABASE_MAX_OVERFLOW", default_value="20")),
+        "pool_timeout": float(get_config("DATABASE_POOL_TIMEOUT", default_value="30")),
+        "pool_recycle": int(get_config("DATABASE_POOL_RECYCLE", default_value="3600")),
+        "pool_pre_ping": DATABASE_POOL_PRE_PING.lower() == "true",
+    }
+    SQLALCHEMY_REPLICA_URIS = [
+        url.strip()
+        for url in get_config("DATABASE_REPLICA_URLS", default_value="").split(",")
+        if url.strip()
+    ]
+    REPLICA_STICKY_SECONDS = float(
+        get_config("REPLICA_STICKY_SECONDS", default_value="5")
+    )
+    ASYNC_DATABASE_URL = get_config("ASYNC_DATABASE_URL")
+    ASYNC_DATABASE_POOL_SIZE = int(
+        get_config("ASYNC_DATABASE_POOL_SIZE", default_value="20")
+    )
+    ASYNC_DATABASE_MAX_OVERFLOW = int(
+        get_config("ASYNC_DATABASE_MAX_OVERFLOW", default_value="10")
+    )
     SECRET_KEY = get_config(
         "SECRET_KEY", default_value=generate_md5_hash(generate_random_string(15))
     )
     SESSION_COOKIE_HTTPONLY = True
+    BULK_IMPORT_BATCH_SIZE = int(
+        get_config("BULK_IMPORT_BATCH_SIZE", default_value="1000")
+    )
+    BULK_IMPORT_MAX_ERRORS = int(
+        get_config("BULK_IMPORT_MAX_ERRORS", default_value="1000")
+    )
+    BATCH_WRITE_CHUNK_SIZE = int(
+        get_config("BATCH_WRITE_CHUNK_SIZE", default_value="1000")
+    )
+    JSON_ENCODER = get_config("JSON_ENCODER", default_value="auto")
+    EXPORT_CHUNK_SIZE = int(get_config("EXPORT_CHUNK_SIZE", default_value="1000"))
+    CANDIDATE_CACHE_BACKEND = get_config(
+        "CANDIDATE_CACHE_BACKEND", default_value="memory"
+    )
+    CANDIDATE_CACHE_MAX_SIZE = int(
+        get_config("CANDIDATE_CACHE_MAX_SIZE", default_value="10000")
+    )
+    CANDIDATE_CACHE_TTL = float(get_config("CANDIDATE_CACHE_TTL", default_value="300"))
+    CANDIDATE_CACHE_PATH = get_config("CANDIDATE_CACHE_PATH")
+    SEARCH_INDEX_PATH = get_config("SEARCH_INDEX_PATH")
+    CHANGE_FEED_POLL_SECONDS = float(
+        get_config("CHANGE_FEED_POLL_SECONDS", default_value="1")
+    )
+    CHANGE_FEED_STREAM_SECONDS = float(
+        get_config("CHANGE_FEED_STREAM_SECONDS", default_value="300")
+    )
+    CHANGE_FEED_TOMBSTONE_DAYS = float(
+        get_config("CHANGE_FEED_TOMBSTONE_DAYS", default_value="30")
+    )
+    ADMISSION_CONTROL_ENABLED = (
+        get_config("ADMISSION_CONTROL_ENABLED", default_value="true").lower() == "true"
+    )
+    ADMISSION_MAX_CONCURRENCY = int(
+        get_config("ADMISSION_MAX_CONCURRENCY", default_value="0")
+    )
+    ADMISSION_MAX_QUEUE = int(get_config("ADMISSION_MAX_QUEUE", default_value="0"))
+    ADMISSION_QUEUE_TIMEOUT = float(
+        get_config("ADMISSION_QUEUE_TIMEOUT", default_value="5")
+    )
+    ADMISSION_RATE = float(get_config("ADMISSION_RATE", default_value="0"))
+    ADMISSION_BURST = float(get_config("ADMISSION_BURST", default_value="0"))
+    ADMISSION_CLIENT_HEADER = get_config("ADMISSION_CLIENT_HEADER")
+    ADMISSION_RETRY_AFTER = int(get_config("ADMISSION_RETRY_AFTER", default_value="1"))
+    CANDIDATE_GROUP_COMMIT = (
+        get_config("CANDIDATE_GROUP_COMMIT", default_value="false").lower() == "true"
+    )
+    GROUP_COMMIT_MAX_ROWS = int(
+        get_config("GROUP_COMMIT_MAX_ROWS", default_value="100")
+    )
+    GROUP_COMMIT_MAX_DELAY_MS = float(
+        get_config("GROUP_COMMIT_MAX_DELAY_MS", default_value="2")
+    )
+    GROUP_COMMIT_DURABILITY = get_config(
+        "GROUP_COMMIT_DURABILITY", default_value="full"
+    )
+    GROUP_COMMIT_TIMEOUT = float(get_config("GROUP_COMMIT_TIMEOUT", default_value="30"))
+    ARCHIVE_AFTER_DAYS = float(get_config("ARCHIVE_AFTER_DAYS", default_value="365"))
+    ARCHIVE_CHUNK_SIZE = int(get_config("ARCHIVE_CHUNK_SIZE", default_value="1000"))
+    IDEMPOTENCY_KEY_TTL = float(
+        get_config("IDEMPOTENCY_KEY_TTL", default_value="86400")
+    )
+    SEARCH_INDEX_REFRESH_SECONDS = float(
+        get_config("SEARCH_INDEX_REFRESH_SECONDS", default_value="5")
+    )
+    ADMIN_TOKEN = get_config("ADMIN_TOKEN")
+    SQL_PROFILER_ENABLED = (
+        get_config("SQL_PROFILER_ENABLED", default_value="false").lower() == "true"
+    )
+    SQL_PROFILER_SLOW_MS = float(
+        get_config("SQL_PROFILER_SLOW_MS", default_value="100")
+    )
+    SQL_PROFILER_N_PLUS_ONE_THRESHOLD = int(
+        get_config("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", default_value="5")
+    )
+    SQL_PROFILER_BUFFER_SIZE = int(
+        get_config("SQL_PROFILER_BUFFER_SIZE", default_value="100")
+    )
+    SEGMENT_REFRESH_SECONDS = float(
+        get_config("SEGMENT_REFRESH_SECONDS", default_value="5")
+    )
+    SEGMENT_REBUILD_SECONDS = float(
+        get_config("SEGMENT_REBUILD_SECONDS", default_value="600")
+    )
+    SMTP_HOST = get_config("SMTP_HOST", default_value="localhost")
+    SMTP_PORT = int(get_config("SMTP_PORT", default_value="25"))
+    SMTP_USERNAME = get_config("SMTP_USERNAME")
+    SMTP_PASSWORD = get_config("SMTP_PASSWORD")
+    SMTP_USE_TLS = get_config("SMTP_USE_TLS", default_value="false").lower() == "true"
+    SMTP_TIMEOUT = float(get_config("SMTP_TIMEOUT", default_value="30"))
+    SMTP_MESSAGES_PER_CONNECTION = int(
+        get_config("SMTP_MESSAGES_PER_CONNECTION", default_value="1000")
+    )
+    CAMPAIGN_SENDER = get_config("CAMPAIGN_SENDER", default_value="noreply@localhost")
+    CAMPAIGN_QUEUE_BATCH_SIZE = int(
+        get_config("CAMPAIGN_QUEUE_BATCH_SIZE", default_value="1000")
+    )
+    CAMPAIGN_WORKERS = int(get_config("CAMPAIGN_WORKERS", default_value="8"))
+    CAMPAIGN_BATCH_SIZE = int(get_config("CAMPAIGN_BATCH_SIZE", default_value="500"))
+    CAMPAIGN_MAX_ATTEMPTS = int(get_config("CAMPAIGN_MAX_ATTEMPTS", default_value="5"))
+    CAMPAIGN_RETRY_BASE_SECONDS = float(
+        get_config("CAMPAIGN_RETRY_BASE_SECONDS", default_value="60")
+    )
+    CAMPAIGN_RETRY_MAX_SECONDS = float(
+        get_config("CAMPAIGN_RETRY_MAX_SECONDS", default_value="3600")
+    )
+    CAMPAIGN_LEASE_SECONDS = float(
+        get_config("CAMPAIGN_LEASE_SECONDS", default_value="300")
+    )
+    CAMPAIGN_POLL_SECONDS = float(
+        get_config("CAMPAIGN_POLL_SECONDS", default_value="5")
+    )
+    # Messages per second per recipient domain (0 for no limit), and
+    # overrides as 'domain=rate,...'.
+    CAMPAIGN_DOMAIN_RATE = float(get_config("CAMPAIGN_DOMAIN_RATE", default_value="0"))
+    CAMPAIGN_DOMAIN_RATES = {
+        domain.strip().lower(): float(rate)
+        for domain, _, rate in (
+            item.partition("=")
+            for item in get_config("CAMPAIGN_DOMAIN_RATES", default_value="").split(",")
+            if item.strip()
+        )
+    }
 
 
 # pylint: disable=too-few-public-methods
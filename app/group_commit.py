@@ -0,0 +1,277 @@
+"""Group commit
+
+Module coalescing the candidates created by concurrent requests into
+shared transactions, so that a burst of sign-ups costs one commit (and one
+log flush on the database server) per group of candidates rather than one
+per candidate.
+
+When `CANDIDATE_GROUP_COMMIT` is set, `create_candidate` hands the
+candidate to the worker process's `GroupCommitter` and waits. A committer
+thread collects the submitted candidates until `GROUP_COMMIT_MAX_ROWS` are
+waiting or the oldest has waited `GROUP_COMMIT_MAX_DELAY_MS`, then creates
+them with `create_candidates_together`, in one transaction, and hands each
+request its own outcome: the created candidate, or a Conflict if its email
+is taken. A request is only answered once its candidate is committed.
+
+`GROUP_COMMIT_DURABILITY` sets how committed transactions are written:
+
+* 'full' (default): as configured on the database server, using the
+  application's connection pool.
+* 'relaxed': the committer uses a connection of its own whose commits do
+  not wait for the transaction log to reach the disk, where the database
+  allows it per connection (SQLite: `synchronous=OFF`; PostgreSQL:
+  `synchronous_commit=off`). A crash of the database host may then lose
+  the last committed groups, although their requests were answered.
+  MySQL only has a server-wide setting (`innodb_flush_log_at_trx_commit`),
+  so 'relaxed' behaves as 'full' there.
+
+Classes:
+    GroupCommitter: Collects candidates and creates them in groups.
+    GroupCommit: Flask extension installing a committer.
+
+Example:
+    >>> from app.group_commit import group_commit
+    >>> group_commit.init_app(app)
+    >>> with app.app_context():
+    ...     create_candidate('John', 'Doe', 'john@example.com', 30)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from werkzeug.exceptions import HTTPException, InternalServerError
+from flask import Flask
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.handlers.candidates import create_candidates_together
+from app.handlers.idempotency import IdempotentRequest
+from app.models import db
+from app.models.candidates import Candidate
+
+logger = logging.getLogger(__name__)
+
+DURABILITIES = ("full", "relaxed")
+
+# Statements making the commits of a connection skip the log flush, by
+# dialect.
+RELAXED_DURABILITY_STATEMENTS = {
+    "sqlite": "PRAGMA synchronous = OFF",
+    "postgresql": "SET synchronous_commit TO off",
+}
+
+
+class _Pending:
+    """A candidate waiting to be created."""
+
+    __slots__ = ("fields", "idempotency", "submitted", "done", "result")
+
+    def __init__(self, fields: Dict[str, Any], idempotency):
+        self.fields = fields
+        self.idempotency = idempotency
+        self.submitted = time.monotonic()
+        self.done = threading.Event()
+        self.result: Any = None
+
+
+def _relaxed_engine(engine: Engine) -> Optional[Engine]:
+    """Return an engine like `engine` committing without a log flush."""
+    statement = RELAXED_DURABILITY_STATEMENTS.get(engine.dialect.name)
+    if statement is None or engine.url.database in (None, "", ":memory:"):
+        return None
+    relaxed = create_engine(engine.url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+
+    @event.listens_for(relaxed, "connect")
+    def _relax(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(statement)
+        cursor.close()
+
+    return relaxed
+
+
+class GroupCommitter:
+    """Collects candidates and creates them in groups.
+
+    The committer thread is started by the first submission of each
+    process, so a committer created before the server forks its workers
+    serves each of them.
+
+    Args:
+        app: The application to create candidates for.
+        max_rows: Largest number of candidates created per transaction.
+        max_delay: Longest time a candidate waits for others, in seconds.
+        timeout: Longest time a request waits for its candidate, in
+            seconds.
+        engine: Engine to create candidates with (default is the
+            application's Flask-SQLAlchemy session).
+    """
+
+    def __init__(
+        self,
+        app: Flask,
+        max_rows: int = 100,
+        max_delay: float = 0.002,
+        timeout: float = 30.0,
+        engine: Optional[Engine] = None,
+    ):
+        self.app = app
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.engine = engine
+        self.stats = {"groups": 0, "candidates": 0, "largest_group": 0}
+        self._pid = None
+        self._condition = threading.Condition()
+        self._pending: List[_Pending] = []
+
+    def submit(
+        self, fields: Dict[str, Any], idempotency: Optional[IdempotentRequest] = None
+    ) -> Candidate:
+        """Create a candidate with the next group, and wait for it.
+
+        Args:
+            fields: The fields of the candidate.
+            idempotency: Idempotency key of the request, whose response is
+                recorded in the same transaction (default is None).
+
+        A candidate still waiting for its group after `timeout` seconds is
+        withdrawn, and never created. One whose group is already being
+        created is answered with the outcome of that transaction, however
+        long it takes, so a committed candidate is never reported as
+        failed.
+
+        Raises:
+            Conflict: If a candidate with the same email already exists.
+            InternalServerError: If the group could not be created, or the
+                candidate was withdrawn.
+
+        Returns:
+            Candidate: The created candidate, detached from any session.
+        """
+        pending = _Pending(fields, idempotency)
+        with self._condition:
+            if self._pid != os.getpid():
+                self._start()
+            self._pending.append(pending)
+            self._condition.notify()
+        if not pending.done.wait(self.timeout):
+            with self._condition:
+                withdrawn = pending in self._pending
+                if withdrawn:
+                    self._pending.remove(pending)
+            if withdrawn:
+                logger.error("Candidate not created within %ss", self.timeout)
+                raise InternalServerError(
+                    description="Error creating candidate. Please try again later."
+                )
+            # Already taken by the committer: its transaction decides.
+            logger.warning(
+                "Candidate not created within %ss, waiting for its group", self.timeout
+            )
+            pending.done.wait()
+        if isinstance(pending.result, HTTPException):
+            raise pending.result
+        return pending.result
+
+    def _start(self) -> None:
+        """Start the committer thread of this process."""
+        self._pid = os.getpid()
+        # Candidates submitted in the parent process are not ours to create.
+        self._pending = []
+        if self.engine is not None:
+            self.engine.dispose(close=False)
+        threading.Thread(
+            target=self._run, name="candidate-group-commit", daemon=True
+        ).start()
+
+    def _next_group(self) -> List[_Pending]:
+        """Wait for the next group of candidates to create."""
+        with self._condition:
+            while not self._pending:
+                self._condition.wait()
+            deadline = self._pending[0].submitted + self.max_delay
+            while len(self._pending) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            group = self._pending[: self.max_rows]
+            del self._pending[: self.max_rows]
+            return group
+
+    def _run(self) -> None:
+        while True:
+            group = self._next_group()
+            try:
+                results = self._create(group)
+            except HTTPException as e:
+                results = [type(e)(description=e.description) for _ in group]
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception("Error creating a group of candidates")
+                results = [
+                    InternalServerError(
+                        description="Error creating candidate. Please try again later."
+                    )
+                    for _ in group
+                ]
+            for pending, result in zip(group, results):
+                pending.result = result
+                pending.done.set()
+
+    def _create(self, group: List[_Pending]) -> List[Any]:
+        with self.app.app_context():
+            items = [(pending.fields, pending.idempotency) for pending in group]
+            if self.engine is None:
+                results = create_candidates_together(items)
+            else:
+                with Session(self.engine) as session:
+                    results = create_candidates_together(items, session)
+        self.stats["groups"] += 1
+        self.stats["candidates"] += len(group)
+        self.stats["largest_group"] = max(self.stats["largest_group"], len(group))
+        return results
+
+
+class GroupCommit:
+    """Flask extension creating candidates in groups when enabled.
+
+    Must be initialized after `db.init_app`.
+
+    Settings:
+        CANDIDATE_GROUP_COMMIT: Whether to create candidates in groups.
+        GROUP_COMMIT_MAX_ROWS: Largest number of candidates per group.
+        GROUP_COMMIT_MAX_DELAY_MS: Longest wait for other candidates.
+        GROUP_COMMIT_DURABILITY: 'full' or 'relaxed' (see above).
+        GROUP_COMMIT_TIMEOUT: Longest wait of a request for its candidate.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Install the group committer of `app` if enabled."""
+        if not app.config.get("CANDIDATE_GROUP_COMMIT", False):
+            return
+
+        durability = app.config.get("GROUP_COMMIT_DURABILITY", "full")
+        if durability not in DURABILITIES:
+            raise ValueError(f"Unknown GROUP_COMMIT_DURABILITY: {durability!r}")
+        engine = None
+        if durability == "relaxed":
+            with app.app_context():
+                engine = _relaxed_engine(db.engine)
+            if engine is None:
+                logger.warning(
+                    "Relaxed durability cannot be set per connection on this "
+                    "database: candidates are committed with full durability."
+                )
+        app.extensions["candidate_group_commit"] = GroupCommitter(
+            app,
+            max_rows=int(app.config.get("GROUP_COMMIT_MAX_ROWS", 100)),
+            max_delay=float(app.config.get("GROUP_COMMIT_MAX_DELAY_MS", 2)) / 1000,
+            timeout=float(app.config.get("GROUP_COMMIT_TIMEOUT", 30)),
+            engine=engine,
+        )
+
+
+group_commit = GroupCommit()
@@ -0,0 +1,257 @@
+"""Candidate Archive Handler
+
+Module for moving the candidates of past intakes out of the Candidate table
+into the archive (`ArchivedCandidate`), and back.
+
+A candidate is archived once it was created, and last updated, more than
+`ARCHIVE_AFTER_DAYS` days ago: a restored candidate, or one still being
+worked on, stays current for another period. Candidates are archived in
+chunks of `chunk_size`, in `(created_at, id)` order. Each chunk is one
+transaction: its rows are read (and locked) with a single SELECT, copied
+with a single INSERT ... SELECT and removed with a single DELETE, together
+with the collection version, the tombstones and the materialized
+statistics.
+
+To everything reading the current candidates (lists, statistics, segments,
+search, the change feed), archiving a candidate is a deletion and restoring
+it a creation: `candidate_deleted` is sent with `archived=True`, and
+`candidate_created` with `restored=True`.
+
+Functions:
+    archive_candidates:
+        Move the candidates older than a given number of days to the archive.
+
+        Example:
+            archive_candidates(days=365, chunk_size=1000)
+
+    get_archived_candidate_data:
+        Retrieve a serialized archived candidate by ID.
+
+        Example:
+            get_archived_candidate_data(1)
+
+    restore_candidate:
+        Move an archived candidate back to the current candidates.
+
+        Example:
+            restore_candidate(1)
+"""
+
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+import logging
+from werkzeug.exceptions import Conflict, InternalServerError, NotFound
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from flask import current_app
+from app.models import candidates, db
+from app.models.archive import ArchivedCandidate
+from app.models.routing import replica_reads
+from app.models.tombstones import CandidateTombstone
+from app.handlers.candidates import (
+    bump_collection_version,
+    is_duplicate_key,
+    record_tombstones,
+)
+from app.handlers.stats import adjust_stats, candidate_stat_deltas
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, row_to_dict
+from app.signals import candidate_created, candidate_deleted
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+
+def archive_candidates(days: float, chunk_size: int = 1000) -> Dict[str, Any]:
+    """Move the candidates older than `days` days to the archive.
+
+    Args:
+        days: Age, in days, past which candidates that were not updated
+            since are archived.
+        chunk_size: Number of candidates moved per statement and
+            transaction (default is 1000).
+
+    Raises:
+        InternalServerError: If an unexpected error occurs. Chunks committed
+            before the failure are kept, and reported in the description.
+
+    Returns:
+        Dict[str, Any]: The number of candidates `archived`, and the
+            `cutoff` they were created and last updated before.
+    """
+    cutoff = utcnow() - timedelta(days=days)
+    query = (
+        select(*candidate_columns(CANDIDATE_FIELDS))
+        .where(Candidate.created_at < cutoff, Candidate.updated_at < cutoff)
+        .order_by(Candidate.created_at, Candidate.id)
+        .limit(chunk_size)
+        .with_for_update()
+    )
+    archived = 0
+    app = current_app._get_current_object()
+    try:
+        position = None
+        while True:
+            chunk_query = query
+            if position is not None:
+                # Seek past the last chunk, over the candidates it skipped.
+                chunk_query = query.where(
+                    or_(
+                        Candidate.created_at > position.created_at,
+                        and_(
+                            Candidate.created_at == position.created_at,
+                            Candidate.id > position.id,
+                        ),
+                    )
+                )
+            # Counter first, then rows: the lock order of every write.
+            bump_collection_version()
+            rows = db.session.execute(chunk_query).all()
+            if not rows:
+                db.session.rollback()
+                break
+            position = rows[-1]
+
+            chunk_ids = [row.id for row in rows]
+            db.session.execute(
+                insert(ArchivedCandidate).from_select(
+                    CANDIDATE_FIELDS,
+                    select(*candidate_columns(CANDIDATE_FIELDS)).where(
+                        Candidate.id.in_(chunk_ids)
+                    ),
+                )
+            )
+            db.session.execute(
+                delete(Candidate)
+                .where(Candidate.id.in_(chunk_ids))
+                .execution_options(synchronize_session=False)
+            )
+            record_tombstones(chunk_ids)
+            removed, deltas = [], Counter()
+            for row in rows:
+                data = row_to_dict(row)
+                deltas.update(candidate_stat_deltas(data, None))
+                removed.append(data)
+            adjust_stats(deltas)
+            db.session.commit()
+
+            archived += len(rows)
+            for data in removed:
+                candidate_deleted.send(app, candidate=data, archived=True)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error archiving candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description=(
+                f"Archiving stopped after {archived} candidates were archived. "
+                "Please try again later."
+            )
+        ) from e
+
+    logger.info("Archived %s candidates created before %s", archived, cutoff)
+    return {"archived": archived, "cutoff": cutoff.isoformat()}
+
+
+def get_archived_candidate_data(candidate_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieve a serialized archived candidate by ID.
+
+    Args:
+        candidate_id: The ID of the archived candidate to retrieve.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Optional[Dict[str, Any]]: The serialized candidate, with `archived`
+            set and the time it was archived at (`archived_at`), if found,
+            otherwise None.
+    """
+    try:
+        with replica_reads():
+            row = db.session.execute(
+                select(
+                    *candidate_columns(CANDIDATE_FIELDS, ArchivedCandidate),
+                    ArchivedCandidate.archived_at,
+                ).where(ArchivedCandidate.id == candidate_id)
+            ).first()
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving archived candidate: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving candidate. Please try again later."
+        ) from e
+    if row is None:
+        return None
+    data = row_to_dict(row)
+    data["archived"] = True
+    data["archived_at"] = row.archived_at.isoformat()
+    return data
+
+
+def restore_candidate(candidate_id: int) -> Dict[str, Any]:
+    """Move an archived candidate back to the current candidates.
+
+    The candidate keeps its ID, creation time and version; its
+    `updated_at` is set to now, so it is not archived again before
+    `ARCHIVE_AFTER_DAYS` days.
+
+    Args:
+        candidate_id: The ID of the archived candidate.
+
+    Raises:
+        NotFound: If no archived candidate has this ID.
+        Conflict: If a current candidate has the same email (e.g. the
+            applicant applied again) or ID.
+        InternalServerError: If an unexpected error occurs during the
+            restore.
+
+    Returns:
+        Dict[str, Any]: The serialized restored candidate.
+    """
+    try:
+        bump_collection_version()
+        archived = db.session.get(ArchivedCandidate, candidate_id, with_for_update=True)
+        if archived is None:
+            db.session.rollback()
+            raise NotFound(
+                description=f"Archived candidate with ID {candidate_id} not found"
+            )
+
+        values = {field: getattr(archived, field) for field in CANDIDATE_FIELDS}
+        values["updated_at"] = utcnow()
+        db.session.execute(insert(Candidate).values(**values))
+        db.session.delete(archived)
+        # The candidate is listed by the change feed again.
+        db.session.execute(
+            delete(CandidateTombstone).where(
+                CandidateTombstone.candidate_id == candidate_id
+            )
+        )
+        data = row_to_dict(SimpleNamespace(**values))
+        adjust_stats(candidate_stat_deltas(None, data))
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_duplicate_key(e):
+            logger.error("Error restoring candidate: %s", e, exc_info=True)
+            raise InternalServerError(
+                description="Error restoring candidate. Please try again later."
+            ) from e
+        logger.info("Restore of candidate %s conflicts", candidate_id)
+        raise Conflict(
+            description="A current candidate already has this email or ID."
+        ) from e
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error restoring candidate: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error restoring candidate. Please try again later."
+        ) from e
+
+    logger.info("Candidate %s restored", candidate_id)
+    candidate_created.send(
+        current_app._get_current_object(), candidate=data, restored=True
+    )
+    return data
@@ -0,0 +1,350 @@
+"""Async Candidate Handler
+
+Module for CRUD operations on the Candidate model from the asyncio
+application (see `app.asgi`), using an `AsyncSession` instead of the
+Flask-SQLAlchemy session.
+
+Writes are implemented natively with awaited statements. Reads reuse the
+handlers of `app.handlers.candidates` through `AsyncSession.run_sync`,
+which runs them on the async connection without blocking the event loop,
+so filters, projections and cursors behave exactly as in the Flask
+application. Writes keep the collection version and the statistics current
+and send the signals of `app.signals`, like their synchronous
+counterparts.
+
+Functions:
+    create_candidate:
+        Create a new candidate.
+
+        Example:
+            await create_candidate(session, 'John', 'Doe', 'john@example.com', 30)
+
+    get_candidate_data:
+        Retrieve a serialized candidate by ID through the read-through cache.
+
+        Example:
+            await get_candidate_data(session, 1)
+
+    get_collection_version:
+        Return the current version of the candidate collection.
+
+        Example:
+            await get_collection_version(session)
+
+    get_all_candidates:
+        Retrieve all candidates with pagination and optional filters.
+
+        Example:
+            await get_all_candidates(session, page=1, per_page=10)
+
+    get_candidates_after:
+        Retrieve a page of candidates using keyset (cursor) pagination.
+
+        Example:
+            await get_candidates_after(session, after=None, limit=10)
+
+    count_candidates:
+        Count the candidates matching optional filters.
+
+        Example:
+            await count_candidates(session, filters={'lastname': 'Doe'})
+
+    get_stats:
+        Return the candidate count, age distribution and daily sign-ups.
+
+        Example:
+            await get_stats(session, days=30)
+
+    update_candidate:
+        Update a candidate's information.
+
+        Example:
+            await update_candidate(session, 1, {'age': 31})
+
+    delete_candidate:
+        Delete a candidate.
+
+        Example:
+            await delete_candidate(session, 1)
+"""
+
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+from werkzeug.exceptions import Conflict, InternalServerError, NotFound
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from quart import current_app
+from app.cache import candidate_cache_key
+from app.handlers import candidates as sync_handlers
+from app.handlers import stats as stats_handlers
+from app.models import candidates
+from app.serializers import CANDIDATE_FIELDS
+from app.signals import candidate_created, candidate_deleted, candidate_updated
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+
+def _record_write(
+    session: Session,
+    deltas: Mapping[Tuple[str, str], int],
+    deleted_ids: Sequence[int] = (),
+) -> None:
+    """Apply statistic deltas and record the tombstones of deleted candidates.
+
+    The collection version must have been bumped first (see
+    `app.handlers.candidates.bump_collection_version`).
+    """
+    sync_handlers.record_tombstones(deleted_ids, session=session)
+    stats_handlers.adjust_stats(deltas, session=session)
+
+
+async def create_candidate(
+    session: AsyncSession, firstname: str, lastname: str, email: str, age: int
+) -> Dict[str, Any]:
+    """Create a new candidate.
+
+    Duplicate emails are rejected by the unique index on the email, as in
+    `app.handlers.candidates.create_candidate`.
+
+    Args:
+        session: The async session to use.
+        firstname: The candidate's first name.
+        lastname: The candidate's last name.
+        email: The candidate's email address.
+        age: The candidate's age.
+
+    Raises:
+        Conflict: If a candidate with the provided email already exists.
+        InternalServerError: If an unexpected error occurs during creation.
+
+    Returns:
+        Dict[str, Any]: The serialized candidate.
+    """
+    try:
+        new_candidate = Candidate(
+            firstname=firstname, lastname=lastname, email=email, age=age
+        )
+        session.add(new_candidate)
+        await session.run_sync(sync_handlers.bump_collection_version)
+        await session.flush()
+        data = new_candidate.serialize()
+        await session.run_sync(
+            _record_write, stats_handlers.candidate_stat_deltas(None, data)
+        )
+        await session.commit()
+        logger.info("New candidate created: %s", data["id"])
+        candidate_created.send(current_app._get_current_object(), candidate=data)
+        return data
+    except IntegrityError as e:
+        await session.rollback()
+        if not sync_handlers.is_duplicate_key(e):
+            logger.error("Error creating candidate: %s", e, exc_info=True)
+            raise InternalServerError(
+                description="Error creating candidate. Please try again later."
+            ) from e
+        logger.info("Duplicate email found: %s", email)
+        raise Conflict(description="Candidate with this email already exists.") from e
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Error creating candidate: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error creating candidate. Please try again later."
+        ) from e
+
+
+async def _get_candidate(session: AsyncSession, candidate_id: int) -> Candidate:
+    """Load a candidate or raise NotFound."""
+    try:
+        candidate = await session.get(Candidate, candidate_id)
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving candidate by ID: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving candidate. Please try again later."
+        ) from e
+    if candidate is None:
+        logger.info("Candidate not found with ID: %s", candidate_id)
+        raise NotFound(description=f"Candidate with ID {candidate_id} not found")
+    return candidate
+
+
+async def get_candidate_data(
+    session: AsyncSession, candidate_id: int
+) -> Optional[Dict[str, Any]]:
+    """Retrieve a serialized candidate by ID through the read-through cache.
+
+    Args:
+        session: The async session to use.
+        candidate_id: The ID of the candidate to retrieve.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Optional[Dict[str, Any]]: The serialized candidate if found,
+            otherwise None.
+    """
+    cache = current_app.extensions["candidate_cache"]
+    key = candidate_cache_key(candidate_id)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    try:
+        data = (await _get_candidate(session, candidate_id)).serialize()
+    except NotFound:
+        return None
+    cache.set(key, data)
+    return data
+
+
+async def get_collection_version(session: AsyncSession) -> int:
+    """Return the current version of the candidate collection.
+
+    See `app.handlers.candidates.get_collection_version`.
+    """
+    return await session.run_sync(
+        lambda sync_session: sync_handlers.get_collection_version(session=sync_session)
+    )
+
+
+async def get_all_candidates(
+    session: AsyncSession,
+    page: int = 1,
+    per_page: int = 10,
+    filters: dict = None,
+    fields: Sequence[str] = CANDIDATE_FIELDS,
+) -> List[Row]:
+    """Retrieve all candidates with pagination and optional filters.
+
+    See `app.handlers.candidates.get_all_candidates`.
+    """
+    return await session.run_sync(
+        lambda sync_session: sync_handlers.get_all_candidates(
+            page, per_page, filters, fields, session=sync_session
+        )
+    )
+
+
+async def get_candidates_after(
+    session: AsyncSession,
+    after: Optional[str] = None,
+    limit: int = 10,
+    filters: dict = None,
+    fields: Sequence[str] = CANDIDATE_FIELDS,
+) -> Tuple[List[Row], Optional[str]]:
+    """Retrieve a page of candidates using keyset (cursor) pagination.
+
+    See `app.handlers.candidates.get_candidates_after`.
+    """
+    return await session.run_sync(
+        lambda sync_session: sync_handlers.get_candidates_after(
+            after, limit, filters, fields, session=sync_session
+        )
+    )
+
+
+async def count_candidates(session: AsyncSession, filters: dict = None) -> int:
+    """Count the candidates matching optional filters.
+
+    See `app.handlers.candidates.count_candidates`.
+    """
+    return await session.run_sync(
+        lambda sync_session: sync_handlers.count_candidates(
+            filters, session=sync_session
+        )
+    )
+
+
+async def get_stats(session: AsyncSession, days: int = 30) -> Dict[str, Any]:
+    """Return the candidate count, age distribution and daily sign-ups.
+
+    See `app.handlers.stats.get_stats`.
+    """
+    return await session.run_sync(
+        lambda sync_session: stats_handlers.get_stats(days, session=sync_session)
+    )
+
+
+async def update_candidate(
+    session: AsyncSession, candidate_id: int, new_data: Dict[str, Any]
+) -> None:
+    """Update a candidate's information.
+
+    Args:
+        session: The async session to use.
+        candidate_id: The ID of the candidate to update.
+        new_data: Dictionary containing updated data for the candidate, as
+            validated by `validate_candidate_data`. Only `UPDATABLE_FIELDS`
+            are applied.
+
+    Raises:
+        NotFound: If the candidate does not exist.
+        Conflict: If the candidate was updated concurrently.
+        InternalServerError: If an unexpected error occurs during update.
+    """
+    candidate = await _get_candidate(session, candidate_id)
+    try:
+        previous = candidate.serialize()
+        for key, value in new_data.items():
+            if key in sync_handlers.UPDATABLE_FIELDS:
+                setattr(candidate, key, value)
+        await session.run_sync(sync_handlers.bump_collection_version)
+        await session.flush()
+        data = candidate.serialize()
+        await session.run_sync(
+            _record_write, stats_handlers.candidate_stat_deltas(previous, data)
+        )
+        await session.commit()
+        logger.info("Candidate %s updated successfully", candidate_id)
+        candidate_updated.send(
+            current_app._get_current_object(), candidate=data, previous=previous
+        )
+    except StaleDataError as e:
+        await session.rollback()
+        logger.info("Concurrent update of candidate %s", candidate_id)
+        raise Conflict(
+            description="Candidate was modified by another request. Please retry."
+        ) from e
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Error updating candidate: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error updating candidate. Please try again later."
+        ) from e
+
+
+async def delete_candidate(session: AsyncSession, candidate_id: int) -> None:
+    """Delete a candidate.
+
+    Args:
+        session: The async session to use.
+        candidate_id: The ID of the candidate to delete.
+
+    Raises:
+        NotFound: If the candidate does not exist.
+        InternalServerError: If an unexpected error occurs during deletion.
+    """
+    candidate = await _get_candidate(session, candidate_id)
+    try:
+        data = candidate.serialize()
+        await session.delete(candidate)
+        await session.run_sync(sync_handlers.bump_collection_version)
+        await session.run_sync(
+            _record_write,
+            stats_handlers.candidate_stat_deltas(data, None),
+            [candidate_id],
+        )
+        await session.commit()
+        logger.info("Candidate %s deleted successfully", candidate_id)
+        candidate_deleted.send(current_app._get_current_object(), candidate=data)
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error("Error deleting candidate: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error deleting candidate. Please try again later."
+        ) from e
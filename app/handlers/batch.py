@@ -0,0 +1,282 @@
+"""Candidate Batch Handler
+
+Module for updating and deleting many candidates at once with set-based
+statements, instead of loading, changing and committing them one by one.
+
+Candidates are selected either by a list of IDs or by filters (as accepted
+by `app.handlers.filters.compile_filters`), and processed in chunks of
+`chunk_size` candidates in ID order. Each chunk is one transaction: its rows
+are read (and locked) with a single SELECT, then written with a single
+UPDATE or DELETE, together with the collection version and the
+materialized statistics. The candidate signals are sent for every row once
+its chunk is committed, so caches and the search index stay current.
+
+Functions:
+    validate_selection:
+        Validate the candidates selected by a batch request.
+
+        Example:
+            validate_selection({'filter': {'lastname': 'Doe'}})
+
+    update_candidates:
+        Apply the same changes to every selected candidate.
+
+        Example:
+            update_candidates({'lastname': 'Smith'}, filters={'lastname': 'Doe'})
+
+    delete_candidates:
+        Delete every selected candidate.
+
+        Example:
+            delete_candidates(ids=[1, 2, 3])
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+from werkzeug.exceptions import BadRequest, InternalServerError
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from flask import current_app
+from app.models import candidates, db
+from app.handlers.candidates import (
+    apply_filters,
+    bump_collection_version,
+    record_tombstones,
+    validate_candidate_data,
+)
+from app.handlers.stats import adjust_stats, candidate_stat_deltas
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, row_to_dict
+from app.signals import candidate_deleted, candidate_updated
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+MAX_BATCH_IDS = 10000
+# Unique fields cannot be set to the same value on several candidates.
+BATCH_IMMUTABLE_FIELDS = ("email",)
+
+
+def validate_selection(
+    data: Dict[str, Any],
+) -> Tuple[Optional[List[int]], Optional[dict]]:
+    """Validate the candidates selected by a batch request.
+
+    Args:
+        data: Request body with either `ids`, a list of candidate IDs, or
+            `filter`, a non-empty object of filters.
+
+    Raises:
+        BadRequest: If neither or both are given, or either is invalid.
+
+    Returns:
+        Tuple[Optional[List[int]], Optional[dict]]: The deduplicated IDs, or
+            None, and the filters, or None.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest(description="Request body must be an object.")
+    ids, filters = data.get("ids"), data.get("filter")
+    if (ids is None) == (filters is None):
+        raise BadRequest(description="Provide either 'ids' or 'filter'.")
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(
+            isinstance(candidate_id, int) and not isinstance(candidate_id, bool)
+            for candidate_id in ids
+        ):
+            raise BadRequest(description="'ids' must be a list of integers.")
+        if len(ids) > MAX_BATCH_IDS:
+            raise BadRequest(description=f"'ids' can hold at most {MAX_BATCH_IDS}.")
+        return sorted(set(ids)), None
+
+    if not isinstance(filters, dict) or not filters:
+        raise BadRequest(description="'filter' must be a non-empty object.")
+    # Compiled once up front, so invalid filters fail before any write.
+    apply_filters(select(Candidate.id), filters)
+    return None, filters
+
+
+def _chunks(
+    ids: Optional[List[int]], filters: Optional[dict], chunk_size: int
+) -> Iterator[list]:
+    """Read and lock the selected candidates, one chunk at a time.
+
+    Each chunk's transaction first increments the version counter, then
+    locks the rows, as every other candidate write does: locking rows
+    first, then waiting for the counter held by a writer that waits for
+    those rows, would deadlock. Chunk reads are thereby serialized with
+    every other candidate write.
+    """
+    query = (
+        select(*candidate_columns(CANDIDATE_FIELDS))
+        .order_by(Candidate.id)
+        .with_for_update()
+    )
+    if ids is not None:
+        for start in range(0, len(ids), chunk_size):
+            chunk_ids = ids[start : start + chunk_size]
+            bump_collection_version()
+            rows = db.session.execute(query.where(Candidate.id.in_(chunk_ids))).all()
+            if rows:
+                yield rows
+            else:
+                db.session.rollback()
+        return
+
+    # Seek past the last chunk rather than using an offset: updated rows
+    # may no longer match the filters.
+    query = apply_filters(query, filters).limit(chunk_size)
+    last_id = 0
+    while True:
+        bump_collection_version()
+        rows = db.session.execute(query.where(Candidate.id > last_id)).all()
+        if not rows:
+            db.session.rollback()
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def update_candidates(
+    changes: Dict[str, Any],
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[dict] = None,
+    chunk_size: int = 1000,
+) -> Dict[str, Any]:
+    """Apply the same changes to every selected candidate.
+
+    Args:
+        changes: Fields to set, validated as a partial update.
+        ids: IDs of the candidates to update, as returned by
+            `validate_selection`.
+        filters: Filters selecting the candidates to update instead.
+        chunk_size: Number of candidates updated per statement and
+            transaction (default is 1000).
+
+    Raises:
+        BadRequest: If a change is invalid, before anything is written.
+        InternalServerError: If an unexpected error occurs. Chunks committed
+            before the failure are kept, and reported in the description.
+
+    Returns:
+        Dict[str, Any]: The number of candidates `updated`, and the IDs
+            that were `not_found` when selecting by IDs.
+    """
+    changes = validate_candidate_data(changes, partial=True)
+    if not changes:
+        raise BadRequest(description="'set' must hold at least one field.")
+    immutable = sorted(set(changes) & set(BATCH_IMMUTABLE_FIELDS))
+    if immutable:
+        raise BadRequest(
+            description=f"Cannot set {', '.join(immutable)} in a batch update."
+        )
+
+    updated, found = 0, set()
+    app = current_app._get_current_object()
+    try:
+        for rows in _chunks(ids, filters, chunk_size):
+            now = utcnow()
+            chunk_ids = [row.id for row in rows]
+            db.session.execute(
+                update(Candidate)
+                .where(Candidate.id.in_(chunk_ids))
+                .values(**changes, updated_at=now, version=Candidate.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+            pairs, deltas = [], Counter()
+            for row in rows:
+                previous = row_to_dict(row)
+                data = {
+                    **previous,
+                    **changes,
+                    "updated_at": now.isoformat(),
+                    "version": row.version + 1,
+                }
+                deltas.update(candidate_stat_deltas(previous, data))
+                pairs.append((previous, data))
+            adjust_stats(deltas)
+            db.session.commit()
+
+            updated += len(rows)
+            found.update(chunk_ids)
+            for previous, data in pairs:
+                candidate_updated.send(app, candidate=data, previous=previous)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error updating candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description=(
+                f"Update stopped after {updated} candidates were updated. "
+                "Please try again later."
+            )
+        ) from e
+
+    logger.info("Batch updated %s candidates", updated)
+    report = {"updated": updated}
+    if ids is not None:
+        report["not_found"] = [i for i in ids if i not in found]
+    return report
+
+
+def delete_candidates(
+    ids: Optional[Sequence[int]] = None,
+    filters: Optional[dict] = None,
+    chunk_size: int = 1000,
+) -> Dict[str, Any]:
+    """Delete every selected candidate.
+
+    Args:
+        ids: IDs of the candidates to delete, as returned by
+            `validate_selection`.
+        filters: Filters selecting the candidates to delete instead.
+        chunk_size: Number of candidates deleted per statement and
+            transaction (default is 1000).
+
+    Raises:
+        InternalServerError: If an unexpected error occurs. Chunks committed
+            before the failure are kept, and reported in the description.
+
+    Returns:
+        Dict[str, Any]: The number of candidates `deleted`, and the IDs
+            that were `not_found` when selecting by IDs.
+    """
+    deleted, found = 0, set()
+    app = current_app._get_current_object()
+    try:
+        for rows in _chunks(ids, filters, chunk_size):
+            chunk_ids = [row.id for row in rows]
+            db.session.execute(
+                delete(Candidate)
+                .where(Candidate.id.in_(chunk_ids))
+                .execution_options(synchronize_session=False)
+            )
+            record_tombstones(chunk_ids)
+            removed, deltas = [], Counter()
+            for row in rows:
+                data = row_to_dict(row)
+                deltas.update(candidate_stat_deltas(data, None))
+                removed.append(data)
+            adjust_stats(deltas)
+            db.session.commit()
+
+            deleted += len(rows)
+            found.update(chunk_ids)
+            for data in removed:
+                candidate_deleted.send(app, candidate=data)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error deleting candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description=(
+                f"Delete stopped after {deleted} candidates were deleted. "
+                "Please try again later."
+            )
+        ) from e
+
+    logger.info("Batch deleted %s candidates", deleted)
+    report = {"deleted": deleted}
+    if ids is not None:
+        report["not_found"] = [i for i in ids if i not in found]
+    return report
@@ -0,0 +1,446 @@
+"""Campaign Handler
+
+Module for creating email campaigns and queueing their messages.
+
+A campaign's subject and body are Jinja templates rendered, in a sandbox,
+with the fields of each candidate of its audience (e.g. `{{ firstname }}`).
+Rendered subjects are folded onto one line and truncated to what a
+message stores, whatever the candidate's fields hold.
+Queueing resolves the audience in ID order, one batch of `batch_size`
+candidates at a time, renders the batch and writes it to the
+`campaign_message` outbox with one multi-row INSERT, committed in its own
+transaction. Only the current batch is held in memory, and an interrupted
+run resumes after the last candidate it queued. A campaign is queued by
+`flask campaigns queue`, or by the dispatcher once requested through the
+API (see `app.dispatcher`), which then sends its messages.
+
+Functions:
+    validate_campaign_data:
+        Validate and normalize the fields of a new campaign.
+
+        Example:
+            validate_campaign_data({'name': 'Intake', 'subject': 'Hi', ...})
+
+    create_campaign:
+        Create a new campaign.
+
+        Example:
+            create_campaign({'name': 'Intake', 'subject': 'Hi {{ firstname }}'})
+
+    get_campaign:
+        Retrieve a campaign with the number of its messages by status.
+
+        Example:
+            get_campaign(1)
+
+    request_queueing:
+        Ask the dispatcher to queue the messages of a campaign.
+
+        Example:
+            request_queueing(1)
+
+    queue_campaign:
+        Render and queue a message for every candidate of the audience.
+
+        Example:
+            queue_campaign(1, batch_size=1000)
+
+    next_requested_campaign:
+        Return the ID of a campaign waiting to be queued, if any.
+
+        Example:
+            next_requested_campaign()
+"""
+
+import json
+import logging
+import re
+import uuid
+from datetime import timedelta
+from typing import Any, Dict, Optional
+from jinja2 import StrictUndefined, TemplateError
+from jinja2.sandbox import SandboxedEnvironment
+from werkzeug.exceptions import BadRequest, Conflict, InternalServerError, NotFound
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import candidates, db
+from app.models.campaigns import PENDING, Campaign, CampaignMessage
+from app.handlers.candidates import apply_filters
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, row_to_dict
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+CAMPAIGN_FIELD_LENGTHS = {"name": 100, "sender": 255, "subject": 255}
+# Longest rendered subject a message can store.
+MESSAGE_SUBJECT_LENGTH = CampaignMessage.__table__.c.subject.type.length
+# Line breaks, which would end the Subject header of a message.
+_LINE_BREAKS = re.compile(r"\s*[\r\n\v\f\x1c-\x1e\x85\u2028\u2029]+\s*")
+
+# Messages are plain text: nothing is escaped, and referencing a field
+# that does not exist fails when the campaign is created.
+_templates = SandboxedEnvironment(undefined=StrictUndefined, autoescape=False)
+# Rendering errors, including a template misusing a field's value.
+TEMPLATE_ERRORS = (TemplateError, TypeError, ValueError)
+
+
+def _render_subject(template, fields: Dict[str, Any]) -> str:
+    """Render a subject template as a single header line that fits.
+
+    Line breaks from the candidate's fields become spaces, and subjects
+    longer than `MESSAGE_SUBJECT_LENGTH` are truncated.
+    """
+    subject = _LINE_BREAKS.sub(" ", template.render(fields)).strip()
+    return subject[:MESSAGE_SUBJECT_LENGTH]
+
+
+def _sample_candidate() -> Dict[str, Any]:
+    """Return placeholder values of every field a template may use."""
+    return {field: "" for field in CANDIDATE_FIELDS}
+
+
+def validate_campaign_data(
+    data: Dict[str, Any], default_sender: Optional[str] = None
+) -> Dict[str, Any]:
+    """Validate and normalize the fields of a new campaign.
+
+    Args:
+        data: Campaign fields: `name`, `subject` and `body` templates,
+            optional `sender` and `filter` selecting the audience.
+        default_sender: Sender used when `data` has none.
+
+    Raises:
+        BadRequest: If a field is missing or invalid, a template does not
+            compile or uses an unknown field, or a filter is invalid.
+
+    Returns:
+        Dict[str, Any]: The normalized fields, with the filters JSON-encoded.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest(description="Campaign data must be an object.")
+
+    unknown = set(data) - set(CAMPAIGN_FIELD_LENGTHS) - {"body", "filter"}
+    if unknown:
+        raise BadRequest(description=f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    cleaned = {"sender": default_sender}
+    for field, max_length in CAMPAIGN_FIELD_LENGTHS.items():
+        value = data.get(field, cleaned.get(field))
+        if not isinstance(value, str) or not value.strip():
+            raise BadRequest(description=f"'{field}' is required.")
+        if len(value.strip()) > max_length:
+            raise BadRequest(
+                description=f"'{field}' must be at most {max_length} characters."
+            )
+        cleaned[field] = value.strip()
+    if _LINE_BREAKS.search(cleaned["subject"]):
+        raise BadRequest(description="'subject' must be a single line.")
+
+    body = data.get("body", "")
+    if not isinstance(body, str):
+        raise BadRequest(description="'body' must be a string.")
+    cleaned["body"] = body
+
+    if "@" not in cleaned["sender"]:
+        raise BadRequest(description="'sender' must be a valid email address.")
+
+    for field in ("subject", "body"):
+        try:
+            _templates.from_string(cleaned[field]).render(_sample_candidate())
+        except TEMPLATE_ERRORS as e:
+            raise BadRequest(description=f"Invalid '{field}' template: {e}.") from e
+
+    filters = data.get("filter") or {}
+    if not isinstance(filters, dict):
+        raise BadRequest(description="'filter' must be an object.")
+    apply_filters(select(Candidate.id), filters)
+    cleaned["filters"] = json.dumps(filters, sort_keys=True)
+    return cleaned
+
+
+def create_campaign(
+    data: Dict[str, Any], default_sender: Optional[str] = None
+) -> Campaign:
+    """Create a new campaign.
+
+    Args:
+        data: Campaign fields, as accepted by `validate_campaign_data`.
+        default_sender: Sender used when `data` has none.
+
+    Raises:
+        BadRequest: If a field is invalid.
+        InternalServerError: If an unexpected error occurs during creation.
+
+    Returns:
+        Campaign: The created campaign.
+    """
+    campaign = Campaign(**validate_campaign_data(data, default_sender))
+    try:
+        db.session.add(campaign)
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error creating campaign: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error creating campaign. Please try again later."
+        ) from e
+    logger.info("New campaign created: %s", campaign.id)
+    return campaign
+
+
+def get_campaign(campaign_id: int) -> Dict[str, Any]:
+    """Retrieve a campaign with the number of its messages by status.
+
+    Args:
+        campaign_id: The ID of the campaign to retrieve.
+
+    Raises:
+        NotFound: If the campaign does not exist.
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Dict[str, Any]: The serialized campaign, with a `messages` count per
+            status.
+    """
+    try:
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign is None:
+            raise NotFound(description="Campaign not found.")
+        counts = db.session.execute(
+            select(CampaignMessage.status, func.count())
+            .where(CampaignMessage.campaign_id == campaign_id)
+            .group_by(CampaignMessage.status)
+        ).all()
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving campaign: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving campaign. Please try again later."
+        ) from e
+    return {**campaign.serialize(), "messages": dict(counts)}
+
+
+def request_queueing(campaign_id: int) -> Dict[str, Any]:
+    """Ask the dispatcher to queue the messages of a campaign.
+
+    The request is recorded with a conditional UPDATE, so of concurrent
+    requests for the same campaign only one succeeds.
+
+    Args:
+        campaign_id: The ID of the campaign to queue.
+
+    Raises:
+        NotFound: If the campaign does not exist.
+        Conflict: If queueing the campaign was already requested.
+        InternalServerError: If an unexpected error occurs.
+
+    Returns:
+        Dict[str, Any]: The serialized campaign, as by `get_campaign`.
+    """
+    try:
+        requested = db.session.execute(
+            update(Campaign)
+            .where(
+                Campaign.id == campaign_id,
+                Campaign.queue_requested_at.is_(None),
+                Campaign.queued_at.is_(None),
+            )
+            .values(queue_requested_at=utcnow())
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error requesting campaign queueing: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error queueing campaign. Please try again later."
+        ) from e
+    campaign = get_campaign(campaign_id)
+    if not requested:
+        raise Conflict(description="Campaign has already been queued.")
+    logger.info("Queueing of campaign %s requested", campaign_id)
+    return campaign
+
+
+def _claim(campaign_id: int, claim_id: str, lease: timedelta) -> bool:
+    """Claim (or renew the claim of) the queueing of a campaign.
+
+    The claim is a lease: once `queue_locked_until` has passed without being
+    renewed (e.g. because the claiming process crashed), the campaign may
+    be claimed again, and its queueing resumed. Call this in the
+    transaction to commit with the claim.
+    """
+    now = utcnow()
+    return bool(
+        db.session.execute(
+            update(Campaign)
+            .where(
+                Campaign.id == campaign_id,
+                Campaign.queued_at.is_(None),
+                or_(
+                    Campaign.queue_claimed_by == claim_id,
+                    Campaign.queue_locked_until.is_(None),
+                    Campaign.queue_locked_until < now,
+                ),
+            )
+            .values(queue_claimed_by=claim_id, queue_locked_until=now + lease)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    )
+
+
+def queue_campaign(
+    campaign_id: int, batch_size: int = 1000, lease_seconds: float = 300
+) -> Dict[str, Any]:
+    """Render and queue a message for every candidate of the audience.
+
+    Candidates without an email address are skipped. The campaign is
+    claimed first, so concurrent calls do not queue the same messages, and
+    the claim is renewed with every batch. Batches are committed as they
+    are written: if queueing is interrupted, running it again once the
+    claim has expired queues the rest of the audience.
+
+    Args:
+        campaign_id: The ID of the campaign to queue.
+        batch_size: Number of candidates read, rendered and inserted at a
+            time (default is 1000).
+        lease_seconds: How long the claim of the campaign lasts without
+            being renewed (default is 300).
+
+    Raises:
+        NotFound: If the campaign does not exist.
+        Conflict: If the campaign has already been queued, or is being
+            queued by another call.
+        InternalServerError: If an unexpected error occurs. Batches
+            committed before the failure are kept.
+
+    Returns:
+        Dict[str, Any]: The number of messages `queued` by this call.
+    """
+    queued = 0
+    claim_id = uuid.uuid4().hex
+    lease = timedelta(seconds=lease_seconds)
+    try:
+        claimed = _claim(campaign_id, claim_id, lease)
+        db.session.commit()
+        campaign = db.session.get(Campaign, campaign_id)
+        if campaign is None:
+            raise NotFound(description="Campaign not found.")
+        if not claimed:
+            if campaign.queued_at is not None:
+                raise Conflict(description="Campaign has already been queued.")
+            raise Conflict(description="Campaign is being queued.")
+
+        subject = _templates.from_string(campaign.subject)
+        body = _templates.from_string(campaign.body or "")
+        query = (
+            apply_filters(
+                select(*candidate_columns(CANDIDATE_FIELDS)),
+                json.loads(campaign.filters),
+            )
+            .where(Candidate.email.is_not(None))
+            .order_by(Candidate.id)
+            .limit(batch_size)
+        )
+        # Resume after the last candidate queued by an interrupted run.
+        last_id = (
+            db.session.execute(
+                select(func.max(CampaignMessage.candidate_id)).where(
+                    CampaignMessage.campaign_id == campaign_id
+                )
+            ).scalar()
+            or 0
+        )
+        while True:
+            rows = db.session.execute(query.where(Candidate.id > last_id)).all()
+            if not rows:
+                break
+            now = utcnow()
+            messages = []
+            for row in rows:
+                fields = row_to_dict(row)
+                messages.append(
+                    {
+                        "campaign_id": campaign_id,
+                        "candidate_id": row.id,
+                        "recipient": row.email,
+                        "domain": row.email.rsplit("@", 1)[-1].lower(),
+                        "subject": _render_subject(subject, fields),
+                        "body": body.render(fields),
+                        "status": PENDING,
+                        "attempts": 0,
+                        "next_attempt_at": now,
+                    }
+                )
+            if not _claim(campaign_id, claim_id, lease):
+                db.session.rollback()
+                raise Conflict(
+                    description=(
+                        f"Queueing stopped after {queued} messages: the campaign "
+                        "was claimed by another process."
+                    )
+                )
+            db.session.execute(insert(CampaignMessage), messages)
+            db.session.commit()
+            queued += len(rows)
+            last_id = rows[-1].id
+
+        db.session.execute(
+            update(Campaign)
+            .where(Campaign.id == campaign_id, Campaign.queue_claimed_by == claim_id)
+            .values(queued_at=utcnow(), queue_claimed_by=None, queue_locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except TEMPLATE_ERRORS as e:
+        db.session.rollback()
+        logger.error("Error rendering campaign %s: %s", campaign_id, e)
+        raise InternalServerError(
+            description=f"Queueing stopped after {queued} messages: {e}."
+        ) from e
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error queueing campaign: %s", e, exc_info=True)
+        raise InternalServerError(
+            description=(
+                f"Queueing stopped after {queued} messages were queued. "
+                "Please try again later."
+            )
+        ) from e
+
+    logger.info("Queued %s messages of campaign %s", queued, campaign_id)
+    return {"queued": queued}
+
+
+def next_requested_campaign() -> Optional[int]:
+    """Return the ID of a campaign waiting to be queued, if any.
+
+    Only campaigns whose queueing was requested, and that are not claimed,
+    are returned, oldest request first.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs.
+    """
+    try:
+        campaign_id = db.session.execute(
+            select(Campaign.id)
+            .where(
+                Campaign.queue_requested_at.is_not(None),
+                Campaign.queued_at.is_(None),
+                or_(
+                    Campaign.queue_locked_until.is_(None),
+                    Campaign.queue_locked_until < utcnow(),
+                ),
+            )
+            .order_by(Campaign.queue_requested_at)
+            .limit(1)
+        ).scalar()
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error finding requested campaigns: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error finding requested campaigns. Please try again later."
+        ) from e
+    return campaign_id
@@ -2,24 +2,90 @@
 
 Module for CRUD operations on the Candidate model.
 
+Writes update the materialized statistics of `app.handlers.stats` in the
+same transaction, and single-candidate writes send the signals defined in
+`app.signals` once they are committed. Read-only handlers read from a
+replica when one is configured (see `app.models.routing`).
+
 Functions:
+    validate_candidate_data:
+        Validate and normalize candidate fields.
+
+        Example:
+            validate_candidate_data({'firstname': 'John', 'email': 'john@example.com'})
+
+    is_duplicate_key:
+        Tell whether an integrity error is a unique key violation.
+
+        Example:
+            is_duplicate_key(error)
+
     create_candidate:
         Create a new candidate.
 
         Example:
             create_candidate('John', 'Doe', 'john@example.com', 30)
 
+    create_candidates_together:
+        Create candidates in a single transaction, each succeeding or
+        failing on its own.
+
+        Example:
+            create_candidates_together([({'firstname': 'John', ...}, None)])
+
     get_candidate_by_id:
         Retrieve a candidate by ID.
 
         Example:
             get_candidate_by_id(1)
 
+    apply_filters:
+        Restrict a query to candidates matching optional filters.
+
+        Example:
+            apply_filters(Candidate.query, {'lastname': 'Doe'})
+
+    bump_collection_version:
+        Increment the candidate collection version in the current transaction.
+
+        Example:
+            bump_collection_version()
+
+    record_tombstones:
+        Record the deletion of candidates in the current transaction.
+
+        Example:
+            record_tombstones([1, 2, 3])
+
+    get_collection_version:
+        Return the current version of the candidate collection.
+
+        Example:
+            get_collection_version()
+
+    get_candidate_data:
+        Retrieve a serialized candidate by ID through the read-through cache.
+
+        Example:
+            get_candidate_data(1)
+
     get_all_candidates:
         Retrieve all candidates with pagination and optional filters.
 
         Example:
-            get_all_candidates(page=1, per_page=10, filters={'age': 25, 'lastname': 'Doe'})
+            get_all_candidates(page=1, per_page=10, filters={'age__gte': 25, 'lastname': 'Doe'})
+
+    get_candidates_after:
+        Retrieve a page of candidates using keyset (cursor) pagination.
+
+        Example:
+            get_candidates_after(after=None, limit=10, filters={'age': 25})
+
+    count_candidates:
+        Count the candidates matching optional filters.
+
+        Example:
+            count_candidates(filters={'lastname': 'Doe'})
 
     update_candidate:
         Update a candidate's information.
@@ -34,27 +100,149 @@ Functions:
             delete_candidate(candidate)
 """
 
-from typing import Optional, Dict, Any, List
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, List, Sequence, Tuple
 import logging
-from werkzeug.exceptions import Conflict, InternalServerError
-from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.exceptions import BadRequest, Conflict, InternalServerError
+from sqlalchemy import Boolean, Row, and_, delete, func, insert, literal, or_, select
+from sqlalchemy import union_all, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from flask import current_app
+from app.cache import cache, candidate_cache_key
 from app.models import candidates, db
+from app.models.archive import ArchivedCandidate
+from app.models.routing import replica_reads
+from app.models.tombstones import CandidateTombstone
+from app.models.versions import CollectionVersion
+from app.handlers.filters import compile_filters
+from app.handlers.idempotency import IdempotentRequest
+from app.handlers.stats import adjust_stats, candidate_stat_deltas
+from app.serializers import CANDIDATE_FIELDS, candidate_columns
+from app.signals import candidate_created, candidate_deleted, candidate_updated
+from app.utils import decode_cursor, encode_cursor
 
 logger = logging.getLogger(__name__)
 
 Candidate = candidates.Candidate
 
+REQUIRED_FIELDS = ("firstname", "email")
+STRING_FIELD_LENGTHS = {"firstname": 100, "lastname": 100, "email": 80}
+# Fields a client may set; the others are managed by the application.
+UPDATABLE_FIELDS = tuple(STRING_FIELD_LENGTHS) + ("age",)
+
+
+def validate_candidate_data(
+    data: Dict[str, Any], partial: bool = False
+) -> Dict[str, Any]:
+    """Validate and normalize candidate fields.
+
+    Strings are stripped, empty optional values become None and `age` is
+    coerced to an integer.
+
+    Args:
+        data: Candidate fields to validate.
+        partial: Whether required fields may be omitted, as in an update
+            (default is False).
+
+    Raises:
+        BadRequest: If a field is unknown, missing or invalid.
+
+    Returns:
+        Dict[str, Any]: The normalized fields.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest(description="Candidate data must be an object.")
+
+    unknown = set(data) - set(UPDATABLE_FIELDS)
+    if unknown:
+        raise BadRequest(description=f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    cleaned = {}
+    for field, max_length in STRING_FIELD_LENGTHS.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if value is not None and not isinstance(value, str):
+            raise BadRequest(description=f"'{field}' must be a string.")
+        value = value.strip() if value else None
+        if value and len(value) > max_length:
+            raise BadRequest(
+                description=f"'{field}' must be at most {max_length} characters."
+            )
+        cleaned[field] = value
+
+    if "age" in data:
+        age = data["age"]
+        if age in (None, ""):
+            cleaned["age"] = None
+        else:
+            try:
+                if isinstance(age, float) and not age.is_integer():
+                    raise ValueError(age)
+                cleaned["age"] = int(age)
+            except (TypeError, ValueError) as e:
+                raise BadRequest(description="'age' must be an integer.") from e
+            if isinstance(age, bool) or not 0 <= cleaned["age"] <= 150:
+                raise BadRequest(description="'age' must be between 0 and 150.")
+
+    for field in REQUIRED_FIELDS:
+        if (field in cleaned or not partial) and not cleaned.get(field):
+            raise BadRequest(description=f"'{field}' is required.")
+
+    if cleaned.get("email") and "@" not in cleaned["email"]:
+        raise BadRequest(description="'email' must be a valid email address.")
+
+    return cleaned
+
+
+def is_duplicate_key(error: IntegrityError) -> bool:
+    """Tell whether an integrity error is a unique key violation.
+
+    Other integrity errors (e.g. a missing required field) are not.
+
+    Args:
+        error: The error raised by the database driver.
+
+    Returns:
+        bool: True if a row with the same unique key already exists.
+    """
+    args = getattr(error.orig, "args", ())
+    # MySQL reports ER_DUP_ENTRY (1062), SQLite and PostgreSQL name the
+    # violated unique constraint in the message.
+    return (bool(args) and args[0] == 1062) or "unique" in str(error.orig).lower()
+
 
 def create_candidate(
-    firstname: str, lastname: str, email: str, age: int
+    firstname: str,
+    lastname: str,
+    email: str,
+    age: int,
+    idempotency: Optional[IdempotentRequest] = None,
 ) -> Optional[Candidate]:
     """Create a new candidate.
 
+    The candidate is inserted without checking for its email first: the
+    unique index on the email rejects duplicates atomically, including
+    concurrent ones, without a separate lookup. The transaction still
+    issues one statement per write it keeps current: the version counter
+    increment, the INSERT, one UPDATE per statistics bucket (three) and,
+    with an idempotency key, the INSERT of its response, then the commit.
+
+    When group commit is enabled (see `app.group_commit`), the candidate is
+    handed to the group committer instead, which creates it in the same
+    transaction as the candidates submitted by concurrent requests, and
+    this call returns once that transaction is committed.
+
     Args:
         firstname: The candidate's first name.
         lastname: The candidate's last name.
         email: The candidate's email address.
         age: The candidate's age.
+        idempotency: Idempotency key of the request, whose response is
+            recorded in the same transaction (default is None).
 
     Raises:
         Conflict: If a candidate with the provided email already exists.
@@ -63,25 +251,170 @@ def create_candidate(
     Returns:
         Optional[Candidate]: The created candidate object, if successful.
     """
+    committer = current_app.extensions.get("candidate_group_commit")
+    if committer is not None:
+        return committer.submit(
+            {"firstname": firstname, "lastname": lastname, "email": email, "age": age},
+            idempotency,
+        )
     try:
-        if Candidate.query.filter_by(email=email).first():
-            logger.info("Duplicate email found: %s", email)
-            raise Conflict(description="Candidate with this email already exists.")
-
         new_candidate = Candidate(
             firstname=firstname, lastname=lastname, email=email, age=age
         )
         db.session.add(new_candidate)
+        bump_collection_version()
+        db.session.flush()
+        data = new_candidate.serialize()
+        adjust_stats(candidate_stat_deltas(None, data))
+        if idempotency is not None:
+            idempotency.record(201, data)
         db.session.commit()
         logger.info("New candidate created: %s", new_candidate.id)
+        candidate_created.send(current_app._get_current_object(), candidate=data)
         return new_candidate
+    except IntegrityError as e:
+        db.session.rollback()
+        if not is_duplicate_key(e):
+            logger.error("Error creating candidate: %s", e, exc_info=True)
+            raise InternalServerError(
+                description="Error creating candidate. Please try again later."
+            ) from e
+        logger.info("Duplicate email found: %s", email)
+        raise Conflict(description="Candidate with this email already exists.") from e
     except SQLAlchemyError as e:
+        db.session.rollback()
         logger.error("Error creating candidate: %s", e, exc_info=True)
         raise InternalServerError(
             description="Error creating candidate. Please try again later."
         ) from e
 
 
+def _insert_together(
+    session: Session,
+    pending: Sequence[Tuple[Dict[str, Any], Optional[IdempotentRequest]]],
+    indexes: Sequence[int],
+    results: List[Any],
+    savepoints: bool,
+) -> List[Dict[str, Any]]:
+    """Insert the pending candidates at `indexes`, storing them in `results`.
+
+    With `savepoints`, each candidate is inserted in its own savepoint, and
+    an integrity error only fails its own candidate (with Conflict for a
+    duplicate). Otherwise all are flushed at once, and an integrity error
+    raises IntegrityError.
+    """
+    bump_collection_version(session)
+    created = []
+    for index in indexes:
+        fields, idempotency = pending[index]
+        candidate = Candidate(**fields)
+        if not savepoints:
+            session.add(candidate)
+            created.append((index, candidate))
+            continue
+        try:
+            with session.begin_nested():
+                session.add(candidate)
+                session.flush([candidate])
+                if idempotency is not None:
+                    idempotency.record(201, candidate.serialize(), session)
+        except IntegrityError as e:
+            if is_duplicate_key(e):
+                results[index] = Conflict(
+                    description="Candidate with this email already exists."
+                )
+            else:
+                logger.error("Error creating candidate: %s", e, exc_info=True)
+                results[index] = InternalServerError(
+                    description="Error creating candidate. Please try again later."
+                )
+            continue
+        created.append((index, candidate))
+
+    session.flush()
+    deltas, data = Counter(), []
+    for index, candidate in created:
+        serialized = candidate.serialize()
+        deltas.update(candidate_stat_deltas(None, serialized))
+        _, idempotency = pending[index]
+        if idempotency is not None and not savepoints:
+            idempotency.record(201, serialized, session)
+        # Detached before the commit expires it, so it stays readable.
+        session.expunge(candidate)
+        results[index] = candidate
+        data.append(serialized)
+    adjust_stats(deltas, session)
+    return data
+
+
+def create_candidates_together(
+    pending: Sequence[Tuple[Dict[str, Any], Optional[IdempotentRequest]]],
+    session: Optional[Session] = None,
+) -> List[Any]:
+    """Create candidates in a single transaction, each succeeding or failing
+    on its own.
+
+    Candidates whose email is already taken, by an existing candidate or an
+    earlier one of `pending`, are set aside with a single query, and the
+    others are inserted with a single flush. Should that still hit an
+    integrity error (e.g. a candidate created concurrently, or one missing a
+    required field), the transaction is retried with each candidate in its
+    own savepoint, so only the offending candidates fail.
+
+    Args:
+        pending: The fields of each candidate (as accepted by `Candidate`),
+            with the idempotency key of its request, if any.
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+
+    Raises:
+        InternalServerError: If an unexpected error occurs, in which case
+            no candidate was created.
+
+    Returns:
+        List[Any]: For each pending candidate, in order, the created
+            candidate (detached from the session), or the exception
+            (Conflict or InternalServerError) to raise to its requester.
+    """
+    session = db.session if session is None else session
+    results: List[Any] = [None] * len(pending)
+    try:
+        emails = [fields["email"] for fields, _ in pending]
+        taken = set(
+            session.scalars(select(Candidate.email).where(Candidate.email.in_(emails)))
+        )
+        indexes = []
+        for index, email in enumerate(emails):
+            if email in taken:
+                results[index] = Conflict(
+                    description="Candidate with this email already exists."
+                )
+            else:
+                taken.add(email)
+                indexes.append(index)
+
+        try:
+            data = _insert_together(session, pending, indexes, results, False)
+            session.commit()
+        except IntegrityError as e:
+            session.rollback()
+            logger.info("Group of candidates rejected, retrying one by one: %s", e)
+            data = _insert_together(session, pending, indexes, results, True)
+            session.commit()
+    except SQLAlchemyError as e:
+        session.rollback()
+        logger.error("Error creating candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error creating candidate. Please try again later."
+        ) from e
+
+    app = current_app._get_current_object()
+    for candidate in data:
+        logger.info("New candidate created: %s", candidate["id"])
+        candidate_created.send(app, candidate=candidate)
+    return results
+
+
 def get_candidate_by_id(candidate_id: int) -> Optional[Candidate]:
     """Retrieve a candidate by ID.
 
@@ -108,51 +441,416 @@ def get_candidate_by_id(candidate_id: int) -> Optional[Candidate]:
         ) from e
 
 
+def bump_collection_version(session: Optional[Session] = None) -> None:
+    """Increment the candidate collection version in the current transaction.
+
+    Every write to the Candidate table calls this before committing, so the
+    version changes whenever any candidate is created, updated or deleted.
+    It must be called before the write statements are executed: they stamp
+    the rows they write with the new version (`Candidate.change_seq`).
+    Pending ORM changes are not flushed before the increment.
+
+    The counter row is created by `flask db create`. Should it be missing,
+    the first writer inserts it in a savepoint; a concurrent first writer
+    that loses the race increments the row inserted by the winner.
+
+    Args:
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+    """
+    session = db.session if session is None else session
+    increment = (
+        update(CollectionVersion)
+        .where(CollectionVersion.name == Candidate.__tablename__)
+        .values(version=CollectionVersion.version + 1)
+    )
+    with session.no_autoflush:
+        if session.execute(increment).rowcount:
+            return
+        try:
+            with session.begin_nested():
+                session.execute(
+                    insert(CollectionVersion).values(
+                        name=Candidate.__tablename__, version=1
+                    )
+                )
+        except IntegrityError:
+            session.execute(increment)
+
+
+def record_tombstones(
+    candidate_ids: Sequence[int], session: Optional[Session] = None
+) -> None:
+    """Record the deletion of candidates in the current transaction.
+
+    Call this after `bump_collection_version`, so the tombstones are
+    stamped with the version of the deletion. An ID deleted before (IDs
+    may be reused, or given explicitly) has its tombstone replaced, so it
+    is stamped with the latest deletion.
+
+    Args:
+        candidate_ids: IDs of the deleted candidates.
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+    """
+    session = db.session if session is None else session
+    if candidate_ids:
+        session.execute(
+            delete(CandidateTombstone)
+            .where(CandidateTombstone.candidate_id.in_(candidate_ids))
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(
+            insert(CandidateTombstone),
+            [{"candidate_id": candidate_id} for candidate_id in candidate_ids],
+        )
+
+
+def get_collection_version(session: Optional[Session] = None) -> int:
+    """Return the current version of the candidate collection.
+
+    Args:
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        int: The collection version (0 before the first write).
+    """
+    session = db.session if session is None else session
+    try:
+        with replica_reads(session):
+            version = session.execute(
+                select(CollectionVersion.version).where(
+                    CollectionVersion.name == Candidate.__tablename__
+                )
+            ).scalar()
+        return version or 0
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving collection version: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving candidates. Please try again later."
+        ) from e
+
+
+def get_candidate_data(candidate_id: int) -> Optional[Dict[str, Any]]:
+    """Retrieve a serialized candidate by ID through the read-through cache.
+
+    Cache misses fall through to `get_candidate_by_id` and populate the
+    cache; the entry is invalidated when the candidate is updated or
+    deleted (see `app.cache`).
+
+    Args:
+        candidate_id: The ID of the candidate to retrieve.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Optional[Dict[str, Any]]: The serialized candidate if found,
+            otherwise None.
+    """
+    key = candidate_cache_key(candidate_id)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    if cache.enabled:
+        # Misses are read from the primary: an entry read from a lagging
+        # replica could outlive the invalidation of a newer version.
+        candidate = get_candidate_by_id(candidate_id)
+    else:
+        with replica_reads():
+            candidate = get_candidate_by_id(candidate_id)
+    if candidate is None:
+        return None
+
+    data = candidate.serialize()
+    cache.set(key, data)
+    return data
+
+
+def apply_filters(query, filters: Optional[dict], model=Candidate):
+    """Restrict a query to candidates matching optional filters.
+
+    Args:
+        query: ORM query or select statement over the Candidate table.
+        filters: Optional filters as a dictionary of `field` or
+            `field__operator` keys, as accepted by `compile_filters`.
+        model: Model the query selects from (default is Candidate, or
+            ArchivedCandidate for archived candidates).
+
+    Raises:
+        BadRequest: If a filter is unknown or its value is invalid.
+
+    Returns:
+        The filtered query.
+    """
+    if filters:
+        query = query.filter(*compile_filters(filters, model))
+    return query
+
+
+def _select_tiers(
+    fields: Sequence[str],
+    filters: Optional[dict],
+    order_by: Sequence[str],
+    limit: int,
+    condition: Optional[Callable[[Any], Any]] = None,
+):
+    """Select candidates from both the current and the archived ones.
+
+    Each table is filtered, sorted and limited on its own indexes, so the
+    union holds at most `limit` rows per table before it is sorted again.
+    Rows carry an `archived` column telling which table they come from.
+
+    Args:
+        fields: Candidate fields to select; the `order_by` fields are
+            selected as well.
+        filters: Optional filters, as accepted by `apply_filters`.
+        order_by: Fields to sort by.
+        limit: Maximum number of rows read from each table.
+        condition: Optional function returning an extra condition on the
+            model it is given.
+
+    Returns:
+        The select statement, sorted by `order_by`, without a limit.
+    """
+    fields = [
+        field for field in CANDIDATE_FIELDS if field in fields or field in order_by
+    ]
+    tiers = []
+    for model, archived in ((Candidate, False), (ArchivedCandidate, True)):
+        query = apply_filters(
+            select(
+                *candidate_columns(fields, model),
+                literal(archived, Boolean).label("archived"),
+            ),
+            filters,
+            model,
+        )
+        if condition is not None:
+            query = query.where(condition(model))
+        query = query.order_by(*(getattr(model, field) for field in order_by))
+        # Wrapped in a subquery, since some backends do not accept a limit
+        # on the members of a UNION.
+        tiers.append(select(query.limit(limit).subquery()))
+    union = union_all(*tiers).subquery()
+    return select(union).order_by(*(union.c[field] for field in order_by))
+
+
 def get_all_candidates(
-    page: int = 1, per_page: int = 10, filters: dict = None
-) -> List[Candidate]:
+    page: int = 1,
+    per_page: int = 10,
+    filters: dict = None,
+    fields: Sequence[str] = CANDIDATE_FIELDS,
+    session: Optional[Session] = None,
+    include_archived: bool = False,
+) -> List[Row]:
     """Retrieve all candidates with pagination and optional filters.
 
+    Only the requested columns are selected, and candidates are returned as
+    lightweight row tuples rather than ORM objects.
+
+    Archived candidates are only included on request: the union with the
+    archive reads up to `page * per_page` rows from each table.
+
     Args:
         page: Page number for pagination (default is 1).
         per_page: Number of candidates per page (default is 10).
         filters: Optional filters as a dictionary (e.g., {'age': 25, 'lastname': 'Doe'}).
+        fields: Candidate fields to select (default is every field).
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+        include_archived: Whether to include archived candidates, whose
+            rows have `archived` set (default is False).
+
+    Raises:
+        BadRequest: If a filter is unknown or its value is invalid.
+        InternalServerError: If an unexpected error occurs during retrieval.
 
     Returns:
-        List[Candidate]: List of candidates based on provided filters and pagination.
+        List[Row]: List of candidates based on provided filters and pagination.
     """
+    if include_archived:
+        query = _select_tiers(fields, filters, ("id",), page * per_page)
+    else:
+        query = apply_filters(select(*candidate_columns(fields)), filters)
+        query = query.order_by(Candidate.id)
+    query = query.limit(per_page).offset((page - 1) * per_page)
+
+    session = db.session if session is None else session
     try:
-        query = Candidate.query
+        with replica_reads(session):
+            return session.execute(query).all()
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving candidates. Please try again later."
+        ) from e
 
-        if filters:
-            for key, value in filters.items():
-                query = query.filter(getattr(Candidate, key) == value)
 
-        candidates = query.paginate(page, per_page, error_out=False).items
-        return candidates
+def _decode_candidate_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor into the (created_at, id) position it points after."""
+    try:
+        created_at, candidate_id = decode_cursor(cursor)
+        return datetime.fromisoformat(created_at), int(candidate_id)
+    except (TypeError, ValueError) as e:
+        raise BadRequest(description="Invalid pagination cursor.") from e
+
+
+def get_candidates_after(
+    after: Optional[str] = None,
+    limit: int = 10,
+    filters: dict = None,
+    fields: Sequence[str] = CANDIDATE_FIELDS,
+    session: Optional[Session] = None,
+    include_archived: bool = False,
+) -> Tuple[List[Row], Optional[str]]:
+    """Retrieve a page of candidates using keyset (cursor) pagination.
+
+    Candidates are ordered by `(created_at, id)`, and each page seeks
+    directly past the previous one on the matching composite index, so
+    deep pages cost the same as the first one.
+
+    Args:
+        after: Cursor returned with the previous page, or None for the
+            first page.
+        limit: Maximum number of candidates to return (default is 10).
+        filters: Optional filters as a dictionary (e.g., {'age': 25}).
+        fields: Candidate fields to select (default is every field). The
+            `created_at` and `id` columns are always selected as well, since
+            the cursor is built from them.
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+        include_archived: Whether to include archived candidates, whose
+            rows have `archived` set (default is False).
+
+    Raises:
+        BadRequest: If the cursor is malformed or a filter is unknown.
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Tuple[List[Row], Optional[str]]: The candidates on the page and the
+            cursor of the next page, or None on the last page.
+    """
+    condition = None
+    if after:
+        created_at, candidate_id = _decode_candidate_cursor(after)
+
+        def condition(model):
+            return or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > candidate_id),
+            )
+
+    if include_archived:
+        query = _select_tiers(
+            fields, filters, ("created_at", "id"), limit + 1, condition
+        )
+    else:
+        columns = candidate_columns(
+            field
+            for field in CANDIDATE_FIELDS
+            if field in fields or field in ("id", "created_at")
+        )
+        query = apply_filters(select(*columns), filters).order_by(
+            Candidate.created_at, Candidate.id
+        )
+        if condition is not None:
+            query = query.filter(condition(Candidate))
 
-    except Exception as e:
+    session = db.session if session is None else session
+    try:
+        with replica_reads(session):
+            candidates = session.execute(query.limit(limit + 1)).all()
+    except SQLAlchemyError as e:
         logger.error("Error retrieving candidates: %s", e, exc_info=True)
         raise InternalServerError(
             description="Error retrieving candidates. Please try again later."
         ) from e
 
+    if len(candidates) <= limit:
+        return candidates, None
+
+    candidates = candidates[:limit]
+    last = candidates[-1]
+    return candidates, encode_cursor(last.created_at.isoformat(), last.id)
+
+
+def count_candidates(
+    filters: dict = None,
+    session: Optional[Session] = None,
+    include_archived: bool = False,
+) -> int:
+    """Count the candidates matching optional filters.
+
+    Args:
+        filters: Optional filters as a dictionary (e.g., {'lastname': 'Doe'}).
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+        include_archived: Whether to count archived candidates as well
+            (default is False).
+
+    Raises:
+        BadRequest: If a filter is unknown or its value is invalid.
+        InternalServerError: If an unexpected error occurs while counting.
+
+    Returns:
+        int: Number of matching candidates.
+    """
+    session = db.session if session is None else session
+    try:
+        models = (Candidate, ArchivedCandidate) if include_archived else (Candidate,)
+        with replica_reads(session):
+            return sum(
+                session.execute(
+                    apply_filters(select(func.count(model.id)), filters, model)
+                ).scalar_one()
+                for model in models
+            )
+    except SQLAlchemyError as e:
+        logger.error("Error counting candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error counting candidates. Please try again later."
+        ) from e
+
 
 def update_candidate(candidate: Candidate, new_data: Dict[str, Any]) -> None:
     """Update a candidate's information.
 
     Args:
         candidate: The candidate object to update.
-        new_data: Dictionary containing updated data for the candidate.
+        new_data: Dictionary containing updated data for the candidate, as
+            validated by `validate_candidate_data`. Only `UPDATABLE_FIELDS`
+            are applied.
 
     Raises:
+        Conflict: If the candidate was updated concurrently.
         InternalServerError: If an unexpected error occurs during update.
     """
     try:
+        previous = candidate.serialize()
         for key, value in new_data.items():
-            setattr(candidate, key, value)
+            if key in UPDATABLE_FIELDS:
+                setattr(candidate, key, value)
+        bump_collection_version()
+        db.session.flush()
+        data = candidate.serialize()
+        adjust_stats(candidate_stat_deltas(previous, data))
         db.session.commit()
         logger.info("Candidate %s updated successfully", candidate.id)
+        candidate_updated.send(
+            current_app._get_current_object(), candidate=data, previous=previous
+        )
+    except StaleDataError as e:
+        db.session.rollback()
+        logger.info("Concurrent update of candidate %s", candidate.id)
+        raise Conflict(
+            description="Candidate was modified by another request. Please retry."
+        ) from e
     except SQLAlchemyError as e:
         logger.error("Error updating candidate: %s", e, exc_info=True)
         raise InternalServerError(
@@ -170,9 +868,14 @@ def delete_candidate(candidate: Candidate) -> None:
         InternalServerError: If an unexpected error occurs during deletion.
     """
     try:
+        data = candidate.serialize()
         db.session.delete(candidate)
+        bump_collection_version()
+        record_tombstones([data["id"]])
+        adjust_stats(candidate_stat_deltas(data, None))
         db.session.commit()
         logger.info("Candidate %s deleted successfully", candidate.id)
+        candidate_deleted.send(current_app._get_current_object(), candidate=data)
     except SQLAlchemyError as e:
         logger.error("Error deleting candidate: %s", e, exc_info=True)
         raise InternalServerError(
@@ -0,0 +1,334 @@
+"""Candidate Change Feed Handler
+
+Module for syncing candidates incrementally: listing only the candidates
+created, updated or deleted since a client last synced, instead of reading
+the whole table again.
+
+Every write stamps the rows it writes with the candidate collection version
+it incremented (`Candidate.change_seq`), and deletions leave a tombstone
+stamped the same way (`CandidateTombstone`). Since writers increment the
+version under a row lock held until they commit, versions are committed in
+order, so reading rows and tombstones past a (version, ID) position in
+that order never skips a committed change.
+
+A position is handed to clients as an opaque token. A token also records
+the version at which the client started syncing: tombstones are purged
+after `CHANGE_FEED_TOMBSTONE_DAYS` days (see `purge_tombstones`), and a
+client whose token predates purged tombstones must sync from scratch.
+
+Functions:
+    get_changes:
+        Return a page of the changes made since a token.
+
+        Example:
+            get_changes(since='WzQyLDcsMF0', limit=100)
+
+    stream_changes:
+        Return an iterator of server-sent events pushing changes as they
+        are committed.
+
+        Example:
+            stream_changes(since='WzQyLDcsMF0', poll_seconds=1)
+
+    purge_tombstones:
+        Delete the tombstones of candidates deleted more than a given
+        number of days ago.
+
+        Example:
+            purge_tombstones(days=30)
+"""
+
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from werkzeug.exceptions import BadRequest, Gone, InternalServerError
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SQLAlchemyError
+from flask import Flask
+from app.models import candidates, db
+from app.models.routing import read_engine
+from app.models.tombstones import CandidateTombstone
+from app.models.versions import CollectionVersion
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, encode_json
+from app.serializers import row_to_dict
+from app.signals import candidate_created, candidate_deleted, candidate_updated
+from app.utils import decode_cursor, encode_cursor, utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+# Name of the counter recording the version up to which tombstones were
+# purged.
+PURGED_COUNTER = "candidate_tombstone"
+
+# (change_seq, id) of the last change a client has seen, and the collection
+# version at which it started syncing.
+Position = Tuple[int, int, int]
+
+# Notified by the candidate signals, to wake up the streams of this process
+# as soon as a change is committed rather than at their next poll.
+_committed = threading.Condition()
+
+
+def _read_counter(connection: Connection, name: str) -> int:
+    return (
+        connection.execute(
+            select(CollectionVersion.version).where(CollectionVersion.name == name)
+        ).scalar()
+        or 0
+    )
+
+
+def _start(connection: Connection, since: Optional[str]) -> Position:
+    """Decode a token, or start a sync from scratch without one."""
+    if since is None:
+        # Candidates deleted after this are covered by their tombstones.
+        return (-1, 0, _read_counter(connection, Candidate.__tablename__))
+    try:
+        position = tuple(decode_cursor(since))
+        change_seq, candidate_id, started = position
+        if not all(isinstance(value, int) for value in position):
+            raise ValueError(since)
+    except (TypeError, ValueError) as e:
+        raise BadRequest(description="Invalid change token.") from e
+
+    if _read_counter(connection, PURGED_COUNTER) > max(change_seq, started):
+        raise Gone(description="Change token expired. Sync again without a token.")
+    return position
+
+
+def _token(position: Position) -> str:
+    return encode_cursor(*position)
+
+
+def _after(seq_column, id_column, position: Position):
+    change_seq, candidate_id, _ = position
+    return or_(
+        seq_column > change_seq,
+        and_(seq_column == change_seq, id_column > candidate_id),
+    )
+
+
+def _read_changes(
+    connection: Connection, position: Position, limit: int
+) -> List[Tuple[Position, Dict[str, Any]]]:
+    """Read up to `limit` + 1 changes past a position, in order."""
+    rows = connection.execute(
+        select(Candidate.change_seq, *candidate_columns(CANDIDATE_FIELDS))
+        .where(_after(Candidate.change_seq, Candidate.id, position))
+        .order_by(Candidate.change_seq, Candidate.id)
+        .limit(limit + 1)
+    ).all()
+    # Candidates deleted before the client started syncing were never sent.
+    tombstones = connection.execute(
+        select(CandidateTombstone.change_seq, CandidateTombstone.candidate_id)
+        .where(
+            _after(
+                CandidateTombstone.change_seq, CandidateTombstone.candidate_id, position
+            ),
+            CandidateTombstone.change_seq > position[2],
+        )
+        .order_by(CandidateTombstone.change_seq, CandidateTombstone.candidate_id)
+        .limit(limit + 1)
+    ).all()
+
+    started = position[2]
+    changes = [
+        (
+            (row.change_seq, row.id, started),
+            {"op": "upsert", "id": row.id, "candidate": row_to_dict(row)},
+        )
+        for row in rows
+    ] + [
+        ((change_seq, candidate_id, started), {"op": "delete", "id": candidate_id})
+        for change_seq, candidate_id in tombstones
+    ]
+    changes.sort(key=lambda change: change[0])
+    return changes[: limit + 1]
+
+
+def get_changes(since: Optional[str] = None, limit: int = 100) -> Dict[str, Any]:
+    """Return a page of the changes made since a token.
+
+    Args:
+        since: Token returned by a previous call, or None to sync from
+            scratch (every candidate is then returned as a change).
+        limit: Maximum number of changes (default is 100).
+
+    Raises:
+        BadRequest: If the token is malformed.
+        Gone: If the token predates purged tombstones.
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Dict[str, Any]: The `changes`, in commit order, each with its `op`
+            ('upsert' with the `candidate`, or 'delete') and candidate `id`;
+            the `next_token` to pass next time; and whether there are
+            `more` changes past it.
+    """
+    try:
+        with read_engine().connect() as connection:
+            position = _start(connection, since)
+            changes = _read_changes(connection, position, limit)
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving candidate changes: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving changes. Please try again later."
+        ) from e
+
+    more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        position = changes[-1][0]
+    return {
+        "changes": [change for _, change in changes],
+        "next_token": _token(position),
+        "more": more,
+    }
+
+
+def _event(position: Position, change: Dict[str, Any]) -> bytes:
+    return (
+        f"id: {_token(position)}\nevent: {change['op']}\ndata: ".encode()
+        + encode_json(change)
+        + b"\n\n"
+    )
+
+
+def stream_changes(
+    since: Optional[str] = None,
+    poll_seconds: float = 1.0,
+    max_seconds: float = 300.0,
+    heartbeat_seconds: float = 15.0,
+    batch_size: int = 500,
+) -> Iterator[bytes]:
+    """Return an iterator of server-sent events pushing changes as they
+    are committed.
+
+    Each change is sent as an event named after its `op`, whose data is the
+    change (as in `get_changes`) and whose ID is the token following it, so
+    an `EventSource` reconnecting with `Last-Event-ID` resumes where it
+    stopped.
+
+    The token is checked before this function returns. The stream then
+    looks for changes whenever a write is committed by this process, and
+    otherwise every `poll_seconds` (a primary key lookup of the collection
+    version, so changes made by other processes are picked up too). No
+    connection is held between polls.
+
+    Args:
+        since: Token to resume from, or None to sync from scratch.
+        poll_seconds: Longest wait between checks for changes (default 1).
+        max_seconds: How long to stream before ending the response, letting
+            the client reconnect (default 300).
+        heartbeat_seconds: How often to send a comment on an idle stream,
+            to keep proxies from closing it (default 15).
+        batch_size: Maximum number of changes read at a time (default 500).
+
+    Raises:
+        BadRequest: If the token is malformed.
+        Gone: If the token predates purged tombstones.
+        InternalServerError: If an unexpected error occurs checking it.
+
+    Returns:
+        Iterator[bytes]: The encoded events.
+    """
+    engine = read_engine()
+    try:
+        with engine.connect() as connection:
+            position = _start(connection, since)
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving candidate changes: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving changes. Please try again later."
+        ) from e
+
+    def generate() -> Iterator[bytes]:
+        nonlocal position
+        yield f"retry: {int(poll_seconds * 1000)}\n\n".encode()
+        deadline = time.monotonic() + max_seconds
+        seen_version, sent_at = None, time.monotonic()
+        while time.monotonic() < deadline:
+            changes = []
+            with engine.connect() as connection:
+                version = _read_counter(connection, Candidate.__tablename__)
+                if version != seen_version:
+                    changes = _read_changes(connection, position, batch_size)
+                    if len(changes) <= batch_size:
+                        seen_version = version
+            for position, change in changes[:batch_size]:
+                yield _event(position, change)
+            if len(changes) > batch_size:
+                continue
+            if changes:
+                sent_at = time.monotonic()
+            elif time.monotonic() - sent_at >= heartbeat_seconds:
+                yield b": keep-alive\n\n"
+                sent_at = time.monotonic()
+            with _committed:
+                _committed.wait(timeout=poll_seconds)
+
+    return generate()
+
+
+def purge_tombstones(days: float) -> Dict[str, Any]:
+    """Delete the tombstones of candidates deleted more than `days` ago.
+
+    Clients whose tokens predate the purged tombstones are answered with
+    410 Gone, and must sync from scratch.
+
+    Args:
+        days: How long tombstones are kept.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during the purge.
+
+    Returns:
+        Dict[str, Any]: The number of `purged` tombstones, and the version
+            up to which tombstones are now purged (`purged_through`).
+    """
+    try:
+        through = db.session.execute(
+            select(func.max(CandidateTombstone.change_seq)).where(
+                CandidateTombstone.deleted_at < utcnow() - timedelta(days=days)
+            )
+        ).scalar()
+        if through is None:
+            db.session.rollback()
+            return {"purged": 0, "purged_through": None}
+
+        # Tombstones left by previous purges are all newer than they were,
+        # so `through` only moves forward. It is recorded first, so no token
+        # predating the purge is accepted while tombstones are deleted.
+        result = db.session.execute(
+            update(CollectionVersion)
+            .where(CollectionVersion.name == PURGED_COUNTER)
+            .values(version=through)
+        )
+        if result.rowcount == 0:
+            db.session.add(CollectionVersion(name=PURGED_COUNTER, version=through))
+        purged = db.session.execute(
+            delete(CandidateTombstone).where(CandidateTombstone.change_seq <= through)
+        ).rowcount
+        db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error purging tombstones: %s", e, exc_info=True)
+        raise InternalServerError(description="Error purging tombstones.") from e
+
+    logger.info("Purged %s tombstones through version %s", purged, through)
+    return {"purged": purged, "purged_through": through}
+
+
+# pylint: disable=unused-argument
+@candidate_created.connect
+@candidate_updated.connect
+@candidate_deleted.connect
+def _wake_streams(app: Flask, **extra) -> None:
+    """Wake up the change streams of this process."""
+    with _committed:
+        _committed.notify_all()
@@ -0,0 +1,259 @@
+"""Candidate Filter Compiler
+
+Module for compiling request filters into SQL conditions on the Candidate
+table.
+
+Filters are given as `field` or `field__operator` keys, e.g.
+`{'lastname__startswith': 'Sm', 'age__gte': '21'}`. Only whitelisted fields
+can be filtered on, and values are coerced to the column type. Each field
+has an index on Candidate, which serves its equality, range, `in`,
+`between` and `startswith` filters:
+
+    ========================  ===========================================
+    Field                     Index
+    ========================  ===========================================
+    id                        primary key
+    email                     unique index on email
+    firstname                 ix_candidate_firstname
+    lastname                  ix_candidate_lastname_firstname
+    age                       ix_candidate_age_created_at_id
+    created_at                ix_candidate_created_at_id
+    updated_at                ix_candidate_updated_at_id
+    ========================  ===========================================
+
+SQLite, which estimates one-sided ranges (`gt`, `gte`, `lt`, `lte`)
+without statistics, serves those on fields other than `id` by walking
+the primary key when pages are sorted by ID (`page`/`per_page`). The
+plans are checked by `tests/test_filter_plans.py`.
+
+Operators:
+    eq (default), ne, gt, gte, lt, lte: Comparisons. `ne` cannot be served
+        by an index: unless other filters narrow the rows down, it scans
+        the candidates.
+    in: Any of a comma-separated list (or a JSON list) of values.
+    between: Inclusive range given as 'low,high' (or a two-item list).
+    startswith: Prefix match on string fields, compiled to an index range.
+
+Functions:
+    compile_filters:
+        Compile filters into a list of SQL conditions.
+
+        Example:
+            compile_filters({'age__between': '21,30', 'lastname': 'Doe'})
+
+    compile_predicate:
+        Compile filters into a function testing a serialized candidate.
+
+        Example:
+            compile_predicate({'age__gte': 21})({'age': 30, ...})
+"""
+
+from datetime import datetime
+from operator import eq, ge, gt, le, lt, ne
+from typing import Any, Callable, Dict, List, Mapping, Tuple
+from werkzeug.exceptions import BadRequest
+from sqlalchemy import and_
+from sqlalchemy.sql.elements import ColumnElement
+from app.models.candidates import Candidate
+
+MAX_IN_VALUES = 1000
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+# Filterable field: (type coercion, supported operators).
+RANGE_OPERATORS = ("eq", "ne", "gt", "gte", "lt", "lte", "in", "between")
+STRING_OPERATORS = RANGE_OPERATORS + ("startswith",)
+
+FILTERABLE_FIELDS: Dict[str, Tuple[Callable[[Any], Any], Tuple[str, ...]]] = {
+    "id": (int, RANGE_OPERATORS),
+    "firstname": (str, STRING_OPERATORS),
+    "lastname": (str, STRING_OPERATORS),
+    "email": (str, STRING_OPERATORS),
+    "age": (int, RANGE_OPERATORS),
+    "created_at": (datetime.fromisoformat, RANGE_OPERATORS),
+    "updated_at": (datetime.fromisoformat, RANGE_OPERATORS),
+}
+
+
+def _coerce(field: str, coerce: Callable[[Any], Any], value: Any) -> Any:
+    """Coerce a single filter value to the type of `field`."""
+    if isinstance(value, bool) or isinstance(value, (list, dict)):
+        raise BadRequest(description=f"Invalid value for '{field}': {value!r}.")
+    try:
+        return coerce(value)
+    except (TypeError, ValueError) as e:
+        raise BadRequest(description=f"Invalid value for '{field}': {value!r}.") from e
+
+
+def _split(value: Any) -> List[Any]:
+    """Return the items of a list filter value."""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",")]
+    return [value]
+
+
+def _prefix_condition(column, prefix: str) -> ColumnElement:
+    """Compile a prefix match that can be answered with an index range scan.
+
+    The half-open range [prefix, next prefix) lets every backend seek on the
+    column index; the LIKE keeps the exact prefix semantics within it.
+    """
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    condition = and_(column >= prefix, column.like(f"{escaped}%", escape="\\"))
+    if ord(prefix[-1]) < 0x10FFFF:
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        condition = and_(condition, column < upper)
+    return condition
+
+
+def _parse(field: str, operator: str, value: Any) -> Any:
+    """Validate a single filter and coerce its value (or values)."""
+    coerce, operators = FILTERABLE_FIELDS[field]
+    if operator not in operators:
+        raise BadRequest(
+            description=f"Operator '{operator}' is not supported for '{field}'."
+        )
+
+    if operator == "in":
+        values = [_coerce(field, coerce, item) for item in _split(value)]
+        if not 0 < len(values) <= MAX_IN_VALUES:
+            raise BadRequest(
+                description=f"'{field}__in' takes 1 to {MAX_IN_VALUES} values."
+            )
+        return values
+
+    if operator == "between":
+        bounds = _split(value)
+        if len(bounds) != 2:
+            raise BadRequest(description=f"'{field}__between' takes two values.")
+        return tuple(_coerce(field, coerce, bound) for bound in bounds)
+
+    value = _coerce(field, coerce, value)
+    if operator == "startswith" and not value:
+        raise BadRequest(description=f"'{field}__startswith' needs a prefix.")
+    return value
+
+
+def _compile(field: str, operator: str, value: Any, model) -> ColumnElement:
+    """Compile a single filter into an SQL condition."""
+    value = _parse(field, operator, value)
+    column = getattr(model, field)
+    if operator == "in":
+        return column.in_(value)
+    if operator == "between":
+        return column.between(*value)
+    if operator == "startswith":
+        return _prefix_condition(column, value)
+    return {
+        "eq": column.__eq__,
+        "ne": column.__ne__,
+        "gt": column.__gt__,
+        "gte": column.__ge__,
+        "lt": column.__lt__,
+        "lte": column.__le__,
+    }[operator](value)
+
+
+COMPARISONS = {
+    "eq": eq,
+    "ne": ne,
+    "gt": gt,
+    "gte": ge,
+    "lt": lt,
+    "lte": le,
+    "in": lambda actual, values: actual in values,
+    "between": lambda actual, bounds: bounds[0] <= actual <= bounds[1],
+    "startswith": str.startswith,
+}
+
+
+def compile_filters(filters: Mapping[str, Any], model=Candidate) -> List[ColumnElement]:
+    """Compile filters into a list of SQL conditions.
+
+    Args:
+        filters: Mapping of `field` or `field__operator` keys to values.
+            Values may be strings (as in query parameters) or already typed
+            (as in JSON bodies).
+        model: Model whose columns are filtered (default is Candidate; the
+            archived candidates of `app.models.archive` have the same).
+
+    Raises:
+        BadRequest: If a field is not filterable, an operator is unknown or
+            not supported for the field, or a value cannot be coerced.
+
+    Returns:
+        List[ColumnElement]: The conditions, to be combined with AND.
+    """
+    conditions = []
+    for key, value in filters.items():
+        field, _, operator = key.partition("__")
+        if field not in FILTERABLE_FIELDS:
+            raise BadRequest(description=f"Unknown filter: '{key}'.")
+        conditions.append(_compile(field, operator or "eq", value, model))
+    return conditions
+
+
+def _fold(value: Any) -> Any:
+    """Case-fold a string filter value (or values)."""
+    if isinstance(value, str):
+        return value.casefold()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_fold(item) for item in value)
+    return value
+
+
+def compile_predicate(
+    filters: Mapping[str, Any], fold_case: bool = False
+) -> Callable[[Mapping], bool]:
+    """Compile filters into a function testing a serialized candidate.
+
+    The function agrees with the SQL conditions of `compile_filters`: a
+    candidate matches when all filters hold, and a NULL (None) field
+    matches no filter. Strings are compared code point by code point, as
+    with a binary collation, or ignoring case with `fold_case`, as with
+    the case-insensitive collations MySQL uses by default. Collations
+    that also ignore accents, or sort differently, may still disagree.
+
+    Args:
+        filters: Mapping of `field` or `field__operator` keys to values,
+            as accepted by `compile_filters`.
+        fold_case: Whether string fields are compared ignoring case
+            (default is False).
+
+    Raises:
+        BadRequest: If a filter is invalid, as with `compile_filters`.
+
+    Returns:
+        Callable[[Mapping], bool]: Function of a candidate, as serialized by
+            `Candidate.serialize`, telling whether it matches.
+    """
+    tests = []
+    for key, value in filters.items():
+        field, _, operator = key.partition("__")
+        if field not in FILTERABLE_FIELDS:
+            raise BadRequest(description=f"Unknown filter: '{key}'.")
+        operator = operator or "eq"
+        value = _parse(field, operator, value)
+        folded = fold_case and FILTERABLE_FIELDS[field][0] is str
+        tests.append(
+            (field, COMPARISONS[operator], _fold(value) if folded else value, folded)
+        )
+
+    def matches(candidate: Mapping) -> bool:
+        for field, compare, value, folded in tests:
+            actual = candidate.get(field)
+            if actual is None:
+                return False
+            if isinstance(actual, str) and field in DATETIME_FIELDS:
+                actual = datetime.fromisoformat(actual)
+            elif folded and isinstance(actual, str):
+                actual = actual.casefold()
+            try:
+                if not compare(actual, value):
+                    return False
+            except TypeError:  # e.g. naive vs. aware datetimes
+                return False
+        return True
+
+    return matches
@@ -0,0 +1,202 @@
+"""Idempotency Handler
+
+Module recording the responses of requests made with an `Idempotency-Key`
+header, so that clients can safely retry a write (e.g. after a timeout):
+a retry with the same key and body replays the recorded response, without
+repeating the write or reading the written table.
+
+A successful write records its response in the same transaction as the
+write (see `IdempotentRequest.record`), so a write is never committed
+without its key, even if the process dies before answering. Responses are
+kept for `IDEMPOTENCY_KEY_TTL` seconds; expired keys are deleted at most
+once a minute per process, which bounds the size of the store.
+
+Classes:
+    IdempotentRequest: A request made with an idempotency key.
+
+Functions:
+    idempotent_request:
+        Return the idempotent request for a key, if a key was given.
+
+        Example:
+            idempotent_request('candidates.create', 'a1b2c3', {'email': ...})
+
+    purge_expired_keys:
+        Delete the keys recorded more than a given number of seconds ago.
+
+        Example:
+            purge_expired_keys(86400)
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Optional, Tuple
+from werkzeug.exceptions import BadRequest, InternalServerError, UnprocessableEntity
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from flask import current_app
+from app.models import db
+from app.models.idempotency import IdempotencyKey
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+PURGE_INTERVAL_SECONDS = 60
+
+_purged_at = 0.0
+
+
+class IdempotentRequest:
+    """A request made with an idempotency key.
+
+    Args:
+        scope: Name of the operation the key is used for.
+        key: The idempotency key sent by the client.
+        payload: The JSON body of the request.
+        ttl: How long recorded responses are replayed, in seconds.
+    """
+
+    def __init__(self, scope: str, key: str, payload: Any, ttl: float):
+        self.scope = scope
+        self.key = key
+        self.fingerprint = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        self.ttl = ttl
+
+    def replay(self) -> Optional[Tuple[int, str]]:
+        """Return the recorded response of the key, if any.
+
+        Raises:
+            UnprocessableEntity: If the key was used with a different body.
+            InternalServerError: If an unexpected error occurs during lookup.
+
+        Returns:
+            Optional[Tuple[int, str]]: The status code and JSON body of the
+                recorded response, or None if the key was not used yet.
+        """
+        try:
+            recorded = db.session.get(
+                IdempotencyKey, (self.scope, self.key), populate_existing=True
+            )
+            if recorded is not None and recorded.created_at < utcnow() - timedelta(
+                seconds=self.ttl
+            ):
+                db.session.delete(recorded)
+                db.session.commit()
+                recorded = None
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.error("Error retrieving idempotency key: %s", e, exc_info=True)
+            raise InternalServerError(
+                description="Error retrieving idempotency key. Please try again later."
+            ) from e
+        if recorded is None:
+            return None
+        if recorded.fingerprint != self.fingerprint:
+            raise UnprocessableEntity(
+                description="Idempotency-Key was already used with a different request."
+            )
+        logger.info("Replaying response of idempotency key: %s", self.key)
+        return recorded.status_code, recorded.response
+
+    def record(
+        self, status_code: int, body: Any, session: Optional[Session] = None
+    ) -> None:
+        """Add the response of the key to the current transaction.
+
+        Call this before committing the write the response describes.
+
+        Args:
+            status_code: Status code of the response.
+            body: JSON-serializable body of the response.
+            session: Session of the write (default is the application's
+                Flask-SQLAlchemy session).
+        """
+        session = db.session if session is None else session
+        session.add(
+            IdempotencyKey(
+                scope=self.scope,
+                key=self.key,
+                fingerprint=self.fingerprint,
+                status_code=status_code,
+                response=json.dumps(body),
+            )
+        )
+
+    def save(self, status_code: int, body: Any) -> None:
+        """Record the response of a request that wrote nothing (e.g. a 409).
+
+        If another request recorded the key first, its response is kept.
+        """
+        try:
+            self.record(status_code, body)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning("Error recording idempotency key: %s", e, exc_info=True)
+
+
+def purge_expired_keys(ttl: float) -> int:
+    """Delete the keys recorded more than `ttl` seconds ago.
+
+    Args:
+        ttl: How long responses are kept, in seconds.
+
+    Returns:
+        int: The number of deleted keys.
+    """
+    result = db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.created_at < utcnow() - timedelta(seconds=ttl)
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def idempotent_request(
+    scope: str, key: Optional[str], payload: Any
+) -> Optional[IdempotentRequest]:
+    """Return the idempotent request for a key, if a key was given.
+
+    Also deletes the expired keys, if that was not done in the last minute.
+
+    Args:
+        scope: Name of the operation, e.g. 'candidates.create'.
+        key: Value of the `Idempotency-Key` header, if any.
+        payload: The JSON body of the request.
+
+    Raises:
+        BadRequest: If the key is empty or too long.
+
+    Returns:
+        Optional[IdempotentRequest]: The idempotent request, or None
+            without a key.
+    """
+    global _purged_at  # pylint: disable=global-statement
+    if key is None:
+        return None
+    if not 0 < len(key) <= MAX_KEY_LENGTH:
+        raise BadRequest(
+            description=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters."
+        )
+
+    ttl = float(current_app.config.get("IDEMPOTENCY_KEY_TTL", 86400))
+    if time.monotonic() - _purged_at > PURGE_INTERVAL_SECONDS:
+        _purged_at = time.monotonic()
+        try:
+            purged = purge_expired_keys(ttl)
+            if purged:
+                logger.info("Purged %s expired idempotency keys", purged)
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            logger.warning("Error purging idempotency keys: %s", e, exc_info=True)
+    return IdempotentRequest(scope, key, payload, ttl)
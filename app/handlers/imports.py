@@ -0,0 +1,257 @@
+"""Candidate Import Handler
+
+Module for importing candidates in bulk from streamed NDJSON or CSV input.
+
+Rows are parsed and validated one at a time and written in batches: each
+batch is deduplicated on email, checked against the `email` unique index
+with a single SELECT, inserted with one multi-row INSERT and committed in
+its own transaction. Only the current batch and a bounded error report are
+kept in memory, so imports run in constant memory regardless of input size.
+
+Functions:
+    iter_ndjson_rows:
+        Parse newline-delimited JSON candidates from a binary stream.
+
+        Example:
+            iter_ndjson_rows(request.stream)
+
+    iter_csv_rows:
+        Parse CSV candidates (with a header row) from a binary stream.
+
+        Example:
+            iter_csv_rows(request.stream)
+
+    import_candidates:
+        Validate and insert parsed rows in batches.
+
+        Example:
+            import_candidates(iter_csv_rows(stream), batch_size=1000)
+"""
+
+import csv
+import io
+import json
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from werkzeug.exceptions import BadRequest, InternalServerError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import candidates, db
+from app.handlers.candidates import (
+    bump_collection_version,
+    is_duplicate_key,
+    validate_candidate_data,
+)
+from app.handlers.stats import adjust_stats, candidate_stat_deltas
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+# A parsed row: its line number in the input and either the decoded
+# candidate fields or the exception raised while decoding them.
+Row = Tuple[int, Any]
+
+
+def _text_stream(stream) -> io.TextIOWrapper:
+    """Wrap a binary request stream for line-by-line text decoding."""
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding="utf-8", newline="")
+
+
+def iter_ndjson_rows(stream) -> Iterator[Row]:
+    """Parse newline-delimited JSON candidates from a binary stream.
+
+    Args:
+        stream: Binary stream with one JSON object per line.
+
+    Yields:
+        Row: The line number and the decoded object, or a BadRequest if the
+            line is not valid JSON. Blank lines are skipped.
+    """
+    for line_number, line in enumerate(_text_stream(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, BadRequest(description="Invalid JSON.")
+
+
+def iter_csv_rows(stream) -> Iterator[Row]:
+    """Parse CSV candidates (with a header row) from a binary stream.
+
+    Args:
+        stream: Binary stream whose first row names the candidate fields.
+
+    Yields:
+        Row: The line number and the row as a dictionary. Empty cells are
+            passed on as empty strings.
+    """
+    reader = csv.DictReader(_text_stream(stream))
+    for row in reader:
+        if None in row:
+            yield reader.line_num, BadRequest(description="Too many columns.")
+        else:
+            yield reader.line_num, row
+
+
+class ImportReport:
+    """Outcome of an import, with a bounded list of per-row errors."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.inserted = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def reject(self, line: int, message: str) -> None:
+        """Record a rejected row."""
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the report as a JSON-serializable dictionary."""
+        return {
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "errors_truncated": self.rejected > len(self.errors),
+        }
+
+
+def _stat_deltas(rows: Iterable[Dict[str, Any]]) -> Counter:
+    """Return the statistic deltas of inserting `rows`."""
+    deltas = Counter()
+    for data in rows:
+        deltas.update(candidate_stat_deltas(None, data))
+    return deltas
+
+
+def _insert_batch(batch: List[Tuple[int, Dict[str, Any]]], report: ImportReport):
+    """Insert a batch of validated rows in a single transaction."""
+    emails = [data["email"] for _, data in batch]
+    existing = set(
+        db.session.execute(
+            select(Candidate.email).where(Candidate.email.in_(emails))
+        ).scalars()
+    )
+
+    rows = []
+    for line, data in batch:
+        if data["email"] in existing:
+            report.reject(line, "Candidate with this email already exists.")
+        else:
+            rows.append((line, data))
+
+    if not rows:
+        db.session.rollback()
+        return
+
+    # Timestamps are set here rather than by the column defaults so the
+    # sign-up statistics can be updated without reading the rows back.
+    now = utcnow()
+    for _, data in rows:
+        data["created_at"] = data["updated_at"] = now
+
+    try:
+        bump_collection_version()
+        db.session.execute(insert(Candidate), [data for _, data in rows])
+        adjust_stats(_stat_deltas(data for _, data in rows))
+        db.session.commit()
+        report.inserted += len(rows)
+    except IntegrityError:
+        # A concurrent writer or a case-insensitive collation let a duplicate
+        # through the checks above, or a row breaks another constraint;
+        # retry row by row to isolate it.
+        db.session.rollback()
+        bump_collection_version()
+        inserted = []
+        for line, data in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(Candidate), [data])
+                inserted.append(data)
+            except IntegrityError as e:
+                if is_duplicate_key(e):
+                    report.reject(line, "Candidate with this email already exists.")
+                    continue
+                # Not a duplicate: a constraint validation does not know of.
+                logger.warning("Imported row %s rejected: %s", line, e.orig)
+                report.reject(line, "Candidate violates a database constraint.")
+        adjust_stats(_stat_deltas(inserted))
+        db.session.commit()
+        report.inserted += len(inserted)
+
+
+def import_candidates(
+    rows: Iterable[Row], batch_size: int = 1000, max_errors: int = 1000
+) -> Dict[str, Any]:
+    """Validate and insert parsed rows in batches.
+
+    Args:
+        rows: Parsed rows, as produced by `iter_ndjson_rows` or `iter_csv_rows`.
+        batch_size: Number of rows written per INSERT and transaction
+            (default is 1000).
+        max_errors: Maximum number of per-row errors kept in the report;
+            further rejections are only counted (default is 1000).
+
+    Raises:
+        BadRequest: If the input is not UTF-8 encoded.
+        InternalServerError: If an unexpected error occurs while writing a
+            batch. Batches committed before the failure are kept.
+
+    Returns:
+        Dict[str, Any]: Inserted and rejected counts and the per-row errors.
+    """
+    report = ImportReport(max_errors)
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+    batch_emails = set()
+
+    try:
+        for line, data in rows:
+            if isinstance(data, BadRequest):
+                report.reject(line, data.description)
+                continue
+            try:
+                data = validate_candidate_data(data)
+            except BadRequest as e:
+                report.reject(line, e.description)
+                continue
+
+            if data["email"] in batch_emails:
+                report.reject(line, "Duplicate email in import.")
+                continue
+
+            batch.append((line, data))
+            batch_emails.add(data["email"])
+            if len(batch) >= batch_size:
+                _insert_batch(batch, report)
+                batch, batch_emails = [], set()
+
+        if batch:
+            _insert_batch(batch, report)
+    except UnicodeDecodeError as e:
+        db.session.rollback()
+        raise BadRequest(
+            description=(
+                f"Input must be UTF-8 encoded. Import stopped after "
+                f"{report.inserted} candidates were created."
+            )
+        ) from e
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error importing candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description=(
+                f"Import stopped after {report.inserted} candidates were created. "
+                "Please fix the input or try again later."
+            )
+        ) from e
+
+    logger.info(
+        "Imported %s candidates (%s rejected)", report.inserted, report.rejected
+    )
+    return report.to_dict()
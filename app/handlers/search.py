@@ -0,0 +1,73 @@
+"""Candidate Search Handler
+
+Module for ranked fuzzy search over candidate names and emails.
+
+Functions:
+    search_candidates:
+        Search candidates by partial or misspelled name or email.
+
+        Example:
+            search_candidates('jon smyth', limit=10)
+"""
+
+import logging
+from typing import Any, Dict, List, Sequence
+from werkzeug.exceptions import InternalServerError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import candidates, db
+from app.models.routing import replica_reads
+from app.search import search_index
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, row_to_dict
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+
+def search_candidates(
+    query: str, limit: int = 10, fields: Sequence[str] = CANDIDATE_FIELDS
+) -> List[Dict[str, Any]]:
+    """Search candidates by partial or misspelled name or email.
+
+    Candidates are ranked with the in-memory trigram index and the matches
+    are then read by primary key, so results always reflect the current
+    rows and candidates deleted by other processes are left out.
+
+    Args:
+        query: Free-text query.
+        limit: Maximum number of results (default is 10).
+        fields: Candidate fields to return (default is every field).
+
+    Raises:
+        ServiceUnavailable: If the search index is still loading.
+        InternalServerError: If an unexpected error occurs during the search.
+
+    Returns:
+        List[Dict[str, Any]]: The matching candidates with their `score`,
+            best match first.
+    """
+    try:
+        ranked = search_index.search(query, limit)
+        if not ranked:
+            return []
+
+        columns = candidate_columns(
+            field for field in CANDIDATE_FIELDS if field in fields or field == "id"
+        )
+        with replica_reads():
+            rows = db.session.execute(
+                select(*columns).where(Candidate.id.in_([id_ for id_, _ in ranked]))
+            ).all()
+    except SQLAlchemyError as e:
+        logger.error("Error searching candidates: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error searching candidates. Please try again later."
+        ) from e
+
+    rows_by_id = {row.id: row for row in rows}
+    return [
+        {**row_to_dict(rows_by_id[candidate_id], fields), "score": score}
+        for candidate_id, score in ranked
+        if candidate_id in rows_by_id
+    ]
@@ -0,0 +1,328 @@
+"""Segment Handler
+
+Module for defining audience segments and sizing and previewing them.
+
+Definitions are stored in the `segment` table; sizes and previews are
+answered from the bitmaps kept in memory by `app.segments`, only the
+candidates of a preview are read from the database, by primary key.
+
+Segments are combined with expressions: a segment name, or an object with
+a single operator over a list of expressions:
+
+    "twenties"
+    {"union": ["twenties", "thirties"]}
+    {"intersect": ["twenties", {"union": ["does", "smiths"]}]}
+    {"exclude": ["twenties", "contacted"]}   (the first minus the others)
+
+Functions:
+    validate_segment_data:
+        Validate and normalize the fields of a segment definition.
+
+        Example:
+            validate_segment_data({'name': 'twenties', 'filter': {...}})
+
+    create_segment:
+        Define a new segment.
+
+        Example:
+            create_segment({'name': 'twenties', 'filter': {'age__lt': 30}})
+
+    update_segment:
+        Change the filters of a segment.
+
+        Example:
+            update_segment('twenties', {'filter': {'age__between': '20,29'}})
+
+    delete_segment:
+        Delete a segment definition.
+
+        Example:
+            delete_segment('twenties')
+
+    list_segments:
+        Return every segment definition with its size.
+
+        Example:
+            list_segments()
+
+    query_segments:
+        Size a segment expression and preview its first candidates.
+
+        Example:
+            query_segments({'exclude': ['twenties', 'contacted']}, limit=20)
+"""
+
+import json
+import logging
+import re
+from typing import Any, Dict, List
+from werkzeug.exceptions import BadRequest, Conflict, InternalServerError, NotFound
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from app.models import candidates, db
+from app.models.routing import replica_reads
+from app.models.segments import Segment
+from app.handlers.filters import compile_filters
+from app.segments import iter_ids, segments
+from app.serializers import CANDIDATE_FIELDS, candidate_columns, row_to_dict
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+SEGMENT_NAME = re.compile(r"^[A-Za-z0-9_-]{1,100}$")
+OPERATORS = ("union", "intersect", "exclude")
+MAX_EXPRESSION_TERMS = 100
+
+
+def validate_segment_data(data: Dict[str, Any], partial: bool = False) -> dict:
+    """Validate and normalize the fields of a segment definition.
+
+    Args:
+        data: Segment fields: `name` (letters, digits, '-' and '_') and
+            `filter`, an object of filters (empty for every candidate).
+        partial: Whether `name` may be omitted, as in an update (default
+            is False).
+
+    Raises:
+        BadRequest: If a field is unknown, missing or invalid.
+
+    Returns:
+        dict: The normalized fields, with the filters JSON-encoded.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest(description="Segment data must be an object.")
+    unknown = set(data) - {"name", "filter"}
+    if unknown:
+        raise BadRequest(description=f"Unknown fields: {', '.join(sorted(unknown))}.")
+
+    cleaned = {}
+    if not partial or "name" in data:
+        name = data.get("name")
+        if not isinstance(name, str) or not SEGMENT_NAME.match(name):
+            raise BadRequest(
+                description="'name' must be 1 to 100 letters, digits, '-' or '_'."
+            )
+        cleaned["name"] = name
+
+    filters = data.get("filter")
+    if not isinstance(filters, dict):
+        raise BadRequest(description="'filter' must be an object.")
+    compile_filters(filters)
+    cleaned["filters"] = json.dumps(filters, sort_keys=True)
+    return cleaned
+
+
+def _commit(action: str) -> None:
+    try:
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        raise Conflict(description="A segment with this name already exists.") from e
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.error("Error %s segment: %s", action, e, exc_info=True)
+        raise InternalServerError(
+            description=f"Error {action} segment. Please try again later."
+        ) from e
+    segments.reload()
+
+
+def _get_segment(name: str) -> Segment:
+    try:
+        segment = db.session.execute(
+            select(Segment).where(Segment.name == name)
+        ).scalar()
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving segment: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving segment. Please try again later."
+        ) from e
+    if segment is None:
+        raise NotFound(description="Segment not found.")
+    return segment
+
+
+def create_segment(data: Dict[str, Any]) -> Segment:
+    """Define a new segment.
+
+    Args:
+        data: Segment fields, as accepted by `validate_segment_data`.
+
+    Raises:
+        BadRequest: If a field is invalid.
+        Conflict: If a segment with the same name exists.
+        InternalServerError: If an unexpected error occurs during creation.
+
+    Returns:
+        Segment: The created segment.
+    """
+    segment = Segment(**validate_segment_data(data))
+    db.session.add(segment)
+    _commit("creating")
+    logger.info("New segment defined: %s", segment.name)
+    return segment
+
+
+def update_segment(name: str, data: Dict[str, Any]) -> Segment:
+    """Change the filters (and optionally the name) of a segment.
+
+    Args:
+        name: Name of the segment to update.
+        data: New segment fields, as accepted by `validate_segment_data`.
+
+    Raises:
+        BadRequest: If a field is invalid.
+        NotFound: If the segment does not exist.
+        Conflict: If renamed to the name of another segment.
+        InternalServerError: If an unexpected error occurs during the update.
+
+    Returns:
+        Segment: The updated segment.
+    """
+    changes = validate_segment_data(data, partial=True)
+    segment = _get_segment(name)
+    for field, value in changes.items():
+        setattr(segment, field, value)
+    _commit("updating")
+    return segment
+
+
+def delete_segment(name: str) -> None:
+    """Delete a segment definition.
+
+    Args:
+        name: Name of the segment to delete.
+
+    Raises:
+        NotFound: If the segment does not exist.
+        InternalServerError: If an unexpected error occurs during deletion.
+    """
+    db.session.delete(_get_segment(name))
+    _commit("deleting")
+
+
+def _materialized():
+    try:
+        return segments.current()
+    except SQLAlchemyError as e:
+        logger.error("Error materializing segments: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error loading segments. Please try again later."
+        ) from e
+
+
+def list_segments() -> List[Dict[str, Any]]:
+    """Return every segment definition with its size.
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        List[Dict[str, Any]]: The segments, by name, with their `size`.
+    """
+    materialized = _materialized()
+    try:
+        definitions = db.session.execute(select(Segment).order_by(Segment.name))
+        definitions = definitions.scalars().all()
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving segments: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving segments. Please try again later."
+        ) from e
+    return [
+        {
+            **segment.serialize(),
+            "size": (
+                len(materialized[segment.name].bitmap)
+                if segment.name in materialized
+                else None
+            ),
+        }
+        for segment in definitions
+    ]
+
+
+def _evaluate(expression: Any, materialized: dict, terms: List[int]) -> int:
+    """Evaluate a segment expression into a bitmap integer."""
+    terms[0] += 1
+    if terms[0] > MAX_EXPRESSION_TERMS:
+        raise BadRequest(
+            description=f"Expressions may have at most {MAX_EXPRESSION_TERMS} terms."
+        )
+    if isinstance(expression, str):
+        segment = materialized.get(expression)
+        if segment is None:
+            raise BadRequest(description=f"Unknown segment: '{expression}'.")
+        return segment.bitmap.to_int()
+
+    if (
+        not isinstance(expression, dict)
+        or len(expression) != 1
+        or next(iter(expression)) not in OPERATORS
+    ):
+        raise BadRequest(
+            description=(
+                "An expression is a segment name or an object with one of "
+                f"{', '.join(OPERATORS)}."
+            )
+        )
+    operator, operands = next(iter(expression.items()))
+    if not isinstance(operands, list) or not operands:
+        raise BadRequest(description=f"'{operator}' takes a non-empty list.")
+
+    bits = [_evaluate(operand, materialized, terms) for operand in operands]
+    result = bits[0]
+    for other in bits[1:]:
+        if operator == "union":
+            result |= other
+        elif operator == "intersect":
+            result &= other
+        else:
+            result &= ~other
+    return result
+
+
+def query_segments(expression: Any, limit: int = 20, after: int = 0) -> Dict[str, Any]:
+    """Size a segment expression and preview its first candidates.
+
+    Args:
+        expression: Segment name, or combination of segments (see the
+            module documentation).
+        limit: Number of candidates to preview (default is 20, 0 to only
+            size the expression).
+        after: Preview candidates with IDs greater than this one, to page
+            through the preview (default is 0).
+
+    Raises:
+        BadRequest: If the expression is invalid or names an unknown
+            segment.
+        InternalServerError: If an unexpected error occurs.
+
+    Returns:
+        Dict[str, Any]: The `size` of the expression and the `candidates`
+            of the preview, in ID order.
+    """
+    bits = _evaluate(expression, _materialized(), [0])
+    ids = []
+    if limit:
+        for candidate_id in iter_ids(bits, after):
+            ids.append(candidate_id)
+            if len(ids) == limit:
+                break
+
+    rows = []
+    if ids:
+        try:
+            with replica_reads(db.session):
+                rows = db.session.execute(
+                    select(*candidate_columns(CANDIDATE_FIELDS))
+                    .where(Candidate.id.in_(ids))
+                    .order_by(Candidate.id)
+                ).all()
+        except SQLAlchemyError as e:
+            logger.error("Error previewing segment: %s", e, exc_info=True)
+            raise InternalServerError(
+                description="Error previewing segment. Please try again later."
+            ) from e
+    return {"size": bits.bit_count(), "candidates": [row_to_dict(row) for row in rows]}
@@ -0,0 +1,295 @@
+"""Candidate Statistics Handler
+
+Module for the materialized candidate statistics served to the dashboard:
+the number of candidates, their age distribution and daily sign-ups.
+
+The statistics are kept in the `candidate_stat` summary table (see
+`app.models.stats`) instead of being aggregated over the Candidate table on
+every request. Every write to the Candidate table applies its deltas with
+`adjust_stats` in the same transaction, and `reconcile_stats` recomputes
+them from scratch to detect and repair drift, e.g. after rows were written
+outside of the handlers.
+
+Functions:
+    candidate_stat_deltas:
+        Return the statistic deltas of a change to a candidate.
+
+        Example:
+            candidate_stat_deltas(None, {'age': 30, 'created_at': created_at})
+
+    adjust_stats:
+        Apply statistic deltas in the current transaction.
+
+        Example:
+            adjust_stats(candidate_stat_deltas(previous, data))
+
+    get_stats:
+        Return the candidate count, age distribution and daily sign-ups.
+
+        Example:
+            get_stats(days=30)
+
+    reconcile_stats:
+        Recompute the statistics from the Candidate table and repair drift.
+
+        Example:
+            reconcile_stats(fix=True)
+"""
+
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Mapping, Optional, Tuple, Union
+from werkzeug.exceptions import InternalServerError
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import candidates, db
+from app.models.routing import replica_reads
+from app.models.stats import CandidateStat
+from app.models.versions import CollectionVersion
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+Candidate = candidates.Candidate
+
+TOTAL = "total"
+AGE = "age"
+SIGNUP_DAY = "signup_day"
+UNKNOWN = "unknown"
+
+# A statistic bucket: (statistic, bucket).
+Bucket = Tuple[str, str]
+
+
+def _age_bucket(age: Optional[int]) -> str:
+    return UNKNOWN if age is None else str(age)
+
+
+def _day_bucket(created_at: Union[datetime, date, str, None]) -> str:
+    if created_at is None:
+        return UNKNOWN
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is not None:
+            created_at = created_at.astimezone(timezone.utc)
+        created_at = created_at.date()
+    return created_at.isoformat()
+
+
+def _buckets(candidate: Mapping[str, Any]) -> List[Bucket]:
+    return [
+        (TOTAL, ""),
+        (AGE, _age_bucket(candidate.get("age"))),
+        (SIGNUP_DAY, _day_bucket(candidate.get("created_at"))),
+    ]
+
+
+def candidate_stat_deltas(
+    before: Optional[Mapping[str, Any]], after: Optional[Mapping[str, Any]]
+) -> Counter:
+    """Return the statistic deltas of a change to a candidate.
+
+    Args:
+        before: The candidate's `age` and `created_at` before the change, or
+            None if it was created.
+        after: The candidate's `age` and `created_at` after the change, or
+            None if it was deleted.
+
+    Returns:
+        Counter: Delta of each affected (statistic, bucket) pair.
+    """
+    deltas = Counter()
+    if after is not None:
+        deltas.update(_buckets(after))
+    if before is not None:
+        deltas.subtract(_buckets(before))
+    return deltas
+
+
+def adjust_stats(
+    deltas: Mapping[Bucket, int], session: Optional[Session] = None
+) -> None:
+    """Apply statistic deltas in the current transaction.
+
+    Buckets are updated in a fixed order so concurrent writers lock them in
+    the same order. A bucket seen for the first time is inserted in a
+    savepoint, falling back to an update if another writer created it
+    first.
+
+    Args:
+        deltas: Delta of each (statistic, bucket) pair, as returned by
+            `candidate_stat_deltas`.
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+    """
+    session = db.session if session is None else session
+    for (statistic, bucket), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        increment = (
+            update(CandidateStat)
+            .where(CandidateStat.statistic == statistic, CandidateStat.bucket == bucket)
+            .values(count=CandidateStat.count + delta)
+        )
+        if session.execute(increment).rowcount:
+            continue
+        try:
+            with session.begin_nested():
+                session.execute(
+                    insert(CandidateStat).values(
+                        statistic=statistic, bucket=bucket, count=delta
+                    )
+                )
+        except IntegrityError:
+            session.execute(increment)
+
+
+def get_stats(days: int = 30, session: Optional[Session] = None) -> Dict[str, Any]:
+    """Return the candidate count, age distribution and daily sign-ups.
+
+    Args:
+        days: Number of days of sign-ups to return, ending today (UTC)
+            (default is 30).
+        session: Session to use (default is the application's
+            Flask-SQLAlchemy session).
+
+    Raises:
+        InternalServerError: If an unexpected error occurs during retrieval.
+
+    Returns:
+        Dict[str, Any]: The `total` number of candidates, the number of
+            candidates per `ages` entry (null for an unknown age) and the
+            number of `signups` per day, including days without any.
+    """
+    today = utcnow().date()
+    since = today - timedelta(days=days - 1)
+    session = db.session if session is None else session
+    try:
+        with replica_reads(session):
+            rows = session.execute(
+                select(CandidateStat).where(
+                    or_(
+                        CandidateStat.statistic.in_((TOTAL, AGE)),
+                        (CandidateStat.statistic == SIGNUP_DAY)
+                        & (CandidateStat.bucket >= since.isoformat()),
+                    )
+                )
+            ).scalars()
+        counts = {(row.statistic, row.bucket): row.count for row in rows}
+    except SQLAlchemyError as e:
+        logger.error("Error retrieving candidate statistics: %s", e, exc_info=True)
+        raise InternalServerError(
+            description="Error retrieving statistics. Please try again later."
+        ) from e
+
+    ages = [
+        (None if bucket == UNKNOWN else int(bucket), count)
+        for (statistic, bucket), count in counts.items()
+        if statistic == AGE and count
+    ]
+    ages.sort(key=lambda age: (age[0] is None, age[0] or 0))
+    signup_days = (since + timedelta(days=offset) for offset in range(days))
+    return {
+        "total": counts.get((TOTAL, ""), 0),
+        "ages": [{"age": age, "count": count} for age, count in ages],
+        "signups": [
+            {"date": day.isoformat(), "count": counts.get((SIGNUP_DAY, str(day)), 0)}
+            for day in signup_days
+        ],
+    }
+
+
+def _expected_stats() -> Dict[Bucket, int]:
+    """Aggregate the statistics over the whole Candidate table."""
+    expected = {
+        (TOTAL, ""): db.session.execute(select(func.count(Candidate.id))).scalar_one()
+    }
+    for age, count in db.session.execute(
+        select(Candidate.age, func.count()).group_by(Candidate.age)
+    ):
+        expected[(AGE, _age_bucket(age))] = count
+    signup_day = func.date(Candidate.created_at)
+    for day, count in db.session.execute(
+        select(signup_day, func.count()).group_by(signup_day)
+    ):
+        expected[(SIGNUP_DAY, _day_bucket(day))] = count
+    return expected
+
+
+def reconcile_stats(fix: bool = True) -> Dict[str, Any]:
+    """Recompute the statistics from the Candidate table and repair drift.
+
+    The candidate collection version row is locked first (on backends that
+    support row locks), which holds back concurrent writers until the
+    statistics are repaired, so their deltas are neither lost nor counted
+    twice.
+
+    Args:
+        fix: Whether to correct the drifted buckets, or only report them
+            (default is True).
+
+    Raises:
+        SQLAlchemyError: If an unexpected database error occurs.
+
+    Returns:
+        Dict[str, Any]: The number of buckets checked, the drifted buckets
+            with their `expected` and `actual` counts, and whether they
+            were fixed.
+    """
+    try:
+        db.session.execute(
+            select(CollectionVersion.version)
+            .where(CollectionVersion.name == Candidate.__tablename__)
+            .with_for_update()
+        )
+        expected = _expected_stats()
+        actual = {
+            (row.statistic, row.bucket): row.count
+            for row in db.session.execute(select(CandidateStat)).scalars()
+        }
+
+        drift = [
+            {
+                "statistic": statistic,
+                "bucket": bucket,
+                "expected": expected.get((statistic, bucket), 0),
+                "actual": actual.get((statistic, bucket), 0),
+            }
+            for statistic, bucket in sorted(set(expected) | set(actual))
+            if expected.get((statistic, bucket), 0)
+            != actual.get((statistic, bucket), 0)
+        ]
+        if drift and fix:
+            adjust_stats(
+                {
+                    (item["statistic"], item["bucket"]): item["expected"]
+                    - item["actual"]
+                    for item in drift
+                }
+            )
+            # The statistics changed: invalidate the ETags derived from
+            # the collection version.
+            db.session.execute(
+                update(CollectionVersion)
+                .where(CollectionVersion.name == Candidate.__tablename__)
+                .values(version=CollectionVersion.version + 1)
+            )
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+    if drift:
+        logger.warning(
+            "Candidate statistics drifted in %s buckets%s",
+            len(drift),
+            " (fixed)" if fix else "",
+        )
+    return {
+        "checked": len(set(expected) | set(actual)),
+        "drift": drift,
+        "fixed": bool(drift) and fix,
+    }
@@ -0,0 +1,225 @@
+"""Request metrics
+
+Module recording latency, concurrency, response size and database time of
+every request, and exposing them in the Prometheus text format at
+`/metrics`.
+
+Metrics are labelled with the Flask endpoint (e.g. 'v1.get_all' or
+'views.list_candidates') rather than the URL, so their number stays
+bounded. Streamed responses, such as exports, are observed when the server
+closes them, after their last byte has been sent, so their duration, size
+and database time cover the whole stream; those closed unread (e.g. HEAD
+requests) are observed too.
+
+Metrics are kept with `prometheus_client`. When the application runs in
+several worker processes, set the `PROMETHEUS_MULTIPROC_DIR` environment
+variable to an empty directory shared by the workers (before they start):
+each worker then writes its samples to memory-mapped files there, and
+`/metrics` returns the aggregate of all workers whichever one serves it.
+The server should call `prometheus_client.multiprocess.mark_process_dead`
+with the PID of every worker that exits, as `gunicorn.conf.py` does.
+
+Classes:
+    RequestTimer: Start time and database time of a request.
+    RequestMetrics: Flask extension instrumenting an application.
+
+Example:
+    >>> from app.metrics import metrics
+    >>> metrics.init_app(app)
+    >>> app.test_client().get("/metrics").data
+    b'# HELP admitdash_http_request_duration_seconds ...'
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, Tuple
+from flask import Flask, Response, g, has_app_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+from sqlalchemy import event
+from app.models import db
+
+NAMESPACE = "admitdash"
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, float("inf"))
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("endpoint", "method", "status"),
+    namespace=NAMESPACE,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled.",
+    ("endpoint", "method"),
+    namespace=NAMESPACE,
+    multiprocess_mode="livesum",
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Size of response bodies.",
+    ("endpoint",),
+    namespace=NAMESPACE,
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL statements while handling a request.",
+    ("endpoint",),
+    namespace=NAMESPACE,
+)
+
+
+class RequestTimer:
+    """Start time and database time of a request."""
+
+    __slots__ = ("started", "db_seconds")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+
+
+class _ByteCounter:
+    """Body passing the chunks of a streamed response through, counting them.
+
+    Unlike a generator wrapping the body, closing it does not depend on it
+    having been iterated: the server closes the bodies it never reads
+    (HEAD requests, 204 and 304 responses, disconnected clients) too.
+    """
+
+    __slots__ = ("chunks", "size")
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = chunks
+        self.size = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.chunks:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        """Close the wrapped body."""
+        if hasattr(self.chunks, "close"):
+            self.chunks.close()
+
+
+def _before_cursor_execute(conn, *args) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, *args) -> None:
+    started = conn.info["metrics_started"].pop()
+    if has_app_context():
+        timer = g.get("request_timer")
+        if timer is not None:
+            timer.db_seconds += time.perf_counter() - started
+
+
+def _handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    stack = connection.info.get("metrics_started") if connection else None
+    if stack:
+        stack.pop()
+
+
+# Labelled children by label values: looking them up with `labels()` on
+# every request costs more than observing them.
+_in_progress: Dict[Tuple[str, str], Any] = {}
+_series: Dict[Tuple[str, str, int], Tuple[Any, Any, Any]] = {}
+
+
+def _in_progress_gauge(endpoint: str, method: str):
+    key = (endpoint, method)
+    gauge = _in_progress.get(key)
+    if gauge is None:
+        gauge = _in_progress[key] = REQUESTS_IN_PROGRESS.labels(endpoint, method)
+    return gauge
+
+
+def _request_series(endpoint: str, method: str, status: int):
+    key = (endpoint, method, status)
+    series = _series.get(key)
+    if series is None:
+        series = _series[key] = (
+            REQUEST_DURATION.labels(endpoint, method, str(status)),
+            RESPONSE_SIZE.labels(endpoint),
+            REQUEST_DB_DURATION.labels(endpoint),
+        )
+    return series
+
+
+def _start_request() -> None:
+    endpoint = request.endpoint or "none"
+    if endpoint == "metrics":
+        return
+    g.request_timer = RequestTimer()
+    _in_progress_gauge(endpoint, request.method).inc()
+
+
+def _finish_request(response: Response) -> Response:
+    timer = g.get("request_timer")
+    if timer is None:
+        return response
+    endpoint, method = request.endpoint or "none", request.method
+    in_progress = _in_progress_gauge(endpoint, method)
+    duration, response_size, db_duration = _request_series(
+        endpoint, method, response.status_code
+    )
+
+    def observe(size: int) -> None:
+        duration.observe(time.perf_counter() - timer.started)
+        in_progress.dec()
+        response_size.observe(size)
+        db_duration.observe(timer.db_seconds)
+
+    if response.is_streamed:
+        # Observed when the server closes the response, read or not.
+        body = response.response = _ByteCounter(response.response)
+        response.call_on_close(lambda: observe(body.size))
+    else:
+        observe(response.content_length or 0)
+    return response
+
+
+def _registry() -> CollectorRegistry:
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def _metrics_view() -> Response:
+    """Export the metrics of every worker in the Prometheus text format."""
+    return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+class RequestMetrics:
+    """Flask extension instrumenting the requests of an application.
+
+    Must be initialized after `db.init_app`, whose engines it instruments.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Register the request hooks, SQL timers and `/metrics` route."""
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+        app.add_url_rule("/metrics", "metrics", _metrics_view, methods=["GET"])
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+                event.listen(engine, "handle_error", _handle_error)
+
+
+metrics = RequestMetrics()
@@ -0,0 +1,55 @@
+"""Archived Candidate Database Model
+
+This module defines the ArchivedCandidate class, the cold tier of the
+candidates: candidates from past intakes are moved out of the Candidate
+table into this one (see `app.handlers.archive`), keeping the Candidate
+table and its indexes small for the queries that only need current
+candidates.
+
+An archived candidate keeps its ID, so it can be restored as it was.
+Emails are only unique among current candidates: a past applicant may
+apply again while their old record is archived.
+
+Classes:
+    ArchivedCandidate: Represents an archived candidate.
+
+Example:
+    # Look up an archived candidate
+    db.session.get(ArchivedCandidate, 42)
+"""
+
+from sqlalchemy.dialects import mysql
+from app.utils import utcnow
+from . import db
+
+
+# pylint: disable=too-few-public-methods
+class ArchivedCandidate(db.Model):
+    """ArchivedCandidate Model
+
+    Represents an archived candidate, with the columns of `Candidate` it
+    is restored from and the time it was archived at (`archived_at`).
+    """
+
+    __tablename__ = "candidate_archive"
+    __table_args__ = (
+        db.Index("ix_candidate_archive_created_at_id", "created_at", "id"),
+        db.Index("ix_candidate_archive_lastname_firstname", "lastname", "firstname"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    firstname = db.Column(db.String(100), nullable=False)
+    lastname = db.Column(db.String(100))
+    email = db.Column(db.String(80), nullable=False, index=True)
+    age = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime(timezone=True))
+    updated_at = db.Column(
+        db.DateTime(timezone=True).with_variant(mysql.DATETIME(fsp=6), "mysql")
+    )
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    archived_at = db.Column(
+        db.DateTime(timezone=True),
+        default=utcnow,
+        server_default=db.func.now(),
+        nullable=False,
+    )
@@ -0,0 +1,125 @@
+"""Async database access
+
+This module provides the database extension of the asyncio application
+(see `app.asgi`): an async SQLAlchemy engine on the same database as the
+Flask application, reached through an async driver, and a session factory.
+
+The database URL is taken from `ASYNC_DATABASE_URL`, or derived from
+`SQLALCHEMY_DATABASE_URI` by swapping in the async driver of its backend:
+
+    ========  ==================
+    Backend   Async driver
+    ========  ==================
+    mysql     mysql+aiomysql
+    sqlite    sqlite+aiosqlite
+    ========  ==================
+
+Functions:
+    async_database_url: Return the async driver URL of a database URL.
+
+Classes:
+    AsyncDatabase: Extension managing the async engine of an application.
+
+Example:
+    >>> from app.models.async_db import async_db
+    >>> async_db.init_app(app)
+    >>> async with async_db.session() as session:
+    ...     await session.get(Candidate, 1)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from quart import Quart, current_app
+
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    """Return the async driver URL of a database URL.
+
+    Args:
+        url: Database URL using any driver of a supported backend.
+
+    Raises:
+        ValueError: If no async driver is known for the backend.
+
+    Returns:
+        str: The same URL with the async driver of its backend.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver is known for '{backend}' databases.")
+    return parsed.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+class AsyncDatabase:
+    """Extension managing the async engine of an application.
+
+    Settings:
+        ASYNC_DATABASE_URL: Database URL with an async driver (default is
+            derived from SQLALCHEMY_DATABASE_URI).
+        ASYNC_DATABASE_POOL_SIZE: Connections kept open by the pool.
+        ASYNC_DATABASE_MAX_OVERFLOW: Extra connections opened under load.
+        SQLALCHEMY_ENGINE_OPTIONS: `pool_recycle` and `pool_pre_ping` are
+            shared with the Flask application's engines.
+    """
+
+    def init_app(self, app: Quart) -> None:
+        """Create the engine and session factory of `app`.
+
+        No connection is opened until the first session is used, and the
+        engine's connections are closed when the application stops serving.
+        The schema is provisioned with `flask db create`.
+        """
+        url = app.config.get("ASYNC_DATABASE_URL") or async_database_url(
+            app.config["SQLALCHEMY_DATABASE_URI"]
+        )
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        pool_size = app.config.get("ASYNC_DATABASE_POOL_SIZE", 20)
+        max_overflow = app.config.get("ASYNC_DATABASE_MAX_OVERFLOW", 10)
+        # The aiosqlite dialect otherwise opens a connection per session.
+        engine = create_async_engine(
+            url,
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=options.get("pool_recycle", -1),
+            pool_pre_ping=options.get("pool_pre_ping", False),
+        )
+        app.extensions["async_database"] = async_sessionmaker(
+            engine, expire_on_commit=False
+        )
+        # Sessions wait for a connection in arrival order: the pool's own
+        # queue does not guarantee it, which starves some requests under load.
+        app.extensions["async_database_slots"] = asyncio.Semaphore(
+            pool_size + max_overflow
+        )
+
+        @app.after_serving
+        async def dispose_engine():
+            await engine.dispose()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        """Open a session of the current application.
+
+        Sessions are handed out first come, first served, and at most as
+        many at once as the pool has connections.
+        """
+        async with current_app.extensions["async_database_slots"]:
+            async with current_app.extensions["async_database"]() as session:
+                yield session
+
+
+async_db = AsyncDatabase()
@@ -0,0 +1,114 @@
+"""Campaign Database Models
+
+This module defines the email campaign classes: a campaign holds the
+templates of a message and the filters selecting its audience, and each of
+its messages, rendered for one candidate, is kept in a durable outbox
+until it has been sent.
+
+Message statuses:
+    pending: Waiting to be sent, from `next_attempt_at` on.
+    sending: Claimed by a dispatcher worker until `locked_until`.
+    sent: Accepted by the SMTP server.
+    failed: Permanently rejected, or out of attempts.
+
+Classes:
+    Campaign: An email campaign.
+    CampaignMessage: A message of a campaign to one candidate.
+
+Example:
+    # Count the messages of campaign 1 still waiting to be sent
+    CampaignMessage.query.filter_by(campaign_id=1, status="pending").count()
+"""
+
+import json
+from sqlalchemy.dialects import mysql
+from app.utils import utcnow
+from . import db
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+
+# pylint: disable=too-few-public-methods
+class Campaign(db.Model):
+    """Campaign Model
+
+    Represents an email campaign. `subject` and `body` are templates
+    rendered with the fields of each candidate of the audience, which is
+    selected by `filters` (JSON-encoded, as accepted by
+    `app.handlers.filters.compile_filters`).
+
+    Queueing the messages of a campaign is requested at
+    `queue_requested_at`, and done by a single process at a time: the one
+    that claimed it (`queue_claimed_by`) until `queue_locked_until`. Its
+    messages have all been queued at `queued_at`.
+    """
+
+    __tablename__ = "campaign"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    sender = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), "mysql"))
+    filters = db.Column(db.Text, nullable=False, default="{}")
+    queue_requested_at = db.Column(db.DateTime(timezone=True))
+    queue_claimed_by = db.Column(db.String(40))
+    queue_locked_until = db.Column(db.DateTime(timezone=True))
+    queued_at = db.Column(db.DateTime(timezone=True))
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=utcnow, server_default=db.func.now()
+    )
+
+    def serialize(self) -> dict:
+        """Return a JSON-serializable representation of the campaign."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sender": self.sender,
+            "subject": self.subject,
+            "body": self.body,
+            "filters": json.loads(self.filters),
+            "queue_requested_at": (
+                self.queue_requested_at.isoformat() if self.queue_requested_at else None
+            ),
+            "queued_at": self.queued_at.isoformat() if self.queued_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# pylint: disable=too-few-public-methods
+class CampaignMessage(db.Model):
+    """CampaignMessage Model
+
+    Represents a message of a campaign, rendered for one candidate, in the
+    outbox. A candidate gets at most one message per campaign.
+    """
+
+    __tablename__ = "campaign_message"
+    __table_args__ = (
+        db.UniqueConstraint("campaign_id", "candidate_id"),
+        # Dispatchers claim due messages in this order.
+        db.Index(
+            "ix_campaign_message_status_next_attempt_at", "status", "next_attempt_at"
+        ),
+        db.Index("ix_campaign_message_campaign_id_status", "campaign_id", "status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    campaign_id = db.Column(db.Integer, db.ForeignKey("campaign.id"), nullable=False)
+    # Not a foreign key: messages outlive the candidates they were sent to.
+    candidate_id = db.Column(db.Integer, nullable=False)
+    recipient = db.Column(db.String(80), nullable=False)
+    domain = db.Column(db.String(80), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text().with_variant(mysql.MEDIUMTEXT(), "mysql"))
+    status = db.Column(db.String(10), nullable=False, default=PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    locked_until = db.Column(db.DateTime(timezone=True))
+    claimed_by = db.Column(db.String(40))
+    last_error = db.Column(db.String(255))
+    sent_at = db.Column(db.DateTime(timezone=True))
@@ -23,8 +23,11 @@ Example:
     db.session.commit()
 """
 
+from sqlalchemy.dialects import mysql
 from sqlalchemy.sql import func
+from app.utils import utcnow
 from . import db
+from .versions import current_version
 
 
 # pylint: disable=too-few-public-methods
@@ -32,11 +35,63 @@ class Candidate(db.Model):
     """Candidate Model
 
     Represents a candidate in the system.
+
+    `version` is incremented by every ORM update (and checked by it, so
+    concurrent updates of the same row are detected), and `updated_at`
+    records the time of the last change. Together they identify a revision
+    of the candidate, e.g. for ETags.
+
+    `change_seq` is the candidate collection version of the last write to
+    the candidate, set by the database on every insert and update, so
+    candidates changed since a given version can be listed in commit order
+    (see `app.handlers.changes`).
     """
 
+    __table_args__ = (
+        # Keyset pagination orders by (created_at, id).
+        db.Index("ix_candidate_created_at_id", "created_at", "id"),
+        db.Index("ix_candidate_updated_at_id", "updated_at", "id"),
+        db.Index("ix_candidate_change_seq_id", "change_seq", "id"),
+        # Filter shapes supported by app.handlers.filters.
+        db.Index("ix_candidate_firstname", "firstname"),
+        db.Index("ix_candidate_lastname_firstname", "lastname", "firstname"),
+        db.Index("ix_candidate_age_created_at_id", "age", "created_at", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     firstname = db.Column(db.String(100), nullable=False)
     lastname = db.Column(db.String(100))
     email = db.Column(db.String(80), unique=True, nullable=False)
     age = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=utcnow, server_default=func.now()
+    )
+    updated_at = db.Column(
+        db.DateTime(timezone=True).with_variant(mysql.DATETIME(fsp=6), "mysql"),
+        default=utcnow,
+        onupdate=utcnow,
+        server_default=func.now(),
+    )
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    change_seq = db.Column(
+        db.BigInteger,
+        nullable=False,
+        default=current_version("candidate"),
+        onupdate=current_version("candidate"),
+        server_default="0",
+    )
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def serialize(self) -> dict:
+        """Return a JSON-serializable representation of the candidate."""
+        return {
+            "id": self.id,
+            "firstname": self.firstname,
+            "lastname": self.lastname,
+            "email": self.email,
+            "age": self.age,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "version": self.version,
+        }
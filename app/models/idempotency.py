@@ -0,0 +1,44 @@
+"""Idempotency Key Database Model
+
+This module defines the IdempotencyKey class, the response recorded for a
+request made with an `Idempotency-Key` header, so that retries of the
+request replay it instead of repeating the write.
+
+The key of a successful write is inserted in the same transaction as the
+write itself: either both are committed or neither is.
+
+Classes:
+    IdempotencyKey: Recorded response of an idempotent request.
+
+Example:
+    # Look up the response recorded for a key
+    db.session.get(IdempotencyKey, ("candidates.create", "3f2b..."))
+"""
+
+from app.utils import utcnow
+from . import db
+
+
+# pylint: disable=too-few-public-methods
+class IdempotencyKey(db.Model):
+    """IdempotencyKey Model
+
+    Represents the response recorded for an idempotency key. `scope` names
+    the operation the key was used for, `fingerprint` is a hash of the
+    request body, and `response` is the JSON-encoded response body.
+    """
+
+    __tablename__ = "idempotency_key"
+
+    scope = db.Column(db.String(50), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.SmallInteger, nullable=False)
+    response = db.Column(db.Text, nullable=False)
+    created_at = db.Column(
+        db.DateTime(timezone=True),
+        default=utcnow,
+        server_default=db.func.now(),
+        nullable=False,
+        index=True,
+    )
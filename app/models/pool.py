@@ -0,0 +1,119 @@
+"""Instrumented connection pool
+
+This module provides a QueuePool that measures how long checkouts wait for
+a connection, so pool sizing can be tuned from observed saturation instead
+of guessed.
+
+Functions:
+    pool_stats: Return the usage and checkout wait counters of an engine.
+
+Classes:
+    PoolStats: Checkout and wait counters of a pool.
+    InstrumentedQueuePool: QueuePool recording checkout waits.
+
+Example:
+    >>> engine = create_engine(url, poolclass=InstrumentedQueuePool)
+    >>> pool_stats(engine)
+    {'size': 5, 'checked_out': 0, ...}
+"""
+
+import threading
+import time
+from typing import Any, Dict
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """Checkout and wait counters of a pool."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waiting = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the counters as a JSON-serializable dictionary."""
+        with self.lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waiting": self.waiting,
+                "wait_ms_total": round(self.wait_seconds * 1000, 3),
+                "wait_ms_avg": round(
+                    self.wait_seconds * 1000 / self.checkouts if self.checkouts else 0,
+                    3,
+                ),
+                "wait_ms_max": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool recording how long checkouts wait for a connection.
+
+    The wait includes opening a new connection when the pool has none idle,
+    which is also time a request spends blocked on the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        stats = self.stats
+        with stats.lock:
+            stats.waiting += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            with stats.lock:
+                stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with stats.lock:
+                stats.waiting -= 1
+                stats.checkouts += 1
+                stats.wait_seconds += waited
+                stats.max_wait_seconds = max(stats.max_wait_seconds, waited)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    """Return the usage and checkout wait counters of an engine.
+
+    Args:
+        engine: Engine whose pool to report on.
+
+    Returns:
+        Dict[str, Any]: The pool class, its size and capacity, the number of
+            connections checked out and its `saturation` (checked out over
+            capacity), plus the checkout wait counters when the pool is an
+            `InstrumentedQueuePool`.
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        # pylint: disable=protected-access
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update(
+            {
+                "size": pool.size(),
+                "capacity": capacity,
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "saturation": round(pool.checkedout() / capacity, 3),
+            }
+        )
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(pool.stats.to_dict())
+    return stats
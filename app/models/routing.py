@@ -0,0 +1,214 @@
+"""Read replica routing
+
+This module routes the reads of read-only handlers to read replicas of the
+database, while writes, and reads that must see them, stay on the primary.
+
+Replicas are configured with `SQLALCHEMY_REPLICA_URIS` and registered as
+Flask-SQLAlchemy binds named 'replica-0', 'replica-1', ... with the same
+engine options (and instrumented pool) as the primary. A session reading
+from replicas sticks to one of them, picked at random, so the statements
+of a request see a single consistent snapshot.
+
+Reads go to a replica only when all of the following hold:
+
+* they run inside `replica_reads` (a decorator and context manager applied
+  to read-only handlers);
+* the request, if any, is a GET or HEAD request: handlers shared with write
+  requests, e.g. loading the candidate to update, read from the primary;
+* the session has not written anything yet;
+* the client did not ask to read its own writes, either explicitly with an
+  `X-Read-Your-Writes: true` header or implicitly by having made a write
+  in the last `REPLICA_STICKY_SECONDS` (tracked with a cookie).
+
+Functions:
+    replica_reads: Route the reads of a block (or function) to a replica.
+    read_engine: Return the engine reads should currently use.
+    engine_stats: Return the pool counters of every engine.
+
+Classes:
+    RoutingSession: Session sending routed reads to a replica.
+    DatabaseRouting: Extension configuring the engines and stickiness.
+
+Example:
+    >>> with replica_reads():
+    ...     db.session.execute(select(func.count(Candidate.id))).scalar()
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from flask import Flask, Response, current_app, g, request
+from flask import has_app_context, has_request_context
+from flask_sqlalchemy.session import Session as FlaskSQLAlchemySession
+from sqlalchemy import make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import Select
+from .pool import InstrumentedQueuePool, pool_stats
+
+REPLICA_BIND_PREFIX = "replica-"
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class RoutingSession(FlaskSQLAlchemySession):
+    """Session sending routed reads to a replica.
+
+    `info['replica_reads']` is set by `replica_reads`, `info['wrote']` as
+    soon as the session executes anything but a SELECT, and
+    `info['replica']` holds the replica the session sticks to.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if (
+                clause is None
+                or not isinstance(clause, Select)
+                or clause._for_update_arg is not None  # pylint: disable=W0212
+            ):
+                # Flushes, DML statements and locking reads.
+                self.info["wrote"] = True
+            elif self.info.get("replica_reads") and not self.info.get("wrote"):
+                replica = self._replica()
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self) -> Optional[Engine]:
+        if "replica" not in self.info:
+            replicas = [
+                engine
+                for key, engine in self._db.engines.items()
+                if key and key.startswith(REPLICA_BIND_PREFIX)
+            ]
+            self.info["replica"] = random.choice(replicas) if replicas else None
+        return self.info["replica"]
+
+
+def _replicas_allowed() -> bool:
+    """Whether the current request may read from a replica."""
+    if not has_request_context():
+        return True
+    return request.method in SAFE_METHODS and not g.get("read_primary", False)
+
+
+@contextmanager
+def replica_reads(session=None) -> Iterator[None]:
+    """Route the reads of a block (or function) to a replica.
+
+    Has no effect outside the conditions listed in the module docstring,
+    outside of a Flask application context, or when no replica is
+    configured.
+
+    Args:
+        session: Session to route (default is the application's
+            Flask-SQLAlchemy session). Sessions that are not a
+            `RoutingSession`, such as async ones, ignore the routing.
+    """
+    if not has_app_context() or not _replicas_allowed():
+        yield
+        return
+    if session is None:
+        session = current_app.extensions["sqlalchemy"].session
+
+    previous = session.info.get("replica_reads", False)
+    session.info["replica_reads"] = True
+    try:
+        yield
+    finally:
+        session.info["replica_reads"] = previous
+
+
+def read_engine() -> Engine:
+    """Return the engine reads should currently use.
+
+    For code that reads through `db.engine.connect()` instead of the
+    session, e.g. to stream results.
+    """
+    db = current_app.extensions["sqlalchemy"]
+    if _replicas_allowed():
+        # pylint: disable=protected-access
+        replica = db.session()._replica()
+        if replica is not None:
+            return replica
+    return db.engine
+
+
+def engine_stats() -> Dict[str, Any]:
+    """Return the pool counters of every engine, by bind name."""
+    engines = current_app.extensions["sqlalchemy"].engines
+    return {key or "primary": pool_stats(engine) for key, engine in engines.items()}
+
+
+def _engine_options(url: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Return engine options using the instrumented pool where applicable."""
+    parsed = make_url(url)
+    pool_class = parsed.get_dialect().get_pool_class(parsed)
+    options = dict(options)
+    if issubclass(pool_class, QueuePool):
+        options.setdefault("poolclass", InstrumentedQueuePool)
+    else:
+        # e.g. in-memory SQLite, which cannot use a queue pool.
+        for option in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(option, None)
+    return options
+
+
+class DatabaseRouting:
+    """Extension configuring the engines and read-your-writes stickiness.
+
+    Must be initialized before `db.init_app`, which creates the engines.
+
+    Settings:
+        SQLALCHEMY_ENGINE_OPTIONS: Pool options of every engine.
+        SQLALCHEMY_REPLICA_URIS: Read replica URLs.
+        REPLICA_STICKY_SECONDS: How long a client reads from the primary
+            after making a write.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Configure the engines of `app` and register the request hooks."""
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = _engine_options(
+            app.config["SQLALCHEMY_DATABASE_URI"], options
+        )
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        for index, url in enumerate(app.config.get("SQLALCHEMY_REPLICA_URIS", ())):
+            binds[f"{REPLICA_BIND_PREFIX}{index}"] = {
+                "url": url,
+                **_engine_options(url, options),
+            }
+        app.config["SQLALCHEMY_BINDS"] = binds
+
+        if app.config.get("SQLALCHEMY_REPLICA_URIS"):
+            app.before_request(_check_read_your_writes)
+            app.after_request(_stick_to_primary)
+
+
+def _check_read_your_writes() -> None:
+    """Decide whether the current request must read from the primary."""
+    explicit = request.headers.get("X-Read-Your-Writes", "").lower() == "true"
+    try:
+        sticky = float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        sticky = False
+    g.read_primary = explicit or sticky
+
+
+def _stick_to_primary(response: Response) -> Response:
+    """Make the client read from the primary for a while after a write."""
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        seconds = float(current_app.config.get("REPLICA_STICKY_SECONDS", 5))
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + seconds),
+            max_age=int(seconds) + 1,
+            secure=current_app.config.get("SESSION_COOKIE_SECURE", False),
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+routing = DatabaseRouting()
@@ -0,0 +1,138 @@
+"""Schema upgrades
+
+Module bringing the tables of an existing database up to date with the
+models: `db.create_all` creates the tables that do not exist, but leaves
+existing tables as they are, without the columns and indexes added to
+their models since they were created.
+
+`upgrade_schema` adds those with `ALTER TABLE ... ADD COLUMN` and
+`CREATE INDEX`, and fills in the new columns of existing rows. It only
+adds: columns and indexes that no model declares any more, and changed
+column types, are left to the database administrator. Running it again
+changes nothing, so it is safe to run on every deployment.
+
+Functions:
+    seed_collection_versions:
+        Create the version counter rows that do not exist yet.
+
+        Example:
+            seed_collection_versions()
+
+    upgrade_schema:
+        Create missing tables, columns and indexes, and seed counters.
+
+        Example:
+            upgrade_schema()
+"""
+
+from typing import List
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.elements import TextClause
+from . import db
+from .candidates import Candidate
+from .versions import CollectionVersion
+
+logger = logging.getLogger(__name__)
+
+# Values given to the existing rows of a table when a column is added,
+# where the column's server default is not the right value for them.
+BACKFILLS = {
+    # Last changed, as far as we know, when created.
+    (Candidate.__tablename__, "updated_at"): "created_at",
+}
+
+
+def _add_column(connection, table, column) -> str:
+    """Add `column` to the existing `table`, returning the statement."""
+    dialect = connection.dialect
+    server_default = column.server_default
+    # SQLite cannot add a column whose default is an expression, such as
+    # the current time: add it without, and fill in the existing rows.
+    if (
+        dialect.name == "sqlite"
+        and server_default is not None
+        and not isinstance(server_default.arg, str)
+        and not isinstance(server_default.arg, TextClause)
+    ):
+        column = column._copy()  # pylint: disable=protected-access
+        column.server_default = None
+        column.nullable = True
+    quote = dialect.identifier_preparer.quote
+    table_name = dialect.identifier_preparer.format_table(table)
+    statement = (
+        f"ALTER TABLE {table_name} "
+        f"ADD COLUMN {CreateColumn(column).compile(dialect=dialect)}"
+    )
+    connection.execute(text(statement))
+
+    backfill = BACKFILLS.get((table.name, column.name))
+    if backfill is not None:
+        # Not update(table): it would also apply the onupdate defaults.
+        connection.execute(
+            text(
+                f"UPDATE {table_name} SET {quote(column.name)} = {quote(backfill)} "
+                f"WHERE {quote(column.name)} IS NULL"
+            )
+        )
+    return statement
+
+
+def seed_collection_versions() -> bool:
+    """Create the version counter rows that do not exist yet.
+
+    Writers increment the counter row of their collection: creating it
+    beforehand spares concurrent first writers the race to insert it.
+
+    Returns:
+        bool: Whether a counter row was created.
+    """
+    if db.session.get(CollectionVersion, Candidate.__tablename__) is not None:
+        return False
+    db.session.add(CollectionVersion(name=Candidate.__tablename__, version=0))
+    db.session.commit()
+    return True
+
+
+def upgrade_schema() -> List[str]:
+    """Create missing tables, columns and indexes, and seed counters.
+
+    Raises:
+        SQLAlchemyError: If a statement fails. The tables created and the
+            statements executed before the failure are kept, where the
+            database does not run DDL in transactions.
+
+    Returns:
+        List[str]: Descriptions of the changes made, empty if the schema
+            was already up to date.
+    """
+    changes = []
+    with db.engine.begin() as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                table.create(connection)
+                changes.append(f"CREATE TABLE {table.name}")
+
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    changes.append(_add_column(connection, table, column))
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in indexes:
+                    index.create(connection)
+                    changes.append(f"CREATE INDEX {index.name} ON {table.name}")
+
+    if seed_collection_versions():
+        changes.append(f"INSERT collection_version {Candidate.__tablename__!r}")
+
+    for change in changes:
+        logger.info("Schema upgrade: %s", change)
+    return changes
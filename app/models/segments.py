@@ -0,0 +1,53 @@
+"""Segment Database Model
+
+This module defines the Segment class, a named audience definition over
+the Candidate table. Only definitions are stored: the candidates of each
+segment are kept in memory (see `app.segments`).
+
+Classes:
+    Segment: A named set of candidate filters.
+
+Example:
+    # Define the candidates in their twenties
+    segment = Segment(name='twenties', filters='{"age__between": [20, 29]}')
+    db.session.add(segment)
+    db.session.commit()
+"""
+
+import json
+from app.utils import utcnow
+from . import db
+
+
+# pylint: disable=too-few-public-methods
+class Segment(db.Model):
+    """Segment Model
+
+    Represents a named audience definition. `filters` is a JSON object of
+    filters, as accepted by `app.handlers.filters.compile_filters`.
+    """
+
+    __tablename__ = "segment"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    filters = db.Column(db.Text, nullable=False)
+    created_at = db.Column(
+        db.DateTime(timezone=True), default=utcnow, server_default=db.func.now()
+    )
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=utcnow,
+        onupdate=utcnow,
+        server_default=db.func.now(),
+    )
+
+    def serialize(self) -> dict:
+        """Return a JSON-serializable representation of the segment."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "filters": json.loads(self.filters),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -0,0 +1,34 @@
+"""Candidate Statistics Database Model
+
+This module defines the CandidateStat class, a materialized counter of
+candidates per bucket of a statistic, maintained incrementally in the same
+transaction as every write to the Candidate table.
+
+Statistics:
+    total: A single bucket ('') counting every candidate.
+    age: One bucket per age ('unknown' for candidates without one).
+    signup_day: One bucket per UTC day of `created_at` ('YYYY-MM-DD').
+
+Classes:
+    CandidateStat: Number of candidates in a bucket of a statistic.
+
+Example:
+    # Read the number of candidates aged 30
+    db.session.get(CandidateStat, ("age", "30"))
+"""
+
+from . import db
+
+
+# pylint: disable=too-few-public-methods
+class CandidateStat(db.Model):
+    """CandidateStat Model
+
+    Represents the number of candidates in a bucket of a statistic.
+    """
+
+    __tablename__ = "candidate_stat"
+
+    statistic = db.Column(db.String(20), primary_key=True)
+    bucket = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
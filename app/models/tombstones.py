@@ -0,0 +1,48 @@
+"""Candidate Tombstone Database Model
+
+This module defines the CandidateTombstone class, the record left by a
+deleted candidate, so that clients syncing the candidates incrementally
+learn about deletions (see `app.handlers.changes`).
+
+Tombstones are written in the same transaction as the deletion, and are
+purged after `CHANGE_FEED_TOMBSTONE_DAYS` days.
+
+Classes:
+    CandidateTombstone: Record of a deleted candidate.
+
+Example:
+    # List the candidates deleted since version 42 of the collection
+    db.session.execute(
+        select(CandidateTombstone).where(CandidateTombstone.change_seq > 42)
+    )
+"""
+
+from app.utils import utcnow
+from . import db
+from .versions import current_version
+
+
+# pylint: disable=too-few-public-methods
+class CandidateTombstone(db.Model):
+    """CandidateTombstone Model
+
+    Represents a deleted candidate. `change_seq` is the candidate collection
+    version of the deletion, as `Candidate.change_seq` is for other writes.
+    """
+
+    __tablename__ = "candidate_tombstone"
+    __table_args__ = (
+        db.Index("ix_candidate_tombstone_change_seq_id", "change_seq", "candidate_id"),
+    )
+
+    candidate_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    change_seq = db.Column(
+        db.BigInteger, nullable=False, default=current_version("candidate")
+    )
+    deleted_at = db.Column(
+        db.DateTime(timezone=True),
+        default=utcnow,
+        server_default=db.func.now(),
+        nullable=False,
+        index=True,
+    )
@@ -0,0 +1,59 @@
+"""Collection Version Database Model
+
+This module defines the CollectionVersion class, a counter per collection
+that is incremented in the same transaction as every write to the
+collection.
+
+Reading the counter is a single primary key lookup, which makes it a cheap
+way to tell whether anything in a collection changed, e.g. to answer
+conditional requests on list endpoints without querying the collection.
+
+Since writers increment the counter first, and hold the lock on its row
+until they commit, the version also orders the writes of a collection: a
+write committed after another always sees a greater version, which makes
+it usable as a change sequence (see `current_version`).
+
+Classes:
+    CollectionVersion: Version counter of a collection.
+
+Functions:
+    current_version: SQL expression of the current version of a collection.
+
+Example:
+    # Read the version of the candidate collection
+    db.session.get(CollectionVersion, "candidate")
+"""
+
+from sqlalchemy import func, select
+from . import db
+
+
+# pylint: disable=too-few-public-methods
+class CollectionVersion(db.Model):
+    """CollectionVersion Model
+
+    Represents the version counter of a collection.
+    """
+
+    __tablename__ = "collection_version"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def current_version(name: str):
+    """Return an SQL expression of the current version of a collection.
+
+    Used as a column default, it stamps the rows written by a transaction
+    with the version that transaction incremented the counter to, provided
+    the counter is incremented before the rows are written.
+
+    Args:
+        name: Name of the collection.
+    """
+    return func.coalesce(
+        select(CollectionVersion.version)
+        .where(CollectionVersion.name == name)
+        .scalar_subquery(),
+        0,
+    )
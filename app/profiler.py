@@ -0,0 +1,246 @@
+"""SQL profiler
+
+Module providing an opt-in profiler of the SQL statements issued by the
+application, enabled with `SQL_PROFILER_ENABLED`. When it is disabled no
+event listener is installed, so it costs nothing.
+
+When enabled, it:
+
+* counts the statements of every request and the time spent executing
+  them, reported to the client in a `Server-Timing: db;dur=...` header;
+* flags requests that execute the same SELECT at least
+  `SQL_PROFILER_N_PLUS_ONE_THRESHOLD` times, the signature of an N+1
+  pattern (one query per item of a list);
+* captures statements slower than `SQL_PROFILER_SLOW_MS`, with their
+  EXPLAIN plan and whether that plan scans a whole table.
+
+Flagged requests and slow statements are kept in bounded ring buffers of
+`SQL_PROFILER_BUFFER_SIZE` entries, per worker process, browsed with
+`GET /v1/db/profile` (which requires `ADMIN_TOKEN` outside development).
+Only statements are kept, not their parameters.
+
+Classes:
+    RequestProfile: Statements executed by a request.
+    SQLProfiler: Flask extension profiling the SQL of an application.
+
+Example:
+    >>> from app.profiler import profiler
+    >>> profiler.init_app(app)
+    >>> profiler.report(limit=10)
+    {'enabled': True, 'slow_queries': [...], 'n_plus_one': [...]}
+"""
+
+import functools
+import logging
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List
+from flask import Flask, Response, current_app, g, has_request_context, request
+from sqlalchemy import event
+from app.models import db
+from app.utils import utcnow
+
+logger = logging.getLogger(__name__)
+
+# How each backend asks for the plan of a statement.
+EXPLAIN_PREFIXES = {"mysql": "EXPLAIN ", "sqlite": "EXPLAIN QUERY PLAN "}
+
+
+class RequestProfile:
+    """Statements executed by a request."""
+
+    __slots__ = ("queries", "seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+        self.statements: Counter = Counter()
+
+
+def _is_full_scan(backend: str, plan: List[Dict[str, Any]]) -> bool:
+    """Whether an EXPLAIN plan reads a whole table."""
+    if backend == "mysql":
+        return any(row.get("type") == "ALL" for row in plan)
+    if backend == "sqlite":
+        # e.g. 'SCAN candidate', but not 'SCAN candidate USING INDEX ...'.
+        return any(
+            str(row.get("detail", "")).startswith("SCAN ")
+            and "USING" not in str(row.get("detail", ""))
+            for row in plan
+        )
+    return False
+
+
+def _explain(conn, statement: str, parameters) -> Dict[str, Any]:
+    """Return the EXPLAIN plan of a statement, run on the same connection.
+
+    The plan is read with a raw DBAPI cursor, so this does not go through
+    the engine events again.
+    """
+    backend = conn.dialect.name
+    prefix = EXPLAIN_PREFIXES.get(backend)
+    if prefix is None:
+        return {"plan": None, "full_scan": None}
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        columns = [column[0] for column in cursor.description]
+        plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return {"plan": None, "full_scan": None, "explain_error": str(e)}
+    finally:
+        cursor.close()
+    return {"plan": plan, "full_scan": _is_full_scan(backend, plan)}
+
+
+def _before_cursor_execute(conn, *args) -> None:
+    conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+
+# pylint: disable=too-many-arguments,unused-argument
+def _after_cursor_execute(
+    state, conn, cursor, statement, parameters, context, executemany
+) -> None:
+    seconds = time.perf_counter() - conn.info["profiler_started"].pop()
+    profile = g.get("sql_profile") if has_request_context() else None
+    if profile is not None:
+        profile.queries += 1
+        profile.seconds += seconds
+        profile.statements[statement] += 1
+
+    if seconds * 1000 < state["slow_ms"]:
+        return
+    entry = {
+        "at": utcnow().isoformat(),
+        "endpoint": request.endpoint if has_request_context() else None,
+        "duration_ms": round(seconds * 1000, 3),
+        "statement": statement,
+    }
+    # A server-side cursor still has rows pending on the connection, and
+    # EXPLAIN has nothing to say about bulk DML.
+    if (
+        not executemany
+        and not getattr(context, "is_server_side", False)
+        and statement.lstrip()[:6].upper() == "SELECT"
+    ):
+        entry.update(_explain(conn, statement, parameters))
+    state["slow_queries"].append(entry)
+    logger.warning("Slow query (%.1f ms): %s", seconds * 1000, statement)
+
+
+def _handle_error(exception_context) -> None:
+    connection = exception_context.connection
+    stack = connection.info.get("profiler_started") if connection else None
+    if stack:
+        stack.pop()
+
+
+def _start_request() -> None:
+    g.sql_profile = RequestProfile()
+
+
+def _finish_request(response: Response) -> Response:
+    profile = g.get("sql_profile")
+    if profile is None:
+        return response
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={profile.seconds * 1000:.3f};desc="{profile.queries} queries"',
+    )
+
+    state = current_app.extensions["sql_profiler"]
+    repeated = [
+        (statement, count)
+        for statement, count in profile.statements.items()
+        if count >= state["n_plus_one_threshold"]
+        and statement.lstrip()[:6].upper() == "SELECT"
+    ]
+    for statement, count in repeated:
+        state["n_plus_one"].append(
+            {
+                "at": utcnow().isoformat(),
+                "endpoint": request.endpoint,
+                "method": request.method,
+                "path": request.path,
+                "queries": profile.queries,
+                "repeated": count,
+                "statement": statement,
+            }
+        )
+        logger.warning(
+            "Possible N+1 in %s: %d executions of %s",
+            request.endpoint,
+            count,
+            statement,
+        )
+    return response
+
+
+class SQLProfiler:
+    """Flask extension profiling the SQL statements of an application.
+
+    Must be initialized after `db.init_app`, whose engines it instruments.
+
+    Settings:
+        SQL_PROFILER_ENABLED: Whether to profile at all.
+        SQL_PROFILER_SLOW_MS: Duration from which a statement is captured.
+        SQL_PROFILER_N_PLUS_ONE_THRESHOLD: Executions of the same SELECT in
+            one request from which the request is flagged.
+        SQL_PROFILER_BUFFER_SIZE: Entries kept in each ring buffer.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Install the engine events and request hooks if enabled."""
+        if not app.config.get("SQL_PROFILER_ENABLED", False):
+            return
+
+        size = int(app.config.get("SQL_PROFILER_BUFFER_SIZE", 100))
+        state = app.extensions["sql_profiler"] = {
+            "slow_ms": float(app.config.get("SQL_PROFILER_SLOW_MS", 100)),
+            "n_plus_one_threshold": int(
+                app.config.get("SQL_PROFILER_N_PLUS_ONE_THRESHOLD", 5)
+            ),
+            "slow_queries": deque(maxlen=size),
+            "n_plus_one": deque(maxlen=size),
+        }
+        app.before_request(_start_request)
+        app.after_request(_finish_request)
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+                event.listen(
+                    engine,
+                    "after_cursor_execute",
+                    functools.partial(_after_cursor_execute, state),
+                )
+                event.listen(engine, "handle_error", _handle_error)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the current application is being profiled."""
+        return "sql_profiler" in current_app.extensions
+
+    def report(self, limit: int = 50) -> Dict[str, Any]:
+        """Return the most recent captures of this worker, newest first.
+
+        Args:
+            limit: Maximum number of entries of each kind (default is 50).
+
+        Returns:
+            Dict[str, Any]: The `slow_queries` captured with their plans and
+                the requests flagged as `n_plus_one`.
+        """
+        state = current_app.extensions.get("sql_profiler")
+        if state is None:
+            return {"enabled": False, "slow_queries": [], "n_plus_one": []}
+        return {
+            "enabled": True,
+            "slow_ms": state["slow_ms"],
+            "n_plus_one_threshold": state["n_plus_one_threshold"],
+            "slow_queries": list(reversed(state["slow_queries"]))[:limit],
+            "n_plus_one": list(reversed(state["n_plus_one"]))[:limit],
+        }
+
+
+profiler = SQLProfiler()
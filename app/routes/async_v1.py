@@ -0,0 +1,223 @@
+"""
+Async Candidate API Routes
+
+Module containing the `/v1/candidates` routes of the asyncio application
+(see `app.asgi`). They follow the same contract as `app.routes.v1`
+(parameters, status codes, bodies and ETags) and use the handlers of
+`app.handlers.async_candidates`.
+
+Functions:
+    add_candidate: Route to create a new candidate.
+    get_single_candidate: Route to retrieve a single candidate by ID.
+    get_all: Route to retrieve all candidates with pagination and filters.
+    get_candidate_stats: Route to retrieve the candidate statistics.
+    update_single_candidate: Route to update a single candidate by ID.
+    delete_single_candidate: Route to delete a single candidate by ID.
+"""
+
+from typing import Any, Optional
+from quart import Blueprint, Response, current_app, jsonify, request
+from werkzeug.exceptions import NotFound, BadRequest, Conflict, InternalServerError
+from app.handlers.async_candidates import (
+    create_candidate,
+    get_candidate_data,
+    get_all_candidates,
+    get_candidates_after,
+    get_collection_version,
+    get_stats,
+    count_candidates,
+    update_candidate,
+    delete_candidate,
+)
+from app.handlers.candidates import validate_candidate_data
+from app.models.async_db import async_db
+from app.routes.v1 import MAX_PAGE_SIZE, MAX_STATS_DAYS, PAGINATION_PARAMS
+from app.serializers import encode_json, parse_fields, row_to_dict
+from app.utils import generate_md5_hash, utcnow
+
+blueprint = Blueprint("async_v1", __name__)
+
+
+def _json_response(payload: Any, headers: Optional[dict] = None) -> Response:
+    """Build a JSON response with the configured encoder."""
+    return Response(
+        encode_json(payload, current_app.config.get("JSON_ENCODER", "auto")),
+        headers=headers,
+        mimetype="application/json",
+    )
+
+
+def _not_modified(etag: str) -> Response:
+    """Return an empty 304 Not Modified response carrying `etag`."""
+    response = Response("", status=304)
+    response.set_etag(etag)
+    return response
+
+
+@blueprint.route("/candidates", methods=["POST"])
+async def add_candidate():
+    """Create a new candidate.
+
+    See `app.routes.v1.add_candidate`.
+    """
+    try:
+        data = validate_candidate_data(await request.get_json(silent=True))
+        async with async_db.session() as session:
+            candidate = await create_candidate(
+                session,
+                data["firstname"],
+                data.get("lastname"),
+                data["email"],
+                data.get("age"),
+            )
+        return jsonify(candidate), 201
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates/<int:candidate_id>", methods=["GET"])
+async def get_single_candidate(candidate_id):
+    """Retrieve a single candidate by ID.
+
+    See `app.routes.v1.get_single_candidate`.
+    """
+    async with async_db.session() as session:
+        candidate = await get_candidate_data(session, candidate_id)
+    if candidate:
+        etag = f"candidate-{candidate['id']}-{candidate['version']}"
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        response = jsonify(candidate)
+        response.set_etag(etag)
+        return response, 200
+    else:
+        raise NotFound(description=f"Candidate with ID {candidate_id} not found")
+
+
+@blueprint.route("/candidates", methods=["GET"])
+async def get_all():
+    """Retrieve all candidates with pagination and optional filters.
+
+    See `app.routes.v1.get_all`.
+    """
+    try:
+        async with async_db.session() as session:
+            etag = generate_md5_hash(
+                f"{await get_collection_version(session)}"
+                f"?{sorted(request.args.items(multi=True))}"
+            )
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+
+            filters = request.args.to_dict()
+            for param in PAGINATION_PARAMS:
+                filters.pop(param, None)
+            fields = parse_fields(request.args.get("fields"))
+            with_total = request.args.get("with_total", "").lower() == "true"
+
+            if "after" in request.args or "limit" in request.args:
+                limit = min(max(int(request.args.get("limit", 10)), 1), MAX_PAGE_SIZE)
+                candidates, next_cursor = await get_candidates_after(
+                    session,
+                    after=request.args.get("after"),
+                    limit=limit,
+                    filters=filters,
+                    fields=fields,
+                )
+                body = {
+                    "candidates": [row_to_dict(row, fields) for row in candidates],
+                    "next_cursor": next_cursor,
+                }
+                if with_total:
+                    body["total"] = await count_candidates(session, filters)
+                return _json_response(body, headers={"ETag": f'"{etag}"'})
+
+            page = int(request.args.get("page", 1))
+            if page < 1:
+                raise BadRequest(description="page must be 1 or greater.")
+            per_page = min(max(int(request.args.get("per_page", 10)), 1), MAX_PAGE_SIZE)
+            candidates = await get_all_candidates(
+                session, page=page, per_page=per_page, filters=filters, fields=fields
+            )
+            headers = {"ETag": f'"{etag}"'}
+            if with_total:
+                headers["X-Total-Count"] = await count_candidates(session, filters)
+        return _json_response(
+            [row_to_dict(row, fields) for row in candidates], headers=headers
+        )
+    except ValueError:
+        return jsonify({"error": "Pagination parameters must be integers."}), 400
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+
+@blueprint.route("/candidates/stats", methods=["GET"])
+async def get_candidate_stats():
+    """Retrieve the candidate count, age distribution and daily sign-ups.
+
+    See `app.routes.v1.get_candidate_stats`.
+    """
+    try:
+        days = min(max(int(request.args.get("days", 30)), 1), MAX_STATS_DAYS)
+        async with async_db.session() as session:
+            etag = generate_md5_hash(
+                f"stats-{await get_collection_version(session)}-{days}"
+                f"-{utcnow().date()}"
+            )
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+            stats = await get_stats(session, days)
+        return _json_response(stats, headers={"ETag": f'"{etag}"'})
+    except ValueError:
+        return jsonify({"error": "days must be an integer."}), 400
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+
+@blueprint.route("/candidates/<int:candidate_id>", methods=["PUT"])
+async def update_single_candidate(candidate_id):
+    """Update a single candidate by ID.
+
+    See `app.routes.v1.update_single_candidate`.
+    """
+    try:
+        data = validate_candidate_data(
+            await request.get_json(silent=True), partial=True
+        )
+        async with async_db.session() as session:
+            await update_candidate(session, candidate_id, data)
+        return (
+            jsonify({"message": f"Candidate {candidate_id} updated successfully"}),
+            200,
+        )
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates/<int:candidate_id>", methods=["DELETE"])
+async def delete_single_candidate(candidate_id):
+    """Delete a single candidate by ID.
+
+    See `app.routes.v1.delete_single_candidate`.
+    """
+    try:
+        async with async_db.session() as session:
+            await delete_candidate(session, candidate_id)
+        return (
+            jsonify({"message": f"Candidate {candidate_id} deleted successfully"}),
+            200,
+        )
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
@@ -5,24 +5,150 @@ Module containing API routes for CRUD operations on candidates.
 
 Functions:
     add_candidate: Route to create a new candidate.
+    import_candidates_in_bulk: Route to create candidates from NDJSON or CSV.
     get_single_candidate: Route to retrieve a single candidate by ID.
     get_all: Route to retrieve all candidates with pagination and filters.
+    export_candidates: Route to stream all candidates as NDJSON or CSV.
+    get_changes_since: Route to list the candidate changes since a token.
+    stream_candidate_changes: Route to push candidate changes as server-sent events.
+    search: Route to search candidates by partial or misspelled name or email.
+    get_candidate_stats: Route to retrieve the candidate statistics.
     update_single_candidate: Route to update a single candidate by ID.
     delete_single_candidate: Route to delete a single candidate by ID.
+    restore_archived_candidate: Route to restore an archived candidate.
+    update_candidates_in_batch: Route to update candidates by IDs or filters.
+    delete_candidates_in_batch: Route to delete candidates by IDs or filters.
+    add_campaign: Route to create an email campaign.
+    queue_campaign_messages: Route to request the queueing of a campaign's
+        messages.
+    get_single_campaign: Route to retrieve a campaign and its progress.
+    add_segment: Route to define an audience segment.
+    get_segments: Route to list the segments with their sizes.
+    update_single_segment: Route to change the filters of a segment.
+    delete_single_segment: Route to delete a segment.
+    query_segment_expression: Route to size and preview combined segments.
+    get_cache_stats: Route to report the candidate cache counters.
+    get_admission_stats: Route to report the admission control counters.
+    get_db_stats: Route to report the database connection pool counters.
+    get_db_profile: Route to browse the slow queries and N+1 patterns seen.
+
+The diagnostic routes (`/cache/stats`, `/admission/stats`, `/db/stats` and
+`/db/profile`) require `Authorization: Bearer <ADMIN_TOKEN>` when
+`ADMIN_TOKEN` is set. Without it they are only served in development.
 """
 
-from flask import Blueprint, jsonify, request
+import hmac
+from functools import wraps
+from flask import Blueprint, Response, current_app, jsonify, request, url_for
+from flask import stream_with_context
 from werkzeug.exceptions import NotFound, BadRequest, Conflict, InternalServerError
+from werkzeug.exceptions import Gone, ServiceUnavailable, UnprocessableEntity
 from app.handlers.candidates import (
     create_candidate,
     get_candidate_by_id,
+    get_candidate_data,
     get_all_candidates,
+    get_candidates_after,
+    get_collection_version,
+    count_candidates,
     update_candidate,
     delete_candidate,
+    validate_candidate_data,
 )
+from app.admission import admission
+from app.cache import cache
+from app.handlers.archive import get_archived_candidate_data, restore_candidate
+from app.handlers.batch import delete_candidates, update_candidates
+from app.handlers.batch import validate_selection
+from app.handlers.campaigns import create_campaign, get_campaign, request_queueing
+from app.handlers.changes import get_changes, stream_changes
+from app.handlers.exports import stream_candidates
+from app.handlers.idempotency import idempotent_request
+from app.handlers.search import search_candidates
+from app.handlers.segments import create_segment, delete_segment, list_segments
+from app.handlers.segments import query_segments, update_segment
+from app.handlers.stats import get_stats
+from app.handlers.imports import import_candidates, iter_csv_rows, iter_ndjson_rows
+from app.models.routing import engine_stats
+from app.profiler import profiler
+from app.serializers import json_response, parse_fields, row_to_dict
+from app.utils import generate_md5_hash, utcnow
 
 blueprint = Blueprint("v1", __name__)
 
+IMPORT_PARSERS = {
+    "application/x-ndjson": iter_ndjson_rows,
+    "application/jsonl": iter_ndjson_rows,
+    "text/csv": iter_csv_rows,
+}
+EXPORT_MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+PAGINATION_PARAMS = (
+    "page",
+    "per_page",
+    "after",
+    "limit",
+    "with_total",
+    "fields",
+    "include_archived",
+)
+MAX_PAGE_SIZE = 100
+MAX_CHANGES_PAGE_SIZE = 1000
+MAX_STATS_DAYS = 366
+
+
+def _not_modified(etag: str) -> Response:
+    """Return an empty 304 Not Modified response carrying `etag`."""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _include_archived() -> bool:
+    """Tell whether the request asks to include archived candidates."""
+    return request.args.get("include_archived", "").lower() == "true"
+
+
+def admin_only(route):
+    """Restrict `route` to requests carrying the admin token.
+
+    When `ADMIN_TOKEN` is set, the request must send it as a bearer token.
+    Otherwise the route is only served by a debug (development)
+    application, so that diagnostics are never exposed by default.
+    """
+
+    @wraps(route)
+    def wrapper(*args, **kwargs):
+        token = current_app.config.get("ADMIN_TOKEN")
+        if not token:
+            if current_app.debug:
+                return route(*args, **kwargs)
+            return (
+                jsonify({"error": "Set ADMIN_TOKEN to enable this endpoint."}),
+                403,
+            )
+        scheme, _, given = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            given.strip().encode(), token.encode()
+        ):
+            return (
+                jsonify({"error": "Invalid or missing admin token."}),
+                401,
+                {"WWW-Authenticate": "Bearer"},
+            )
+        return route(*args, **kwargs)
+
+    return wrapper
+
+
+def _replay(status_code: int, body: str) -> Response:
+    """Return a response recorded for an idempotency key."""
+    return Response(
+        body,
+        status=status_code,
+        mimetype="application/json",
+        headers={"Idempotent-Replayed": "true"},
+    )
+
 
 @blueprint.route("/candidates", methods=["POST"])
 def add_candidate():
@@ -36,17 +162,89 @@ def add_candidate():
         "age": integer
     }
 
+    Request headers:
+        Idempotency-Key: Optional unique key of the request. Retrying the
+            request with the same key and body replays the original
+            response (with an `Idempotent-Replayed: true` header) instead of
+            creating the candidate again.
+
+    `firstname` and `email` are required; the fields are validated as by
+    `validate_candidate_data`.
+
     Returns:
-        JSON response with the created candidate's data.
+        JSON response with the created candidate's data, 400 Bad Request if
+        the body is not an object or a field is missing, unknown or
+        invalid, or 409 Conflict if the email is taken.
     """
+    idempotency = None
     try:
-        data = request.json
+        data = validate_candidate_data(request.get_json(silent=True))
+        idempotency = idempotent_request(
+            "candidates.create", request.headers.get("Idempotency-Key"), data
+        )
+        recorded = idempotency.replay() if idempotency else None
+        if recorded:
+            return _replay(*recorded)
         new_candidate = create_candidate(
-            data["firstname"], data["lastname"], data["email"], data["age"]
+            data["firstname"],
+            data.get("lastname"),
+            data["email"],
+            data.get("age"),
+            idempotency=idempotency,
         )
         return jsonify(new_candidate.serialize()), 201
     except Conflict as e:
-        return jsonify({"message": e.description}), 409
+        body = {"message": e.description}
+        if idempotency:
+            # A concurrent request with the same key may have won the race.
+            try:
+                recorded = idempotency.replay()
+            except UnprocessableEntity as error:
+                return jsonify({"message": error.description}), 422
+            except InternalServerError:
+                recorded = None
+            if recorded:
+                return _replay(*recorded)
+            idempotency.save(409, body)
+        return jsonify(body), 409
+    except UnprocessableEntity as e:
+        return jsonify({"message": e.description}), 422
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates/bulk", methods=["POST"])
+def import_candidates_in_bulk():
+    """Create candidates in bulk from a streamed NDJSON or CSV body.
+
+    The body is read incrementally, so arbitrarily large files can be
+    uploaded. Send `Content-Type: application/x-ndjson` with one candidate
+    object per line, or `Content-Type: text/csv` with a header row naming
+    the candidate fields. Rows are written in batches of
+    `BULK_IMPORT_BATCH_SIZE`, one transaction per batch.
+
+    Returns:
+        JSON response with the inserted and rejected counts and a per-row
+        error report (capped at `BULK_IMPORT_MAX_ERRORS` entries).
+    """
+    parser = IMPORT_PARSERS.get(request.mimetype)
+    if parser is None:
+        return (
+            jsonify(
+                {"message": "Content-Type must be application/x-ndjson or text/csv."}
+            ),
+            415,
+        )
+
+    try:
+        report = import_candidates(
+            parser(request.stream),
+            batch_size=current_app.config["BULK_IMPORT_BATCH_SIZE"],
+            max_errors=current_app.config["BULK_IMPORT_MAX_ERRORS"],
+        )
+        return jsonify(report), 200
     except BadRequest as e:
         return jsonify({"message": e.description}), 400
     except InternalServerError as e:
@@ -60,12 +258,31 @@ def get_single_candidate(candidate_id):
     Args:
         candidate_id: ID of the candidate to retrieve.
 
+    Request query parameters:
+        include_archived: Set to 'true' to also look the candidate up in
+            the archive; an archived candidate is returned with `archived`
+            set and its `archived_at` time.
+
+    The response carries a strong ETag derived from the candidate's
+    version; a request whose `If-None-Match` matches it gets 304 Not
+    Modified, served from the cache without touching the database when
+    the candidate is cached.
+
     Returns:
         JSON response with the candidate's data if found, else 404 Not Found.
     """
-    candidate = get_candidate_by_id(candidate_id)
+    candidate = get_candidate_data(candidate_id)
+    prefix = "candidate"
+    if candidate is None and _include_archived():
+        candidate = get_archived_candidate_data(candidate_id)
+        prefix = "archived"
     if candidate:
-        return jsonify(candidate.serialize()), 200
+        etag = f"{prefix}-{candidate['id']}-{candidate['version']}"
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        response = jsonify(candidate)
+        response.set_etag(etag)
+        return response, 200
     else:
         raise NotFound(description=f"Candidate with ID {candidate_id} not found")
 
@@ -74,20 +291,267 @@ def get_single_candidate(candidate_id):
 def get_all():
     """Retrieve all candidates with pagination and optional filters.
 
+    Two pagination modes are supported. Offset mode (`page`/`per_page`)
+    returns a list of candidates. Cursor mode, selected by passing `after`
+    or `limit`, returns an object with the candidates and a `next_cursor`
+    to pass as `after` for the following page; its cost does not grow
+    with the page depth.
+
     Request query parameters:
-        page: Page number for pagination (default is 1).
+        page: Page number for pagination, from 1 (default is 1).
         per_page: Number of candidates per page (default is 10).
+        after: Opaque cursor of the page to continue from (cursor mode).
+        limit: Number of candidates per page (cursor mode, default is 10).
+        fields: Optional comma-separated projection (e.g., 'id,email');
+            only these fields are selected and returned.
+        with_total: Set to 'true' to also count all matching candidates.
+            The count is returned in the `X-Total-Count` header in offset
+            mode and as `total` in cursor mode.
+        include_archived: Set to 'true' to include archived candidates;
+            every candidate then has an `archived` field telling whether
+            it is archived.
         filters: Optional filters as query parameters.
 
+    Responses carry a strong ETag derived from the candidate collection
+    version and the query string. A request whose `If-None-Match` matches
+    it gets 304 Not Modified after a single version lookup, without
+    querying or serializing any candidate.
+
     Returns:
         JSON response with a list of candidates based on provided filters and pagination.
     """
     try:
-        page = int(request.args.get("page", 1))
-        per_page = int(request.args.get("per_page", 10))
+        etag = generate_md5_hash(
+            f"{get_collection_version()}?{sorted(request.args.items(multi=True))}"
+        )
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
         filters = request.args.to_dict()
-        candidates = get_all_candidates(page=page, per_page=per_page, filters=filters)
-        return jsonify([candidate.serialize() for candidate in candidates]), 200
+        for param in PAGINATION_PARAMS:
+            filters.pop(param, None)
+        fields = parse_fields(request.args.get("fields"))
+        with_total = request.args.get("with_total", "").lower() == "true"
+        include_archived = _include_archived()
+        returned = fields + ("archived",) if include_archived else fields
+
+        if "after" in request.args or "limit" in request.args:
+            limit = min(max(int(request.args.get("limit", 10)), 1), MAX_PAGE_SIZE)
+            candidates, next_cursor = get_candidates_after(
+                after=request.args.get("after"),
+                limit=limit,
+                filters=filters,
+                fields=fields,
+                include_archived=include_archived,
+            )
+            body = {
+                "candidates": [row_to_dict(row, returned) for row in candidates],
+                "next_cursor": next_cursor,
+            }
+            if with_total:
+                body["total"] = count_candidates(
+                    filters, include_archived=include_archived
+                )
+            return json_response(body, headers={"ETag": f'"{etag}"'})
+
+        page = int(request.args.get("page", 1))
+        if page < 1:
+            raise BadRequest(description="page must be 1 or greater.")
+        per_page = min(max(int(request.args.get("per_page", 10)), 1), MAX_PAGE_SIZE)
+        candidates = get_all_candidates(
+            page=page,
+            per_page=per_page,
+            filters=filters,
+            fields=fields,
+            include_archived=include_archived,
+        )
+        headers = {"ETag": f'"{etag}"'}
+        if with_total:
+            headers["X-Total-Count"] = count_candidates(
+                filters, include_archived=include_archived
+            )
+        return json_response(
+            [row_to_dict(row, returned) for row in candidates], headers=headers
+        )
+    except ValueError:
+        return jsonify({"error": "Pagination parameters must be integers."}), 400
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+
+@blueprint.route("/candidates/export", methods=["GET"])
+def export_candidates():
+    """Stream all candidates matching optional filters.
+
+    The response is sent chunked while rows are read from a server-side
+    cursor, so exports of any size run in constant memory.
+
+    Request query parameters:
+        format: 'ndjson' (default) or 'csv'.
+        filters: Optional filters as query parameters, as for `get_all`.
+
+    Returns:
+        Streamed NDJSON or CSV response with one candidate per line.
+    """
+    filters = request.args.to_dict()
+    export_format = filters.pop("format", "ndjson")
+    if export_format not in EXPORT_MIMETYPES:
+        return jsonify({"error": "format must be 'ndjson' or 'csv'."}), 400
+
+    try:
+        chunks = stream_candidates(
+            export_format,
+            filters=filters,
+            chunk_size=current_app.config["EXPORT_CHUNK_SIZE"],
+        )
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=candidates.{export_format}"
+        },
+    )
+
+
+@blueprint.route("/candidates/changes", methods=["GET"])
+def get_changes_since():
+    """List the candidates created, updated or deleted since a token.
+
+    Clients keep a copy of the candidates in sync by passing the
+    `next_token` of each response to the next request, and requesting again
+    right away while `more` is true.
+
+    Request query parameters:
+        since: Token of a previous response (omit to sync from scratch).
+        limit: Maximum number of changes (default is 100, at most 1000).
+
+    Returns:
+        JSON response with the `changes` in commit order, the `next_token`
+        and whether there are `more` changes. 410 if the token is too old,
+        in which case the client must sync again without a token.
+    """
+    try:
+        limit = int(request.args.get("limit", 100))
+        if not 1 <= limit <= MAX_CHANGES_PAGE_SIZE:
+            raise ValueError(limit)
+        return json_response(get_changes(request.args.get("since"), limit))
+    except ValueError:
+        return (
+            jsonify({"error": f"limit must be between 1 and {MAX_CHANGES_PAGE_SIZE}."}),
+            400,
+        )
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except Gone as e:
+        return jsonify({"error": e.description}), 410
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+
+@blueprint.route("/candidates/changes/stream", methods=["GET"])
+def stream_candidate_changes():
+    """Push candidate changes as server-sent events.
+
+    Each event is named after the change (`upsert` or `delete`), carries it
+    as data (as in `get_changes_since`), and has the token following it as
+    ID. The response ends after `CHANGE_FEED_STREAM_SECONDS`; `EventSource`
+    clients then reconnect and resume from the last event they received.
+
+    Request query parameters:
+        since: Token to resume from (omit to send every candidate first).
+
+    Request headers:
+        Last-Event-ID: Token to resume from, sent by reconnecting clients
+            (takes precedence over `since`).
+
+    Returns:
+        Streamed `text/event-stream` response. 410 if the token is too old.
+    """
+    since = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        events = stream_changes(
+            since,
+            poll_seconds=current_app.config["CHANGE_FEED_POLL_SECONDS"],
+            max_seconds=current_app.config["CHANGE_FEED_STREAM_SECONDS"],
+        )
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except Gone as e:
+        return jsonify({"error": e.description}), 410
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@blueprint.route("/candidates/search", methods=["GET"])
+def search():
+    """Search candidates by partial or misspelled name or email.
+
+    Request query parameters:
+        q: Free-text query matched against first name, last name and email.
+        limit: Maximum number of results (default is 10).
+        fields: Optional comma-separated projection, as for `get_all`.
+
+    Returns:
+        JSON response with the matching candidates, best match first, each
+        with its relevance `score`, or 503 Service Unavailable while the
+        search index is loading.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Query parameter 'q' is required."}), 400
+
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), MAX_PAGE_SIZE)
+        fields = parse_fields(request.args.get("fields"))
+        return json_response(search_candidates(query, limit=limit, fields=fields))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+    except ServiceUnavailable as e:
+        return jsonify({"error": e.description}), 503, {"Retry-After": "1"}
+    except InternalServerError as e:
+        return jsonify({"error": e.description}), 500
+
+
+@blueprint.route("/candidates/stats", methods=["GET"])
+def get_candidate_stats():
+    """Retrieve the candidate count, age distribution and daily sign-ups.
+
+    The statistics are read from summary tables maintained by every write,
+    so the cost of this route does not depend on the number of candidates.
+    Responses carry an ETag derived from the candidate collection version,
+    and a matching `If-None-Match` gets 304 Not Modified.
+
+    Request query parameters:
+        days: Number of days of sign-ups to return, ending today (UTC)
+            (default is 30, at most 366).
+
+    Returns:
+        JSON response with the `total` number of candidates, their `ages`
+        distribution and the daily `signups`.
+    """
+    try:
+        days = min(max(int(request.args.get("days", 30)), 1), MAX_STATS_DAYS)
+        etag = generate_md5_hash(
+            f"stats-{get_collection_version()}-{days}-{utcnow().date()}"
+        )
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        return json_response(get_stats(days), headers={"ETag": f'"{etag}"'})
+    except ValueError:
+        return jsonify({"error": "days must be an integer."}), 400
     except InternalServerError as e:
         return jsonify({"error": e.description}), 500
 
@@ -107,20 +571,28 @@ def update_single_candidate(candidate_id):
         "age": integer
     }
 
+    Only these fields can be updated; any other field (including `id`,
+    `version` and the timestamps) is rejected.
+
     Returns:
-        JSON response confirming the update or 404 Not Found if the candidate does not exist.
+        JSON response confirming the update, 400 Bad Request if a field is
+        unknown or invalid, or 404 Not Found if the candidate does not exist.
     """
     try:
         candidate = get_candidate_by_id(candidate_id)
         if not candidate:
             raise NotFound(description=f"Candidate with ID {candidate_id} not found")
 
-        data = request.json
+        data = validate_candidate_data(request.get_json(silent=True), partial=True)
         update_candidate(candidate, data)
         return (
             jsonify({"message": f"Candidate {candidate_id} updated successfully"}),
             200,
         )
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
     except InternalServerError as e:
         return jsonify({"message": e.description}), 500
 
@@ -147,3 +619,339 @@ def delete_single_candidate(candidate_id):
         )
     except InternalServerError as e:
         return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates/<int:candidate_id>/restore", methods=["POST"])
+def restore_archived_candidate(candidate_id):
+    """Move an archived candidate back to the current candidates.
+
+    Args:
+        candidate_id: ID of the archived candidate to restore.
+
+    Returns:
+        JSON response with the restored candidate, 404 Not Found if no
+        archived candidate has this ID, or 409 Conflict if a current
+        candidate has the same email.
+    """
+    try:
+        return jsonify(restore_candidate(candidate_id)), 200
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates", methods=["PATCH"])
+def update_candidates_in_batch():
+    """Apply the same changes to candidates selected by IDs or filters.
+
+    Candidates are updated with set-based statements, in chunks of
+    `BATCH_WRITE_CHUNK_SIZE` candidates, one transaction per chunk. The
+    changes and selection are validated before anything is written.
+
+    Request JSON body:
+    {
+        "ids": [integer, ...] or "filter": {"lastname": "Doe", ...},
+        "set": {"firstname": "string", "lastname": "string", "age": integer}
+    }
+
+    Returns:
+        JSON response with the number of candidates `updated`, and the IDs
+        `not_found` when selecting by IDs.
+    """
+    try:
+        data = request.get_json(silent=True)
+        ids, filters = validate_selection(data)
+        report = update_candidates(
+            data.get("set"),
+            ids=ids,
+            filters=filters,
+            chunk_size=current_app.config["BATCH_WRITE_CHUNK_SIZE"],
+        )
+        return jsonify(report), 200
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/candidates", methods=["DELETE"])
+def delete_candidates_in_batch():
+    """Delete candidates selected by IDs or filters.
+
+    Candidates are deleted with set-based statements, in chunks of
+    `BATCH_WRITE_CHUNK_SIZE` candidates, one transaction per chunk.
+
+    Request JSON body:
+    {
+        "ids": [integer, ...] or "filter": {"lastname": "Doe", ...}
+    }
+
+    Returns:
+        JSON response with the number of candidates `deleted`, and the IDs
+        `not_found` when selecting by IDs.
+    """
+    try:
+        ids, filters = validate_selection(request.get_json(silent=True))
+        report = delete_candidates(
+            ids=ids,
+            filters=filters,
+            chunk_size=current_app.config["BATCH_WRITE_CHUNK_SIZE"],
+        )
+        return jsonify(report), 200
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/campaigns", methods=["POST"])
+def add_campaign():
+    """Create an email campaign.
+
+    `subject` and `body` are templates rendered with the fields of each
+    candidate, e.g. "Hello {{ firstname }}". The sender defaults to
+    `CAMPAIGN_SENDER`, and the audience to every candidate.
+
+    Request JSON body:
+    {
+        "name": "string",
+        "subject": "string",
+        "body": "string",
+        "sender": "string",
+        "filter": {"lastname": "Doe", ...}
+    }
+
+    Returns:
+        JSON response with the created campaign.
+    """
+    try:
+        campaign = create_campaign(
+            request.get_json(silent=True),
+            default_sender=current_app.config["CAMPAIGN_SENDER"],
+        )
+        return jsonify(campaign.serialize()), 201
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/campaigns/<int:campaign_id>/queue", methods=["POST"])
+def queue_campaign_messages(campaign_id):
+    """Request a message for every candidate of a campaign's audience.
+
+    The messages are rendered and queued by the dispatcher (`flask
+    campaigns dispatch`), then sent by it; their progress is reported by
+    `GET /v1/campaigns/<id>`.
+
+    Returns:
+        202 Accepted with the campaign and a Location header to follow its
+        progress, 404 Not Found, or 409 Conflict if queueing the campaign
+        was already requested.
+    """
+    try:
+        campaign = request_queueing(campaign_id)
+        location = url_for(".get_single_campaign", campaign_id=campaign_id)
+        return jsonify(campaign), 202, {"Location": location}
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/campaigns/<int:campaign_id>", methods=["GET"])
+def get_single_campaign(campaign_id):
+    """Retrieve a campaign and the number of its messages by status.
+
+    Returns:
+        JSON response with the campaign and its `messages` counts.
+    """
+    try:
+        return jsonify(get_campaign(campaign_id)), 200
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/segments", methods=["POST"])
+def add_segment():
+    """Define an audience segment.
+
+    Request JSON body:
+    {
+        "name": "string",
+        "filter": {"age__between": "20,29", ...}
+    }
+
+    Returns:
+        JSON response with the created segment.
+    """
+    try:
+        segment = create_segment(request.get_json(silent=True))
+        return jsonify(segment.serialize()), 201
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/segments", methods=["GET"])
+def get_segments():
+    """List the segments with their sizes.
+
+    Returns:
+        JSON response with every segment and its `size`.
+    """
+    try:
+        return jsonify(list_segments()), 200
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/segments/<name>", methods=["PUT"])
+def update_single_segment(name):
+    """Change the filters of a segment.
+
+    Request JSON body:
+    {
+        "filter": {"age__between": "20,29", ...}
+    }
+
+    Returns:
+        JSON response with the updated segment.
+    """
+    try:
+        segment = update_segment(name, request.get_json(silent=True))
+        return jsonify(segment.serialize()), 200
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except Conflict as e:
+        return jsonify({"message": e.description}), 409
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/segments/<name>", methods=["DELETE"])
+def delete_single_segment(name):
+    """Delete a segment.
+
+    Returns:
+        JSON response confirming the deletion.
+    """
+    try:
+        delete_segment(name)
+        return jsonify({"message": "Segment deleted successfully"}), 200
+    except NotFound as e:
+        return jsonify({"message": e.description}), 404
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/segments/query", methods=["POST"])
+def query_segment_expression():
+    """Size and preview a segment, or a combination of segments.
+
+    Request JSON body:
+    {
+        "expression": "twenties" or {"exclude": ["twenties", "contacted"]},
+        "limit": integer (candidates to preview, default 20, at most 100),
+        "after": integer (preview candidates after this ID, default 0)
+    }
+
+    Returns:
+        JSON response with the `size` of the expression and the
+        `candidates` of the preview, in ID order.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or "expression" not in data:
+        return jsonify({"message": "'expression' is required."}), 400
+    limit, after = data.get("limit", 20), data.get("after", 0)
+    if not isinstance(limit, int) or not 0 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"message": f"limit must be 0 to {MAX_PAGE_SIZE}."}), 400
+    if not isinstance(after, int) or after < 0:
+        return jsonify({"message": "after must be a non-negative integer."}), 400
+    try:
+        return jsonify(query_segments(data["expression"], limit, after)), 200
+    except BadRequest as e:
+        return jsonify({"message": e.description}), 400
+    except InternalServerError as e:
+        return jsonify({"message": e.description}), 500
+
+
+@blueprint.route("/cache/stats", methods=["GET"])
+@admin_only
+def get_cache_stats():
+    """Report the candidate cache counters.
+
+    Requires the admin token (see `admin_only`).
+
+    Returns:
+        JSON response with the cache backend, its size and its hit, miss
+        and eviction counters (for this worker process).
+    """
+    return jsonify(cache.stats()), 200
+
+
+@blueprint.route("/admission/stats", methods=["GET"])
+@admin_only
+def get_admission_stats():
+    """Report the admission control counters.
+
+    Requires the admin token (see `admin_only`).
+
+    Returns:
+        JSON response with the admission limits, the requests in flight
+        and queued, and the requests admitted, queued and shed per
+        priority class (for this worker process).
+    """
+    return jsonify(admission.stats()), 200
+
+
+@blueprint.route("/db/stats", methods=["GET"])
+@admin_only
+def get_db_stats():
+    """Report the database connection pool counters.
+
+    Requires the admin token (see `admin_only`).
+
+    Returns:
+        JSON response with, for the primary and every replica, the pool
+        size, the connections checked out, the saturation and how long
+        checkouts waited for a connection (for this worker process).
+    """
+    return jsonify(engine_stats()), 200
+
+
+@blueprint.route("/db/profile", methods=["GET"])
+@admin_only
+def get_db_profile():
+    """Browse the slow queries and N+1 patterns seen by the SQL profiler.
+
+    Only available when `SQL_PROFILER_ENABLED` is set, and requires the
+    admin token (see `admin_only`) since it exposes SQL text and plans.
+    Entries are kept per worker process.
+
+    Request query parameters:
+        limit: Maximum number of entries of each kind (default is 50).
+
+    Returns:
+        JSON response with the most recent `slow_queries`, with their
+        EXPLAIN plan, and requests flagged as `n_plus_one`, newest first.
+    """
+    if not profiler.enabled:
+        return jsonify({"error": "SQL profiling is disabled."}), 404
+    try:
+        limit = max(int(request.args.get("limit", 50)), 1)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer."}), 400
+    return jsonify(profiler.report(limit)), 200
@@ -0,0 +1,480 @@
+"""Candidate search index
+
+Module providing an in-memory trigram index over candidate names and
+emails, used for ranked fuzzy lookups that tolerate partial and misspelled
+queries without LIKE '%x%' scans.
+
+The index is loaded at startup, in the background, from a compact
+on-disk snapshot (and caught up with the database), or built from the
+database and snapshotted when no snapshot exists; searches made before it
+is ready are answered with 503. It is then kept current by the candidate
+signals of this process, and caught up with writes made by other worker
+processes through the `updated_at` column every
+`SEARCH_INDEX_REFRESH_SECONDS`.
+
+The snapshot holds data only, so a tampered file cannot run code: a JSON
+header (documents, trigrams and posting list lengths) followed by the
+posting lists, packed as little-endian unsigned 32-bit integers, the whole
+compressed with zlib. It is written to the application's instance folder
+unless `SEARCH_INDEX_PATH` is set.
+
+Classes:
+    TrigramIndex: Inverted index from trigrams to candidate IDs.
+    SearchState: The search index of an application and its watermark.
+    CandidateSearch: Flask extension managing the index of an application.
+
+Example:
+    >>> from app.search import search_index
+    >>> search_index.init_app(app)
+    >>> search_index.search("jon smyth", limit=10)
+    [(42, 0.71), ...]
+"""
+
+import json
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+from sqlalchemy import select
+from werkzeug.exceptions import ServiceUnavailable
+from app.models import db
+from app.models.candidates import Candidate
+from app.signals import candidate_created, candidate_deleted, candidate_updated
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 2
+# Length of the JSON header of a snapshot, in bytes.
+SNAPSHOT_HEADER = struct.Struct("<Q")
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to candidate IDs.
+
+    Posting lists are compact integer arrays that are only ever appended
+    to; entries left behind by updated or removed documents are skipped at
+    query time and dropped by `compact`, which runs once they make up half
+    of the index.
+    """
+
+    # Stop adding posting lists once this many entries have been counted.
+    MAX_SCANNED_POSTINGS = 20000
+    # Number of best-overlapping documents that are scored exactly.
+    CANDIDATE_POOL = 100
+    MIN_SCORE = 0.3
+
+    def __init__(self):
+        self.documents: Dict[int, str] = {}
+        self.postings: Dict[str, array] = {}
+        self.size = 0
+        self.stale = 0
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def normalize(*values: Optional[str]) -> str:
+        """Lowercase and strip accents from the searchable fields."""
+        text = " ".join(value for value in values if value)
+        text = unicodedata.normalize("NFKD", text.lower())
+        return "".join(char for char in text if not unicodedata.combining(char))
+
+    @staticmethod
+    def trigrams(text: str) -> Set[str]:
+        """Return the trigrams of each word of `text`, padded at the edges."""
+        grams = set()
+        for word in text.split():
+            padded = f"  {word} "
+            grams.update([padded[i : i + 3] for i in range(len(padded) - 2)])
+        return grams
+
+    def _append(self, candidate_id: int, grams: Iterable[str]) -> None:
+        for gram in grams:
+            postings = self.postings.get(gram)
+            if postings is None:
+                postings = self.postings[gram] = array("I")
+            postings.append(candidate_id)
+            self.size += 1
+
+    def add(self, candidate_id: int, text: str) -> None:
+        """Index (or re-index) a candidate's normalized text."""
+        with self.lock:
+            previous = self.documents.get(candidate_id)
+            grams = self.trigrams(text)
+            if previous is not None:
+                old_grams = self.trigrams(previous)
+                self.stale += len(old_grams - grams)
+                grams -= old_grams
+            self.documents[candidate_id] = text
+            self._append(candidate_id, grams)
+            self._maybe_compact()
+
+    def remove(self, candidate_id: int) -> None:
+        """Remove a candidate from the index."""
+        with self.lock:
+            previous = self.documents.pop(candidate_id, None)
+            if previous is not None:
+                self.stale += len(self.trigrams(previous))
+                self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self.stale > 1000 and self.stale * 2 > self.size:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rebuild the posting lists from the current documents."""
+        with self.lock:
+            self.postings, self.size, self.stale = {}, 0, 0
+            for candidate_id, text in self.documents.items():
+                self._append(candidate_id, self.trigrams(text))
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Return the best matching candidate IDs with their scores.
+
+        Documents sharing the rarest trigrams of the query are counted
+        first, up to a fixed budget of posting entries so the cost does not
+        grow with the index; the best-overlapping ones are then scored
+        exactly, mostly on the share of query trigrams they contain.
+
+        Args:
+            query: Free-text query.
+            limit: Maximum number of results (default is 10).
+
+        Returns:
+            List[Tuple[int, float]]: (candidate ID, score) pairs, best first.
+        """
+        grams = self.trigrams(self.normalize(query))
+        if not grams:
+            return []
+
+        with self.lock:
+            counts: Counter = Counter()
+            scanned = 0
+            for postings in sorted(
+                (self.postings.get(gram, ()) for gram in grams), key=len
+            ):
+                remaining = self.MAX_SCANNED_POSTINGS - scanned
+                if len(postings) > remaining:
+                    if scanned:
+                        break
+                    # Even the rarest trigram is very common: a sample of
+                    # its postings is enough to fill the candidate pool.
+                    postings = postings[:remaining]
+                counts.update(postings)
+                scanned += len(postings)
+
+            results = []
+            for candidate_id, _ in counts.most_common(self.CANDIDATE_POOL):
+                text = self.documents.get(candidate_id)
+                if text is None:
+                    continue
+                document_grams = self.trigrams(text)
+                overlap = len(grams & document_grams)
+                score = 0.8 * overlap / len(grams) + 0.2 * overlap / len(
+                    grams | document_grams
+                )
+                if score >= self.MIN_SCORE:
+                    results.append((candidate_id, round(score, 4)))
+
+        results.sort(key=lambda result: (-result[1], result[0]))
+        return results[:limit]
+
+    def dump(self, path: str, watermark: Optional[datetime]) -> None:
+        """Atomically write a compressed snapshot of the index to `path`."""
+        with self.lock:
+            grams = list(self.postings.items())
+            header = json.dumps(
+                {
+                    "format": SNAPSHOT_FORMAT,
+                    "watermark": watermark.isoformat() if watermark else None,
+                    "documents": list(self.documents.items()),
+                    "grams": [[gram, len(postings)] for gram, postings in grams],
+                    "size": self.size,
+                    "stale": self.stale,
+                }
+            ).encode("utf-8")
+            packed = array("I")
+            for _, postings in grams:
+                packed.extend(postings)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as handle:
+            compressor = zlib.compressobj(1)
+            handle.write(compressor.compress(SNAPSHOT_HEADER.pack(len(header))))
+            handle.write(compressor.compress(header))
+            handle.write(compressor.compress(packed.tobytes()))
+            handle.write(compressor.flush())
+        os.replace(handle.name, path)
+
+    def load(self, path: str) -> Optional[datetime]:
+        """Replace the index with the snapshot at `path`.
+
+        Raises:
+            ValueError: If the file is not a snapshot of this format.
+
+        Returns:
+            Optional[datetime]: The watermark stored with the snapshot.
+        """
+        with open(path, "rb") as handle:
+            try:
+                data = zlib.decompress(handle.read())
+                (length,) = SNAPSHOT_HEADER.unpack_from(data)
+                start = SNAPSHOT_HEADER.size
+                header = json.loads(data[start : start + length])
+            except (zlib.error, struct.error, UnicodeDecodeError) as e:
+                raise ValueError(f"Invalid search index snapshot: {path}") from e
+        if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported search index snapshot: {path}")
+
+        packed = array("I")
+        packed.frombytes(data[start + length :])
+        if sys.byteorder == "big":
+            packed.byteswap()
+        if sum(count for _, count in header["grams"]) != len(packed):
+            raise ValueError(f"Truncated search index snapshot: {path}")
+
+        postings, offset = {}, 0
+        for gram, count in header["grams"]:
+            postings[gram] = packed[offset : offset + count]
+            offset += count
+        with self.lock:
+            self.documents = {
+                int(candidate_id): text for candidate_id, text in header["documents"]
+            }
+            self.postings = postings
+            self.size = header["size"]
+            self.stale = header["stale"]
+        watermark = header["watermark"]
+        return datetime.fromisoformat(watermark) if watermark else None
+
+
+class SearchState:
+    """The search index of an application and how far it has caught up.
+
+    Args:
+        path: Snapshot file of the index.
+        refresh_seconds: How often searches catch up with the database.
+    """
+
+    # Rows updated this long before the watermark are read again when
+    # catching up, in case they were committed after newer rows.
+    CATCH_UP_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, path: str, refresh_seconds: float):
+        self.path = path
+        self.refresh_seconds = refresh_seconds
+        self.index: Optional[TrigramIndex] = None
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.load_lock = threading.Lock()
+        # Guards starting the loader thread (`load_lock` guards loading).
+        self.start_lock = threading.Lock()
+        self.loader: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _rows(query) -> Iterable:
+        result = db.session.execute(
+            query.execution_options(stream_results=True, yield_per=5000)
+        )
+        for rows in result.partitions():
+            yield from rows
+
+    def catch_up(self, index: TrigramIndex, full: bool = False) -> None:
+        """Index the candidates updated since the watermark (or all of them)."""
+        self.refreshed_at = time.monotonic()
+        query = select(
+            Candidate.id,
+            Candidate.firstname,
+            Candidate.lastname,
+            Candidate.email,
+            Candidate.updated_at,
+        )
+        if not full and self.watermark is not None:
+            query = query.where(
+                Candidate.updated_at > self.watermark - self.CATCH_UP_OVERLAP
+            )
+        for row in self._rows(query):
+            index.add(row.id, index.normalize(row.firstname, row.lastname, row.email))
+            if row.updated_at and (
+                self.watermark is None or row.updated_at > self.watermark
+            ):
+                self.watermark = row.updated_at
+
+    def build(self) -> TrigramIndex:
+        """Build the index from the database and write a snapshot."""
+        index = TrigramIndex()
+        self.watermark = None
+        self.catch_up(index, full=True)
+        index.dump(self.path, self.watermark)
+        self.index = index
+        logger.info("Search index built with %s candidates", len(index.documents))
+        return index
+
+    def load(self) -> TrigramIndex:
+        """Load the snapshot and catch it up, or build the index if missing.
+
+        Blocks until the index is ready: the whole build, if there is no
+        usable snapshot. Requests use `start_loading` instead.
+        """
+        with self.load_lock:
+            if self.index is not None:
+                return self.index
+            if not os.path.exists(self.path):
+                return self.build()
+
+            index = TrigramIndex()
+            try:
+                self.watermark = index.load(self.path)
+            except ValueError as e:
+                logger.warning("%s, rebuilding the search index", e)
+                return self.build()
+            self.catch_up(index)
+            live = {row.id for row in self._rows(select(Candidate.id))}
+            for candidate_id in set(index.documents) - live:
+                index.remove(candidate_id)
+            self.index = index
+            logger.info("Search index loaded with %s candidates", len(index.documents))
+            return index
+
+    def start_loading(self, app: Flask) -> None:
+        """Load the index of `app` in a background thread, if not loaded yet.
+
+        Called once each worker process has started, and by searches made
+        before the index is ready, so no request waits for a build.
+        """
+        if self.index is not None:
+            return
+        with self.start_lock:
+            if self.loader is not None and self.loader.is_alive():
+                return
+            self.loader = threading.Thread(
+                target=self._load_in_background,
+                args=(app,),
+                name="search-index-loader",
+                daemon=True,
+            )
+            self.loader.start()
+
+    def _load_in_background(self, app: Flask) -> None:
+        try:
+            with app.app_context():
+                self.load()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Error loading the search index")
+
+
+class CandidateSearch:
+    """Flask extension managing the search index of an application.
+
+    Settings:
+        SEARCH_INDEX_PATH: Snapshot file of the index (default is
+            'search-index.bin' in the application's instance folder).
+        SEARCH_INDEX_REFRESH_SECONDS: How often searches catch up with
+            writes made by other processes.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Register the search state of `app` and its CLI commands."""
+        path = app.config.get("SEARCH_INDEX_PATH") or os.path.join(
+            app.instance_path, "search-index.bin"
+        )
+        refresh_seconds = float(app.config.get("SEARCH_INDEX_REFRESH_SECONDS", 5))
+        app.extensions["candidate_search"] = SearchState(path, refresh_seconds)
+        app.cli.add_command(search_index_cli)
+
+    @property
+    def state(self) -> SearchState:
+        """The search state of the current application."""
+        return current_app.extensions["candidate_search"]
+
+    def build(self) -> TrigramIndex:
+        """Rebuild the index of the current application and snapshot it."""
+        return self.state.build()
+
+    @staticmethod
+    def warm_up(app: Flask) -> None:
+        """Start loading the index of `app` in the background.
+
+        Called by each gunicorn worker once it has started (see
+        `gunicorn.conf.py`). Elsewhere, the first search starts it.
+        """
+        state = app.extensions.get("candidate_search")
+        if state is not None:
+            state.start_loading(app)
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """Search the index, catching it up first if needed.
+
+        Args:
+            query: Free-text query.
+            limit: Maximum number of results (default is 10).
+
+        Raises:
+            ServiceUnavailable: If the index is still loading.
+
+        Returns:
+            List[Tuple[int, float]]: (candidate ID, score) pairs, best first.
+        """
+        state = self.state
+        index = state.index
+        if index is None:
+            state.start_loading(current_app._get_current_object())
+            raise ServiceUnavailable(
+                description="The search index is loading. Please try again shortly."
+            )
+        if time.monotonic() - state.refreshed_at > state.refresh_seconds:
+            state.catch_up(index)
+        return index.search(query, limit)
+
+
+search_index = CandidateSearch()
+
+search_index_cli = AppGroup("search-index", help="Manage the candidate search index.")
+
+
+@search_index_cli.command("build")
+def build_search_index():
+    """Rebuild the search index from the database and snapshot it."""
+    index = search_index.build()
+    click.echo(f"Indexed {len(index.documents)} candidates.")
+
+
+def _index_of(app: Flask) -> Optional[TrigramIndex]:
+    state = app.extensions.get("candidate_search")
+    return state.index if state is not None else None
+
+
+# pylint: disable=unused-argument
+@candidate_created.connect
+@candidate_updated.connect
+def _index_candidate(app: Flask, candidate: dict, **extra) -> None:
+    """Index a created or updated candidate (once the index is loaded)."""
+    index = _index_of(app)
+    if index is not None:
+        index.add(
+            candidate["id"],
+            index.normalize(
+                candidate["firstname"], candidate["lastname"], candidate["email"]
+            ),
+        )
+
+
+# pylint: disable=unused-argument
+@candidate_deleted.connect
+def _unindex_candidate(app: Flask, candidate: dict, **extra) -> None:
+    """Remove a deleted candidate from the index (once it is loaded)."""
+    index = _index_of(app)
+    if index is not None:
+        index.remove(candidate["id"])
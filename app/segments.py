@@ -0,0 +1,384 @@
+"""Audience segments
+
+Module keeping the candidates of every segment (see `app.models.segments`)
+in memory, as bitmaps with one bit per candidate ID, so segments can be
+sized, combined and previewed without querying the Candidate table.
+
+A bitmap of one million candidate IDs takes 125 KB. Sizes are counted as
+candidates are added and removed, and unions, intersections and
+exclusions are single operations over the whole bitmaps.
+
+Segments are materialized on first use, with one indexed query per
+segment, and then kept current:
+
+* by the candidate signals of this process, testing each created or
+  updated candidate against the segment filters in Python (see
+  `app.handlers.filters.compile_predicate`);
+* every `SEGMENT_REFRESH_SECONDS`, by re-testing the candidates updated
+  since the last refresh (e.g. by other worker processes, or by bulk
+  imports, which send no signals), and reloading the definitions;
+* every `SEGMENT_REBUILD_SECONDS`, by materializing them again, which drops
+  candidates deleted by other processes and repairs any drift between the
+  Python and SQL filters.
+
+On MySQL, whose default collations ignore case, the Python filters ignore
+case too; collations ignoring accents as well still drift until the next
+rebuild.
+
+Classes:
+    IDBitmap: Set of candidate IDs stored as a bitmap.
+    MaterializedSegment: A segment definition and its candidates.
+    SegmentState: The materialized segments of an application.
+    AudienceSegments: Flask extension managing the segments of an application.
+
+Example:
+    >>> from app.segments import segments
+    >>> segments.init_app(app)
+    >>> len(segments.current()["twenties"].bitmap)
+    1873
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+from flask import Flask, current_app
+from sqlalchemy import func, select
+from app.models import db
+from app.models.candidates import Candidate
+from app.models.segments import Segment
+from app.handlers.filters import compile_filters, compile_predicate
+from app.serializers import CANDIDATE_FIELDS, candidate_columns
+from app.signals import candidate_created, candidate_deleted, candidate_updated
+
+logger = logging.getLogger(__name__)
+
+_NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+# Databases whose default collations compare strings ignoring case.
+CASE_INSENSITIVE_DIALECTS = ("mysql", "mariadb")
+
+
+class IDBitmap:
+    """Set of candidate IDs stored as a bitmap, one bit per ID.
+
+    Args:
+        ids: Initial IDs of the set.
+    """
+
+    __slots__ = ("data", "count")
+
+    def __init__(self, ids=()):
+        self.data = bytearray()
+        self.count = 0
+        for candidate_id in ids:
+            self.add(candidate_id)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, candidate_id: int) -> bool:
+        index = candidate_id >> 3
+        return index < len(self.data) and bool(
+            self.data[index] & (1 << (candidate_id & 7))
+        )
+
+    def add(self, candidate_id: int) -> None:
+        """Add an ID to the set."""
+        index, mask = candidate_id >> 3, 1 << (candidate_id & 7)
+        if index >= len(self.data):
+            # Grow geometrically: IDs mostly arrive in increasing order.
+            self.data.extend(bytes(max(index + 1 - len(self.data), len(self.data))))
+        if not self.data[index] & mask:
+            self.data[index] |= mask
+            self.count += 1
+
+    def discard(self, candidate_id: int) -> None:
+        """Remove an ID from the set, if present."""
+        index, mask = candidate_id >> 3, 1 << (candidate_id & 7)
+        if index < len(self.data) and self.data[index] & mask:
+            self.data[index] &= ~mask
+            self.count -= 1
+
+    def to_int(self) -> int:
+        """Return the set as an integer, bit `n` standing for ID `n`.
+
+        Set operations on these integers (`|`, `&`, `& ~`) run over whole
+        machine words, and `int.bit_count` sizes the result.
+        """
+        return int.from_bytes(self.data, "little")
+
+
+def iter_ids(bits: int, after: int = 0) -> Iterator[int]:
+    """Yield the IDs of a bitmap integer greater than `after`, in order."""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for match in _NONZERO_BYTE.finditer(data, max(after + 1, 0) >> 3):
+        index, byte = match.start(), data[match.start()]
+        for bit in range(8):
+            candidate_id = (index << 3) | bit
+            if byte & (1 << bit) and candidate_id > after:
+                yield candidate_id
+
+
+class MaterializedSegment:
+    """A segment definition and its candidates.
+
+    Args:
+        name: Name of the segment.
+        filters: Filters of the segment, JSON-encoded.
+        fold_case: Whether string filters ignore case, as the database's
+            collation does (default is False).
+    """
+
+    __slots__ = ("name", "filters", "matches", "bitmap")
+
+    def __init__(self, name: str, filters: str, fold_case: bool = False):
+        self.name = name
+        self.filters = filters
+        self.matches: Callable[[Mapping], bool] = compile_predicate(
+            json.loads(filters), fold_case=fold_case
+        )
+        self.bitmap = IDBitmap()
+
+    def materialize(self) -> "MaterializedSegment":
+        """Load the IDs of the candidates matching the filters."""
+        bitmap = IDBitmap()
+        query = select(Candidate.id).where(*compile_filters(json.loads(self.filters)))
+        result = db.session.execute(
+            query.execution_options(stream_results=True, yield_per=10000)
+        )
+        for ids in result.scalars().partitions():
+            for candidate_id in ids:
+                bitmap.add(candidate_id)
+        self.bitmap = bitmap
+        return self
+
+    def apply(self, candidate: Mapping) -> None:
+        """Add or remove a created or updated candidate."""
+        if self.matches(candidate):
+            self.bitmap.add(candidate["id"])
+        else:
+            self.bitmap.discard(candidate["id"])
+
+
+class SegmentState:
+    """The materialized segments of an application.
+
+    Segments are materialized without holding `lock`, so writes are not
+    held up behind the queries: the candidates written meanwhile are
+    recorded, and applied to the new segments before they replace the
+    current ones. One thread at a time materializes or catches up, while
+    the others keep using the current segments.
+
+    Args:
+        refresh_seconds: How often segments catch up with the database.
+        rebuild_seconds: How often segments are materialized again.
+        fold_case: Whether string filters ignore case, as the database's
+            collation does (default is False).
+    """
+
+    # Rows updated this long before the watermark are read again when
+    # catching up, in case they were committed after newer rows.
+    CATCH_UP_OVERLAP = timedelta(seconds=5)
+
+    def __init__(
+        self, refresh_seconds: float, rebuild_seconds: float, fold_case: bool = False
+    ):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.fold_case = fold_case
+        self.segments: Optional[Dict[str, MaterializedSegment]] = None
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.built_at = 0.0
+        # Guards the segments; held briefly, by writers and readers.
+        self.lock = threading.RLock()
+        # Held by the thread materializing or catching up.
+        self.refresh_lock = threading.Lock()
+        # Candidates written while segments are materialized: (candidate,
+        # deleted) pairs, or None when no segment is being materialized.
+        self._written: Optional[List[Tuple[Mapping, bool]]] = None
+
+    def _definitions(self) -> Dict[str, str]:
+        return dict(db.session.execute(select(Segment.name, Segment.filters)).all())
+
+    def _materialize(
+        self,
+        definitions: Mapping[str, str],
+        install: Callable[[Dict[str, MaterializedSegment]], None],
+    ) -> Dict[str, MaterializedSegment]:
+        """Materialize segments and install them with `install`.
+
+        The candidates written meanwhile are applied to the new segments,
+        then `install` is called, both under the lock.
+        """
+        with self.lock:
+            self._written = []
+        try:
+            materialized = {
+                name: MaterializedSegment(name, filters, self.fold_case).materialize()
+                for name, filters in definitions.items()
+            }
+        except BaseException:
+            with self.lock:
+                self._written = None
+            raise
+        with self.lock:
+            written, self._written = self._written, None
+            for segment in materialized.values():
+                for candidate, deleted in written:
+                    if deleted:
+                        segment.bitmap.discard(candidate["id"])
+                    else:
+                        segment.apply(candidate)
+            install(materialized)
+        return materialized
+
+    def build(self) -> Dict[str, MaterializedSegment]:
+        """Materialize every segment from the database."""
+        watermark = db.session.execute(select(func.max(Candidate.updated_at))).scalar()
+
+        def install(materialized):
+            self.segments = materialized
+            self.watermark = watermark
+            self.built_at = self.refreshed_at = time.monotonic()
+
+        materialized = self._materialize(self._definitions(), install)
+        logger.info("Materialized %s segments", len(materialized))
+        return materialized
+
+    def catch_up(self) -> None:
+        """Reload the definitions and re-test recently updated candidates."""
+        self.refreshed_at = time.monotonic()
+        definitions = self._definitions()
+        current = self.segments
+
+        def install(materialized):
+            self.segments = {
+                name: materialized.get(name) or current[name] for name in definitions
+            }
+
+        self._materialize(
+            {
+                name: filters
+                for name, filters in definitions.items()
+                if name not in current or current[name].filters != filters
+            },
+            install,
+        )
+
+        query = select(*candidate_columns(CANDIDATE_FIELDS))
+        if self.watermark is not None:
+            query = query.where(
+                Candidate.updated_at > self.watermark - self.CATCH_UP_OVERLAP
+            )
+        result = db.session.execute(
+            query.execution_options(stream_results=True, yield_per=5000)
+        )
+        for rows in result.mappings().partitions():
+            with self.lock:
+                for row in rows:
+                    for segment in self.segments.values():
+                        segment.apply(row)
+                    if row["updated_at"] and (
+                        self.watermark is None or row["updated_at"] > self.watermark
+                    ):
+                        self.watermark = row["updated_at"]
+
+    def write(self, candidate: Mapping, deleted: bool = False) -> None:
+        """Add or remove a written candidate, once segments are loaded.
+
+        Args:
+            candidate: The candidate, as serialized by `Candidate.serialize`.
+            deleted: Whether the candidate was deleted (default is False).
+        """
+        with self.lock:
+            if self._written is not None:
+                self._written.append((candidate, deleted))
+            for segment in (self.segments or {}).values():
+                if deleted:
+                    segment.bitmap.discard(candidate["id"])
+                else:
+                    segment.apply(candidate)
+
+    def current(self) -> Dict[str, MaterializedSegment]:
+        """Return the segments, materializing or catching them up if due."""
+        segments = self.segments
+        now = time.monotonic()
+        if (
+            segments is not None
+            and now - self.built_at <= self.rebuild_seconds
+            and now - self.refreshed_at <= self.refresh_seconds
+        ):
+            return segments
+        # Wait for the first materialization; otherwise let one thread
+        # refresh, and the others use the current segments.
+        if not self.refresh_lock.acquire(blocking=segments is None):
+            return segments
+        try:
+            now = time.monotonic()
+            if self.segments is None or now - self.built_at > self.rebuild_seconds:
+                return self.build()
+            if now - self.refreshed_at > self.refresh_seconds:
+                self.catch_up()
+            return self.segments
+        finally:
+            self.refresh_lock.release()
+
+
+class AudienceSegments:
+    """Flask extension managing the segments of an application.
+
+    Settings:
+        SEGMENT_REFRESH_SECONDS: How often segments catch up with writes
+            made by other processes and with changed definitions.
+        SEGMENT_REBUILD_SECONDS: How often segments are materialized again.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        """Register the segment state of `app`."""
+        with app.app_context():
+            dialect = db.engine.dialect.name
+        app.extensions["audience_segments"] = SegmentState(
+            float(app.config.get("SEGMENT_REFRESH_SECONDS", 5)),
+            float(app.config.get("SEGMENT_REBUILD_SECONDS", 600)),
+            fold_case=dialect in CASE_INSENSITIVE_DIALECTS,
+        )
+
+    @property
+    def state(self) -> SegmentState:
+        """The segment state of the current application."""
+        return current_app.extensions["audience_segments"]
+
+    def current(self) -> Dict[str, MaterializedSegment]:
+        """Return the segments of the current application, by name."""
+        return self.state.current()
+
+    def reload(self) -> None:
+        """Reload the definitions on next use, e.g. after changing one."""
+        self.state.refreshed_at = 0.0
+
+
+segments = AudienceSegments()
+
+
+# pylint: disable=unused-argument
+@candidate_created.connect
+@candidate_updated.connect
+def _apply_candidate(app: Flask, candidate: dict, **extra) -> None:
+    """Add or remove a written candidate (once segments are materialized)."""
+    state = app.extensions.get("audience_segments")
+    if state is not None:
+        state.write(candidate)
+
+
+# pylint: disable=unused-argument
+@candidate_deleted.connect
+def _remove_candidate(app: Flask, candidate: dict, **extra) -> None:
+    """Remove a deleted candidate (once segments are materialized)."""
+    state = app.extensions.get("audience_segments")
+    if state is not None:
+        state.write(candidate, deleted=True)
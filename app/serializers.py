@@ -0,0 +1,158 @@
+"""Candidate serialization
+
+Module for serializing candidates from lightweight row tuples.
+
+List endpoints select only the columns they need (optionally narrowed by a
+`?fields=` projection) and encode the resulting rows straight to JSON,
+instead of hydrating ORM objects and serializing them one by one.
+
+The JSON encoder is pluggable: `orjson` is used when it is installed, and
+the standard library encoder otherwise. Other encoders can be registered
+with `register_encoder` and selected with the `JSON_ENCODER` setting.
+
+Functions:
+    parse_fields: Parse a comma-separated `fields` projection.
+    candidate_columns: Return the Candidate columns for a projection.
+    row_to_dict: Convert a row tuple into a JSON-ready dictionary.
+    register_encoder: Register a JSON encoder under a name.
+    encode_json: Encode an object to JSON bytes with the configured encoder.
+    json_response: Build a JSON response with the configured encoder.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from flask import Response, current_app
+from werkzeug.exceptions import BadRequest
+from app.models.candidates import Candidate
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+CANDIDATE_FIELDS = (
+    "id",
+    "firstname",
+    "lastname",
+    "email",
+    "age",
+    "created_at",
+    "updated_at",
+    "version",
+)
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+_encoders: Dict[str, Callable[[Any], bytes]] = {}
+
+
+def parse_fields(raw: Optional[str]) -> Tuple[str, ...]:
+    """Parse a comma-separated `fields` projection.
+
+    Args:
+        raw: Comma-separated field names, or None for every field.
+
+    Raises:
+        BadRequest: If a field is not a serializable candidate field.
+
+    Returns:
+        Tuple[str, ...]: The requested fields, in `CANDIDATE_FIELDS` order.
+    """
+    if not raw:
+        return CANDIDATE_FIELDS
+
+    requested = {field.strip() for field in raw.split(",") if field.strip()}
+    unknown = requested - set(CANDIDATE_FIELDS)
+    if unknown:
+        raise BadRequest(description=f"Unknown fields: {', '.join(sorted(unknown))}.")
+    return tuple(field for field in CANDIDATE_FIELDS if field in requested)
+
+
+def candidate_columns(fields: Iterable[str], model=Candidate) -> list:
+    """Return the Candidate columns for a projection.
+
+    Args:
+        fields: Field names, as returned by `parse_fields`.
+        model: Model to take the columns from (default is Candidate; the
+            archived candidates of `app.models.archive` have the same).
+
+    Returns:
+        list: The matching Candidate column attributes.
+    """
+    return [getattr(model, field) for field in fields]
+
+
+def row_to_dict(row, fields: Iterable[str] = CANDIDATE_FIELDS) -> Dict[str, Any]:
+    """Convert a row tuple into a JSON-ready dictionary.
+
+    Args:
+        row: Row with (at least) the requested fields as attributes.
+        fields: Fields to include (default is every candidate field).
+
+    Returns:
+        Dict[str, Any]: The selected fields, with datetimes in ISO format.
+    """
+    data = {field: getattr(row, field) for field in fields}
+    for field in DATETIME_FIELDS:
+        if data.get(field) is not None:
+            data[field] = data[field].isoformat()
+    return data
+
+
+def _encode_stdlib(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def register_encoder(name: str, encoder: Callable[[Any], bytes]) -> None:
+    """Register a JSON encoder under a name.
+
+    Args:
+        name: Name used to select the encoder with the `JSON_ENCODER` setting.
+        encoder: Callable turning a JSON-compatible object into bytes.
+    """
+    _encoders[name] = encoder
+
+
+register_encoder("json", _encode_stdlib)
+if orjson is not None:
+    register_encoder("orjson", orjson.dumps)
+
+
+def encode_json(obj: Any, encoder: Optional[str] = None) -> bytes:
+    """Encode an object to JSON bytes with the configured encoder.
+
+    The `JSON_ENCODER` setting selects a registered encoder; 'auto' (the
+    default) prefers orjson and falls back to the standard library.
+
+    Args:
+        obj: JSON-compatible object.
+        encoder: Name of the encoder to use instead of the `JSON_ENCODER`
+            setting of the current Flask application (default=None).
+
+    Returns:
+        bytes: The encoded document.
+    """
+    name = encoder or current_app.config.get("JSON_ENCODER", "auto")
+    if name == "auto":
+        name = "orjson" if "orjson" in _encoders else "json"
+    return _encoders[name](obj)
+
+
+def json_response(
+    payload: Any, status: int = 200, headers: Optional[dict] = None
+) -> Response:
+    """Build a JSON response with the configured encoder.
+
+    Args:
+        payload: JSON-compatible object to send.
+        status: HTTP status code (default is 200).
+        headers: Optional extra response headers.
+
+    Returns:
+        Response: The JSON response.
+    """
+    return Response(
+        encode_json(payload),
+        status=status,
+        headers=headers,
+        mimetype="application/json",
+    )
@@ -0,0 +1,34 @@
+"""Candidate signals
+
+Signals sent by the candidate handlers after a write has been committed.
+Components that keep derived state (caches, indexes, counters) subscribe
+to them instead of being called from every handler.
+
+Each signal is sent with the application as sender and the serialized
+candidate as the `candidate` keyword argument. `candidate_updated` also
+carries the serialized candidate as it was before the update as
+`previous`.
+
+Archiving a candidate (see `app.handlers.archive`) sends
+`candidate_deleted` with `archived=True`, and restoring it sends
+`candidate_created` with `restored=True`.
+
+Signals:
+    candidate_created: A candidate was created.
+    candidate_updated: A candidate was updated.
+    candidate_deleted: A candidate was deleted.
+
+Example:
+    >>> from app.signals import candidate_created
+    >>> @candidate_created.connect
+    ... def on_created(app, candidate, **extra):
+    ...     print(candidate["id"])
+"""
+
+from blinker import Namespace
+
+_signals = Namespace()
+
+candidate_created = _signals.signal("candidate-created")
+candidate_updated = _signals.signal("candidate-updated")
+candidate_deleted = _signals.signal("candidate-deleted")
@@ -1,8 +1,11 @@
 """Utility functions"""
 
 import os
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+import base64
 import hashlib
+import json
 import random
 import string
 
@@ -48,6 +51,18 @@ def get_config(
     return value
 
 
+def utcnow() -> datetime:
+    """Return the current UTC time as a naive datetime.
+
+    Timestamps are stored naive (in UTC) so that values written by the
+    application and values read back from the database compare equal.
+
+    Returns:
+        datetime: Current UTC time without tzinfo.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 def generate_random_string(length: int = 10) -> str:
     """Generate a random string of specified length.
 
@@ -83,3 +98,48 @@ def generate_md5_hash(data: str) -> str:
     md5_hash.update(data.encode("utf-8"))
     hashed_data = md5_hash.hexdigest()
     return hashed_data
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode values into an opaque, URL-safe pagination cursor.
+
+    Args:
+        *values: JSON-serializable values identifying a position in an
+            ordered result set.
+
+    Returns:
+        str: The encoded cursor.
+
+    Example:
+        >>> encode_cursor("2024-01-01T10:00:00", 42)
+        'WyIyMDI0LTAxLTAxVDEwOjAwOjAwIiw0Ml0'
+    """
+    payload = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor: The encoded cursor.
+
+    Returns:
+        List[Any]: The values the cursor was built from.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+
+    Example:
+        >>> decode_cursor('WyIyMDI0LTAxLTAxVDEwOjAwOjAwIiw0Ml0')
+        ['2024-01-01T10:00:00', 42]
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Malformed cursor: {cursor!r}") from e
+
+    if not isinstance(values, list):
+        raise ValueError(f"Malformed cursor: {cursor!r}")
+    return values
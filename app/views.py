@@ -2,7 +2,8 @@
 Views Blueprint
 
 This blueprint defines routes for rendering pages related to candidate management.
-These routes interact with the v1_blueprint API to perform CRUD operations on candidates.
+These routes call the candidate handlers in-process, the same service layer used
+by the v1 API, so rendering a page never issues an HTTP request back to this server.
 
 Routes:
     list_candidates: Render a page listing all candidates.
@@ -14,9 +15,13 @@ Routes:
 Each route corresponds to a specific page view or form submission related to candidate management.
 """
 
-import requests
-from flask import Blueprint, render_template, redirect, url_for, flash
+from logging import getLogger
+from flask import Blueprint, render_template, redirect, url_for, flash, request
 from werkzeug.exceptions import InternalServerError
+from app.handlers.candidates import get_all_candidates
+from app.routes.v1 import MAX_PAGE_SIZE
+
+logger = getLogger(__name__)
 
 blueprint = Blueprint("views", __name__)
 
@@ -24,15 +29,16 @@ blueprint = Blueprint("views", __name__)
 @blueprint.route("/candidates", methods=["GET"])
 def list_candidates():
     """Render a page listing all candidates."""
-    try:
-        response = requests.get(url_for("v1.get_all", _external=True))
-        response.raise_for_status()
-        candidates = response.json()
+    # Out of range values are clamped, as the page links may be stale.
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 10, type=int), 1), MAX_PAGE_SIZE)
 
+    try:
+        candidates = get_all_candidates(page=page, per_page=per_page)
         return render_template("candidates_list.html", candidates=candidates)
 
-    except requests.RequestException as e:
-        print(e)
+    except InternalServerError as e:
+        logger.error("Error rendering candidates list: %s", e.description)
         error_message = "Oops! Something went wrong. Please try again later. If this issue persists, please contact support."
         flash(error_message, "error")
         return render_template("candidates_list.html", candidates=[])
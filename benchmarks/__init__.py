@@ -0,0 +1,5 @@
+"""Benchmarks for the AdmitDash application.
+
+Each module in this package is a standalone script, for example:
+    $ python -m benchmarks.dashboard
+"""
@@ -0,0 +1,198 @@
+"""Admission control benchmark.
+
+Serves the application with gunicorn (one worker with `--threads`
+threads, and a database pool of `--pool-size` connections), then overloads
+it for `--duration` seconds with `--readers` clients fetching single
+candidates and pages of candidates, and `--exporters` clients streaming
+exports of the candidates (bulk requests). Every SQL statement is delayed
+by `--db-latency-ms` (see `benchmarks.async_load`), so the pool, not the
+CPU, is the bottleneck.
+
+The run is made twice: with admission control (see `app.admission`)
+disabled, where every request waits its turn for a connection, and
+enabled, where excess requests wait in a priority queue for up to
+`--queue-timeout` seconds and are otherwise answered right away with 503.
+For each class of clients, the throughput of successful responses, their
+latency percentiles and the statuses of the others are reported, along
+with the time taken to answer the turned away requests.
+
+Example:
+    $ python -m benchmarks.admission --readers 100 --exporters 10 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from benchmarks.async_load import _free_port, _wait_for
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _read_body(reader, head: bytes) -> None:
+    """Read the body of a response, sized or chunked."""
+    headers = head.lower()
+    if b"transfer-encoding: chunked" in headers:
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                return
+    for line in headers.split(b"\r\n"):
+        if line.startswith(b"content-length:"):
+            await reader.readexactly(int(line.split(b":", 1)[1]))
+
+
+async def _client(port, paths, deadline, report):
+    """Send GET requests, one connection each, until `deadline`."""
+    while time.monotonic() < deadline:
+        path = random.choice(paths)
+        started = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                f"GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n\r\n".encode(
+                    "ascii"
+                )
+            )
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            await _read_body(reader, head)
+            writer.close()
+            status = int(head.split(b" ", 2)[1])
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        if status == 200:
+            report["latencies"].append(elapsed)
+        else:
+            report["statuses"][str(status)] = report["statuses"].get(str(status), 0) + 1
+            report["failed_latencies"].append(elapsed)
+            if status == 503:
+                # Like a client honouring Retry-After, scaled down.
+                await asyncio.sleep(0.1)
+
+
+async def _drive(port, groups, duration):
+    deadline = time.monotonic() + duration
+    reports = {
+        name: {"latencies": [], "failed_latencies": [], "statuses": {}}
+        for name in groups
+    }
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            _client(port, paths, deadline, reports[name])
+            for name, (paths, clients) in groups.items()
+            for _ in range(clients)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        name: {
+            "successes_per_second": round(len(report["latencies"]) / elapsed, 1),
+            "latency": summarize(report["latencies"]) if report["latencies"] else None,
+            "other_statuses": report["statuses"],
+            "other_latency": (
+                summarize(report["failed_latencies"])
+                if report["failed_latencies"]
+                else None
+            ),
+        }
+        for name, report in reports.items()
+    }
+
+
+def run(groups, args, admission: bool) -> dict:
+    """Start gunicorn, overload it and stop it."""
+    port = _free_port()
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            os.path.join(ROOT, "gunicorn.conf.py"),
+            "--workers",
+            "1",
+            "--threads",
+            str(args.threads),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "benchmarks.async_load:wsgi_app()",
+        ],
+        cwd=ROOT,
+        env=dict(
+            os.environ,
+            BENCH_DB_LATENCY_MS=str(args.db_latency_ms),
+            LOG_LEVEL="WARNING",
+            DATABASE_POOL_SIZE=str(args.pool_size),
+            DATABASE_MAX_OVERFLOW="0",
+            DATABASE_POOL_TIMEOUT=str(args.pool_timeout),
+            ADMISSION_CONTROL_ENABLED=str(admission).lower(),
+            ADMISSION_QUEUE_TIMEOUT=str(args.queue_timeout),
+            CANDIDATE_CACHE_BACKEND="none",
+        ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(port)
+        time.sleep(1)
+        return asyncio.run(_drive(port, groups, args.duration))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    """Run the overload with and without admission control, print JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--readers", type=int, default=100)
+    parser.add_argument("--exporters", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--pool-timeout", type=float, default=5)
+    parser.add_argument("--queue-timeout", type=float, default=1)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=5)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+    reads = [f"/v1/candidates?per_page=20&page={page}" for page in range(1, 51)]
+    reads += [
+        f"/v1/candidates/{candidate_id}"
+        for candidate_id in random.sample(range(1, args.candidates + 1), 200)
+    ]
+    groups = {
+        "reads": (reads, args.readers),
+        "exports": (["/v1/candidates/export?format=ndjson"], args.exporters),
+    }
+
+    results = {
+        "readers": args.readers,
+        "exporters": args.exporters,
+        "threads": args.threads,
+        "pool_size": args.pool_size,
+        "db_latency_ms": args.db_latency_ms,
+        "duration_seconds": args.duration,
+        "without_admission_control": run(groups, args, admission=False),
+        "with_admission_control": run(groups, args, admission=True),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
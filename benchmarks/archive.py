@@ -0,0 +1,112 @@
+"""Candidate archive benchmark.
+
+Seeds `--candidates` candidates, of which the oldest `--old` fraction date
+from a past intake, then times the same requests against the current
+candidates before and after moving the old ones to the archive:
+
+* a filtered page of candidates (`GET /v1/candidates`, cursor mode);
+* the same page with its total count (`with_total=true`);
+* creating a candidate (`POST /v1/candidates`, whose unique email index
+  shrinks with the table).
+
+Also reports how fast `archive_candidates` moves candidates, and the
+latency of the page spanning both tiers (`include_archived=true`).
+
+Example:
+    $ python -m benchmarks.archive --candidates 200000 --old 0.8
+"""
+
+import argparse
+import itertools
+import json
+import time
+from datetime import timedelta
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+QUERY = "/v1/candidates?limit=20&lastname__startswith=Last1&age__gte=30"
+
+
+def measure(client, requests: int, emails) -> dict:
+    """Time the requests of the benchmark against the current candidates."""
+    results = {}
+    for name, path in (
+        ("filtered_page", QUERY),
+        ("filtered_page_with_total", QUERY + "&with_total=true"),
+        ("filtered_page_include_archived", QUERY + "&include_archived=true"),
+    ):
+        latencies = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = client.get(path)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        results[name] = summarize(latencies)
+
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.post(
+            "/v1/candidates",
+            json={"firstname": "B", "lastname": "B", "email": next(emails), "age": 30},
+        )
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 201, response.status_code
+    results["create"] = summarize(latencies)
+    return results
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=200000)
+    parser.add_argument("--old", type=float, default=0.8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import update
+    from app.handlers.archive import archive_candidates
+    from app.handlers.stats import reconcile_stats
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.utils import utcnow
+
+    with app.app_context():
+        past = utcnow() - timedelta(days=730)
+        db.session.execute(
+            update(Candidate)
+            .where(Candidate.id <= int(args.candidates * args.old))
+            .values(created_at=past, updated_at=past)
+        )
+        db.session.commit()
+        # Candidates were seeded behind the handlers' back.
+        reconcile_stats(fix=True)
+
+    client = app.test_client()
+    emails = (f"bench{i}@example.com" for i in itertools.count())
+    results = {"candidates": args.candidates, "old": args.old}
+    results["before"] = measure(client, args.requests, emails)
+
+    with app.app_context():
+        started = time.perf_counter()
+        report = archive_candidates(365, chunk_size=args.chunk_size)
+        seconds = time.perf_counter() - started
+    results["archive"] = {
+        "archived": report["archived"],
+        "seconds": round(seconds, 3),
+        "candidates_per_second": round(report["archived"] / seconds),
+    }
+    results["after"] = measure(client, args.requests, emails)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
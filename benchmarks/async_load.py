@@ -0,0 +1,236 @@
+"""Async serving load test.
+
+Serves the same database with the Flask application under gunicorn (one
+`gthread` worker, `--threads` threads) and with the asyncio application of
+`app.asgi` under uvicorn (one worker), then drives each of them with
+`--clients` concurrent keep-alive clients for `--duration` seconds and
+reports throughput, latency percentiles and errors.
+
+Clients request a mix of list pages (`GET /v1/candidates`) and single
+candidates (`GET /v1/candidates/<id>`). Passing `--db-latency-ms` adds a
+delay to every SQL statement in the thread that executes it, which stands
+in for the network round trip to a MySQL server when benchmarking against
+the local SQLite file: the Flask workers' threads block on it, while the
+asyncio worker keeps serving other requests. How many statements it keeps
+in flight is bounded by its pool (`ASYNC_DATABASE_POOL_SIZE` plus
+`ASYNC_DATABASE_MAX_OVERFLOW`).
+
+Example:
+    $ python -m benchmarks.async_load --clients 500 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+
+def _add_statement_latency(engine, seconds: float) -> None:
+    """Delay every statement executed on `engine`'s SQLite connections."""
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import event
+
+    def delay(_statement):
+        time.sleep(seconds)
+
+    @event.listens_for(engine, "connect")
+    def install(dbapi_connection, _record):
+        # aiosqlite runs statements in a thread of its own: install the
+        # callback there, so the delay does not block the event loop.
+        inner = getattr(dbapi_connection, "_connection", None)
+        if inner is not None:
+            dbapi_connection.await_(
+                inner._execute(inner._conn.set_trace_callback, delay)
+            )
+        else:
+            dbapi_connection.set_trace_callback(delay)
+
+
+def _db_latency() -> float:
+    return float(os.environ.get("BENCH_DB_LATENCY_MS", "0")) / 1000
+
+
+def wsgi_app():
+    """Flask application served by gunicorn (with the optional latency)."""
+    # pylint: disable=import-outside-toplevel
+    from app import create_app
+    from app.models import db
+
+    app = create_app("production")
+    if _db_latency():
+        with app.app_context():
+            _add_statement_latency(db.engine, _db_latency())
+    return app
+
+
+def asgi_app():
+    """Asyncio application served by uvicorn (with the optional latency)."""
+    # pylint: disable=import-outside-toplevel
+    from app.asgi import create_asgi_app
+
+    app = create_asgi_app("production")
+    if _db_latency():
+        engine = app.extensions["async_database"].kw["bind"].sync_engine
+        _add_statement_latency(engine, _db_latency())
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+async def _client(port, paths, deadline, latencies, errors):
+    """Send requests over one keep-alive connection until `deadline`."""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            path = random.choice(paths)
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("ascii"))
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def _drive(port, paths, clients, duration):
+    latencies, errors = [], {}
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(port, paths, deadline, latencies, errors) for _ in range(clients))
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "latency": summarize(latencies),
+        "errors": errors,
+    }
+
+
+def run_server(command, port, paths, args):
+    """Start a server, load it and stop it."""
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        command,
+        env=dict(os.environ, BENCH_DB_LATENCY_MS=str(args.db_latency_ms)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(port)
+        return asyncio.run(_drive(port, paths, args.clients, args.duration))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    """Run the load test against both stacks and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    paths = [f"/v1/candidates?per_page=20&page={page}" for page in range(1, 51)]
+    paths += [
+        f"/v1/candidates/{candidate_id}"
+        for candidate_id in random.sample(range(1, args.candidates + 1), 200)
+    ]
+
+    wsgi_port, asgi_port = _free_port(), _free_port()
+    results = {
+        "candidates": args.candidates,
+        "clients": args.clients,
+        "duration_seconds": args.duration,
+        "db_latency_ms": args.db_latency_ms,
+    }
+    results[f"flask_gunicorn_gthread_{args.threads}"] = run_server(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--worker-class",
+            "gthread",
+            "--workers",
+            "1",
+            "--threads",
+            str(args.threads),
+            "--backlog",
+            "2048",
+            "--bind",
+            f"127.0.0.1:{wsgi_port}",
+            "benchmarks.async_load:wsgi_app()",
+        ],
+        wsgi_port,
+        paths,
+        args,
+    )
+    results["quart_uvicorn"] = run_server(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "--factory",
+            "--no-access-log",
+            "--backlog",
+            "2048",
+            "--port",
+            str(asgi_port),
+            "benchmarks.async_load:asgi_app",
+        ],
+        asgi_port,
+        paths,
+        args,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Campaign dispatch benchmark.
+
+Seeds `--candidates` candidates, queues a campaign to all of them and
+dispatches it to a local SMTP sink, a minimal in-process server that
+accepts every message without storing it. Reports how long queueing and
+dispatching took, the dispatch throughput in messages per minute, how many
+SMTP connections were opened, and how much the peak resident memory of
+the process grew while queueing and dispatching, which should not depend
+on the audience size.
+
+Example:
+    $ python -m benchmarks.campaigns --candidates 20000 --workers 8
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import resource
+import time
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+
+
+class SMTPSink:
+    """A minimal SMTP server accepting (and discarding) every message.
+
+    Runs an asyncio server in a background thread. `rcpt_reply` may be
+    replaced to reply to RCPT TO commands with something else than 250,
+    e.g. to simulate bounces.
+    """
+
+    def __init__(self, host: str = "127.0.0.1"):
+        self.host = host
+        self.port = None
+        self.connections = 0
+        self.messages = 0
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    # pylint: disable=unused-argument
+    def rcpt_reply(self, recipient: str) -> bytes:
+        """Return the reply to `RCPT TO:<recipient>`."""
+        return b"250 OK\r\n"
+
+    async def _session(self, reader, writer) -> None:
+        self.connections += 1
+        writer.write(b"220 sink ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                writer.write(b"250-sink\r\n250 8BITMIME\r\n")
+            elif command == b"RCPT":
+                recipient = line.decode().split(":", 1)[1].strip().strip("<>")
+                writer.write(self.rcpt_reply(recipient))
+            elif command == b"DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                while await reader.readline() not in (b".\r\n", b""):
+                    pass
+                self.messages += 1
+                writer.write(b"250 Queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:  # MAIL, RSET, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    def start(self) -> "SMTPSink":
+        """Start serving on a free port."""
+        self.thread.start()
+        server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._session, self.host, 0), self.loop
+        ).result()
+        self.port = server.sockets[0].getsockname()[1]
+        return self
+
+
+def main():
+    """Queue and dispatch a campaign, then print the measurements."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+    sink = SMTPSink().start()
+
+    # pylint: disable=import-outside-toplevel
+    from app.dispatcher import CampaignDispatcher
+    from app.handlers.campaigns import create_campaign, queue_campaign
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with app.app_context():
+        campaign = create_campaign(
+            {
+                "name": "Benchmark",
+                "subject": "Hello {{ firstname }}",
+                "body": "Dear {{ firstname }} {{ lastname }},\n\nSee you soon.\n",
+            },
+            default_sender="bench@example.com",
+        )
+        started = time.perf_counter()
+        queued = queue_campaign(campaign.id)["queued"]
+        queue_seconds = time.perf_counter() - started
+
+        app.config.update(SMTP_HOST=sink.host, SMTP_PORT=sink.port)
+        dispatcher = CampaignDispatcher.from_config(
+            app.config, workers=args.workers, batch_size=args.batch_size
+        )
+        started = time.perf_counter()
+        report = dispatcher.run(once=True)
+        dispatch_seconds = time.perf_counter() - started
+    # In kilobytes on Linux.
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+
+    print(
+        json.dumps(
+            {
+                "candidates": args.candidates,
+                "workers": args.workers,
+                "batch_size": args.batch_size,
+                "queued": queued,
+                "queue_seconds": round(queue_seconds, 3),
+                "dispatch": report,
+                "dispatch_seconds": round(dispatch_seconds, 3),
+                "messages_per_minute": round(report["sent"] / dispatch_seconds * 60),
+                "smtp_connections": sink.connections,
+                "messages_received": sink.messages,
+                "peak_rss_growth_mb": round(rss_growth / 1024, 1),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Change feed benchmark.
+
+Seeds `--candidates` candidates, then compares two ways for a client to
+catch up after `--updates` candidates were updated and `--deletes` deleted:
+
+* re-pulling the whole collection through `GET /v1/candidates` with
+  keyset pagination, as clients had to before the change feed (which
+  still cannot tell them about deletions);
+* reading the changes since its last token through
+  `GET /v1/candidates/changes`.
+
+Reports the time, requests and bytes transferred by each, and the latency
+of a change event through `GET /v1/candidates/changes/stream` (from the
+commit of an update to the event reaching the client).
+
+Example:
+    $ python -m benchmarks.changes --candidates 100000 --updates 500
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+PAGE_SIZE = 100
+CHANGES_PAGE_SIZE = 1000
+
+
+def full_pull(client) -> dict:
+    """Page through every candidate."""
+    started = time.perf_counter()
+    requests = transferred = 0
+    cursor = None
+    while True:
+        path = f"/v1/candidates?limit={PAGE_SIZE}"
+        response = client.get(path + (f"&after={cursor}" if cursor else ""))
+        requests += 1
+        transferred += len(response.data)
+        cursor = response.get_json()["next_cursor"]
+        if cursor is None:
+            break
+    return {
+        "seconds": round(time.perf_counter() - started, 3),
+        "requests": requests,
+        "kilobytes": round(transferred / 1024),
+    }
+
+
+def delta_pull(client, token: str):
+    """Read the changes since `token`."""
+    started = time.perf_counter()
+    requests = transferred = changes = 0
+    while True:
+        response = client.get(
+            f"/v1/candidates/changes?since={token}&limit={CHANGES_PAGE_SIZE}"
+        )
+        requests += 1
+        transferred += len(response.data)
+        body = response.get_json()
+        changes += len(body["changes"])
+        token = body["next_token"]
+        if not body["more"]:
+            break
+    return token, {
+        "seconds": round(time.perf_counter() - started, 3),
+        "requests": requests,
+        "changes": changes,
+        "kilobytes": round(transferred / 1024),
+    }
+
+
+def initial_token(client) -> str:
+    """Sync from scratch and return the token of the end of the feed."""
+    token = None
+    while True:
+        path = f"/v1/candidates/changes?limit={CHANGES_PAGE_SIZE}"
+        body = client.get(path + (f"&since={token}" if token else "")).get_json()
+        token = body["next_token"]
+        if not body["more"]:
+            return token
+
+
+def measure_stream(app, token: str, updates: int) -> dict:
+    """Time updates from their commit to their event on a stream."""
+    received = {}
+    ready = threading.Event()
+
+    def listen():
+        client = app.test_client()
+        response = client.get(
+            "/v1/candidates/changes/stream",
+            headers={"Last-Event-ID": token},
+            buffered=False,
+        )
+        ready.set()
+        for chunk in response.response:
+            for line in chunk.decode().splitlines():
+                if line.startswith("data: "):
+                    change = json.loads(line[6:])
+                    received.setdefault(change["candidate"]["age"], time.perf_counter())
+            if len(received) >= updates:
+                break
+        response.close()
+
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    ready.wait()
+    client = app.test_client()
+    sent = {}
+    for index in range(updates):
+        # Each update sets a distinct age, identifying its event.
+        age = 1000 + index
+        response = client.put(f"/v1/candidates/{index + 1}", json={"age": age})
+        sent[age] = time.perf_counter()
+        assert response.status_code == 200, response.status_code
+        time.sleep(0.05)
+    listener.join(timeout=30)
+    return summarize([received[age] - sent[age] for age in sent if age in received])
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--deletes", type=int, default=50)
+    parser.add_argument("--stream-updates", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+    client = app.test_client()
+
+    token = initial_token(client)
+    rng = random.Random(0)
+    ids = rng.sample(range(1, args.candidates + 1), args.updates + args.deletes)
+    for candidate_id in ids[: args.updates]:
+        response = client.put(
+            f"/v1/candidates/{candidate_id}", json={"lastname": "Updated"}
+        )
+        assert response.status_code == 200, response.status_code
+    for candidate_id in ids[args.updates :]:
+        response = client.delete(f"/v1/candidates/{candidate_id}")
+        assert response.status_code == 200, response.status_code
+
+    results = {
+        "candidates": args.candidates,
+        "updates": args.updates,
+        "deletes": args.deletes,
+        "full_pull": full_pull(client),
+    }
+    token, results["delta_pull"] = delta_pull(client, token)
+    results["stream_event_latency"] = measure_stream(app, token, args.stream_updates)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Shared helpers for the benchmark scripts.
+
+Functions:
+    configure_environment: Fill in the environment variables the application
+        requires and point it at a local SQLite database.
+    build_app: Create an application instance with its schema provisioned.
+    seed_candidates: Insert generated candidates in batches.
+    percentile: Return the given percentile of a list of samples.
+    summarize: Summarize latency samples (in seconds) as milliseconds.
+"""
+
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+SEED_BATCH_SIZE = 5000
+
+
+def configure_environment(database_url: Optional[str] = None) -> str:
+    """Fill in the environment variables the application requires.
+
+    The benchmarks run against a local SQLite file unless `database_url`
+    (or the `DATABASE_URL` environment variable) points somewhere else.
+
+    Args:
+        database_url: Database URL to benchmark against (default=None).
+
+    Returns:
+        str: The database URL the application will use.
+    """
+    for name, value in (
+        ("HOST", "127.0.0.1"),
+        ("PORT", "5000"),
+        ("MYSQL_DATABASE", "admitdash"),
+        ("MYSQL_USER", "admitdash"),
+        ("MYSQL_PASSWORD", "admitdash"),
+        ("MYSQL_HOST", "127.0.0.1"),
+    ):
+        os.environ.setdefault(name, value)
+
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    elif "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="admitdash-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    return os.environ["DATABASE_URL"]
+
+
+def build_app(environment: str = "production"):
+    """Create an application instance with its schema provisioned.
+
+    Args:
+        environment: Configuration environment to use (default='production').
+
+    Returns:
+        Flask: The configured application.
+    """
+    # pylint: disable=import-outside-toplevel
+    from app import create_app
+    from app.models import db
+
+    app = create_app(environment)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_candidates(app, count: int) -> None:
+    """Insert `count` generated candidates in batches.
+
+    Args:
+        app: The application whose database should be seeded.
+        count: Number of candidates to insert.
+    """
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import insert, func, select
+    from app.models import db
+    from app.models.candidates import Candidate
+
+    with app.app_context():
+        start = db.session.execute(select(func.count(Candidate.id))).scalar()
+        for offset in range(start, start + count, SEED_BATCH_SIZE):
+            stop = min(offset + SEED_BATCH_SIZE, start + count)
+            db.session.execute(
+                insert(Candidate),
+                [
+                    {
+                        "firstname": f"First{i}",
+                        "lastname": f"Last{i % 997}",
+                        "email": f"candidate{i}@example.com",
+                        "age": 18 + i % 40,
+                    }
+                    for i in range(offset, stop)
+                ],
+            )
+            db.session.commit()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Return the `pct` percentile of `samples` (nearest-rank method)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (in seconds) as milliseconds."""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples, default=0.0) * 1000, 3),
+    }
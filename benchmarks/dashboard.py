@@ -0,0 +1,142 @@
+"""Dashboard latency and worker occupancy benchmark.
+
+Compares rendering the candidates dashboard in-process (the current
+`views.list_candidates`) against the previous implementation, which fetched
+the list through an HTTP loopback request to `v1.get_all`. The legacy view is
+re-created here so both variants run against the same server and database.
+
+For each variant the benchmark reports the latency percentiles of dashboard
+hits, the peak number of requests the server was handling at once, and the
+worker-seconds consumed per dashboard hit. Passing `--single-threaded` serves
+the app with one worker, which makes the loopback variant time out.
+
+Example:
+    $ python -m benchmarks.dashboard --candidates 1000 --requests 500
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Blueprint, render_template, url_for
+from werkzeug.serving import make_server
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+legacy = Blueprint("legacy", __name__)
+
+
+@legacy.route("/legacy/candidates", methods=["GET"])
+def list_candidates_over_http():
+    """The dashboard as it was rendered before: through an HTTP loopback."""
+    url = url_for("v1.get_all", _external=True)
+    with urllib.request.urlopen(url, timeout=10) as response:
+        candidates = json.loads(response.read())
+    return render_template("candidates_list.html", candidates=candidates)
+
+
+class OccupancyMiddleware:
+    """WSGI middleware tracking how many requests are in flight."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.busy_seconds = 0.0
+
+    def reset(self):
+        """Clear the collected counters."""
+        with self.lock:
+            self.peak = self.in_flight
+            self.busy_seconds = 0.0
+
+    def __call__(self, environ, start_response):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        started = time.perf_counter()
+        try:
+            return list(self.wsgi_app(environ, start_response))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+                self.busy_seconds += time.perf_counter() - started
+
+
+def run_variant(base_url, path, middleware, requests, concurrency, timeout):
+    """Hit `path` `requests` times and return the collected measurements."""
+    latencies, failures = [], 0
+
+    def hit(_):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=timeout) as response:
+                response.read()
+            return time.perf_counter() - started
+        except (urllib.error.URLError, TimeoutError):
+            return None
+
+    middleware.reset()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency in pool.map(hit, range(requests)):
+            if latency is None:
+                failures += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+
+    return {
+        **summarize(latencies),
+        "failures": failures,
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "peak_in_flight": middleware.peak,
+        "worker_seconds_per_hit": round(middleware.busy_seconds / requests, 6),
+    }
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--single-threaded", action="store_true")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    configure_environment(args.database_url)
+    app = build_app()
+    app.register_blueprint(legacy)
+    seed_candidates(app, args.candidates)
+
+    middleware = OccupancyMiddleware(app.wsgi_app)
+    app.wsgi_app = middleware
+    server = make_server("127.0.0.1", 0, app, threaded=not args.single_threaded)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    results = {
+        name: run_variant(
+            base_url, path, middleware, args.requests, args.concurrency, args.timeout
+        )
+        for name, path in (
+            ("in_process", "/candidates"),
+            ("http_loopback", "/legacy/candidates"),
+        )
+    }
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
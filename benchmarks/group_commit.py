@@ -0,0 +1,185 @@
+"""Group commit benchmark.
+
+Serves the application with gunicorn (one worker with `--clients` threads),
+then has `--clients` concurrent clients create candidates
+(`POST /v1/candidates`, each with a new email) for `--duration` seconds.
+
+The run is made three times: with group commit (see `app.group_commit`)
+disabled, where every candidate is committed by its own transaction, and
+enabled with 'full' and 'relaxed' durability, where the candidates of
+concurrent requests are committed together. For each run, the throughput
+of created candidates, their latency percentiles, the statuses of the
+other responses and the average number of candidates per transaction are
+reported.
+
+The database should be on the disk it would be in production: the gain
+comes from sharing the log flush of each commit, which a temporary file
+system makes free.
+
+Example:
+    $ python -m benchmarks.group_commit --clients 32 --duration 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from sqlalchemy import select
+
+from benchmarks.admission import _read_body
+from benchmarks.async_load import _free_port, _wait_for
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _client(port, emails, deadline, report):
+    """Create candidates over one keep-alive connection until `deadline`."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    while time.monotonic() < deadline:
+        body = json.dumps(
+            {
+                "firstname": "Group",
+                "lastname": "Commit",
+                "email": next(emails),
+                "age": 30,
+            }
+        ).encode("ascii")
+        started = time.perf_counter()
+        writer.write(
+            (
+                "POST /v1/candidates HTTP/1.1\r\nHost: bench\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("ascii")
+            + body
+        )
+        await writer.drain()
+        head = await reader.readuntil(b"\r\n\r\n")
+        await _read_body(reader, head)
+        elapsed = time.perf_counter() - started
+        status = int(head.split(b" ", 2)[1])
+        if status == 201:
+            report["latencies"].append(elapsed)
+        else:
+            report["statuses"][str(status)] = report["statuses"].get(str(status), 0) + 1
+    writer.close()
+
+
+async def _drive(port, clients, duration, run_name):
+    deadline = time.monotonic() + duration
+    emails = (f"{run_name}{i}@example.com" for i in itertools.count())
+    report = {"latencies": [], "statuses": {}}
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(port, emails, deadline, report) for _ in range(clients))
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "created_per_second": round(len(report["latencies"]) / elapsed, 1),
+        "latency": summarize(report["latencies"]) if report["latencies"] else None,
+        "other_statuses": report["statuses"],
+    }
+
+
+def _transactions(app) -> int:
+    """Number of candidate write transactions committed so far."""
+    # pylint: disable=import-outside-toplevel
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.models.versions import CollectionVersion
+
+    with app.app_context():
+        return (
+            db.session.scalar(
+                select(CollectionVersion.version).where(
+                    CollectionVersion.name == Candidate.__tablename__
+                )
+            )
+            or 0
+        )
+
+
+def run(app, args, run_name: str, durability) -> dict:
+    """Start gunicorn, create candidates with it and stop it."""
+    port = _free_port()
+    before = _transactions(app)
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            os.path.join(ROOT, "gunicorn.conf.py"),
+            "--workers",
+            "1",
+            "--threads",
+            str(args.clients),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "benchmarks.async_load:wsgi_app()",
+        ],
+        cwd=ROOT,
+        env=dict(
+            os.environ,
+            LOG_LEVEL="WARNING",
+            ADMISSION_CONTROL_ENABLED="false",
+            CANDIDATE_GROUP_COMMIT=str(durability is not None).lower(),
+            GROUP_COMMIT_DURABILITY=durability or "full",
+            GROUP_COMMIT_MAX_DELAY_MS=str(args.max_delay_ms),
+            GROUP_COMMIT_MAX_ROWS=str(args.max_rows),
+        ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for(port)
+        time.sleep(1)
+        results = asyncio.run(_drive(port, args.clients, args.duration, run_name))
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+    created = results["latency"]["count"] if results["latency"] else 0
+    transactions = _transactions(app) - before
+    results["candidates_per_transaction"] = (
+        round(created / transactions, 1) if transactions else None
+    )
+    return results
+
+
+def main():
+    """Create candidates with and without group commit, print JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=1000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--max-rows", type=int, default=100)
+    parser.add_argument("--max-delay-ms", type=float, default=2)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    results = {
+        "clients": args.clients,
+        "duration_seconds": args.duration,
+        "max_rows": args.max_rows,
+        "max_delay_ms": args.max_delay_ms,
+        "without_group_commit": run(app, args, "off", None),
+        "group_commit_full": run(app, args, "full", "full"),
+        "group_commit_relaxed": run(app, args, "relaxed", "relaxed"),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Fuzzy search latency benchmark.
+
+Builds the in-memory trigram index (`app.search.TrigramIndex`) over N
+synthetic candidates, snapshots and reloads it, then measures the latency
+of ranked searches for partial and misspelled names and emails. The
+database is not involved: this measures the index alone, which is what
+the search endpoint spends its time in besides one primary key lookup.
+
+Example:
+    $ python -m benchmarks.search --candidates 1000000 --queries 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import configure_environment, summarize
+
+FIRST_NAMES = (
+    "james mary john patricia robert jennifer michael linda william elizabeth "
+    "david barbara richard susan joseph jessica thomas sarah charles karen "
+    "amina chinedu fatima kwame ngozi oluwaseun adebayo zainab emeka chiamaka "
+    "mohammed aisha ibrahim yusuf halima musa kemi tunde bola segun"
+).split()
+LAST_NAMES = (
+    "smith johnson williams brown jones garcia miller davis rodriguez martinez "
+    "okafor adeyemi okonkwo balogun mensah owusu nwosu eze abubakar danjuma "
+    "hernandez lopez gonzalez wilson anderson thomas taylor moore jackson martin"
+).split()
+
+
+def misspell(text: str, rng: random.Random) -> str:
+    """Swap two adjacent letters of `text`."""
+    if len(text) < 3:
+        return text
+    i = rng.randrange(len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2 :]
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    configure_environment()
+    # pylint: disable=import-outside-toplevel
+    from app.search import TrigramIndex
+
+    rng = random.Random(args.seed)
+    people = []
+    index = TrigramIndex()
+    started = time.perf_counter()
+    for candidate_id in range(1, args.candidates + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email = f"{first}.{last}{candidate_id}@example.com"
+        people.append((first, last, email))
+        index.add(candidate_id, index.normalize(first, last, email))
+    build_seconds = time.perf_counter() - started
+
+    path = os.path.join(tempfile.mkdtemp(prefix="admitdash-bench-"), "search.bin")
+    started = time.perf_counter()
+    index.dump(path, None)
+    dump_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    index = TrigramIndex()
+    index.load(path)
+    load_seconds = time.perf_counter() - started
+
+    queries = []
+    for _ in range(args.queries):
+        first, last, email = rng.choice(people)
+        queries.append(
+            rng.choice(
+                (
+                    f"{first} {last}",
+                    f"{misspell(first, rng)} {last}",
+                    misspell(last, rng),
+                    email.split("@")[0][: rng.randint(6, 12)],
+                )
+            )
+        )
+
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit=10)
+        latencies.append(time.perf_counter() - started)
+
+    print(
+        json.dumps(
+            {
+                "candidates": args.candidates,
+                "build_seconds": round(build_seconds, 2),
+                "snapshot_bytes": os.path.getsize(path),
+                "snapshot_dump_seconds": round(dump_seconds, 2),
+                "snapshot_load_seconds": round(load_seconds, 2),
+                "search": summarize(latencies),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Audience segment benchmark.
+
+Defines a few segments (age bands, a sign-up window and a last-name
+range) over `--candidates` candidates, then compares sizing and
+previewing a combination of them with the equivalent SQL (COUNT and
+SELECT ... LIMIT over OR/AND/NOT conditions) against
+`POST /v1/segments/query`, answered from the in-memory bitmaps.
+
+Also reports how long the segments took to materialize, their memory,
+and the time the candidate signals spend keeping them current on writes.
+
+Example:
+    $ python -m benchmarks.segments --candidates 200000 --requests 50
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+SEGMENTS = {
+    "signed_up": {"created_at__between": "2000-01-01,2100-01-01"},
+    "twenties": {"age__between": "20,29"},
+    "mid_twenties": {"age__between": "24,26"},
+    "last_range": {"lastname__gte": "Last1", "lastname__lt": "Last5"},
+}
+EXPRESSION = {
+    "intersect": [
+        "signed_up",
+        {"exclude": [{"union": ["twenties", "last_range"]}, "mid_twenties"]},
+    ]
+}
+
+
+def measure_updates(client, count: int):
+    """Time `count` candidate updates."""
+    latencies = []
+    for index in range(count):
+        started = time.perf_counter()
+        response = client.put(
+            f"/v1/candidates/{index + 1}", json={"age": 20 + index % 20}
+        )
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return summarize(latencies)
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import and_, func, not_, or_, select
+    from app.handlers.filters import compile_filters
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.segments import segments
+
+    client = app.test_client()
+    results = {"candidates": args.candidates}
+    # Segments are not materialized yet: writes do not maintain them.
+    results["update_without_segments"] = measure_updates(client, args.requests)
+    for name, filters in SEGMENTS.items():
+        client.post("/v1/segments", json={"name": name, "filter": filters})
+
+    with app.app_context():
+        started = time.perf_counter()
+        materialized = segments.state.build()
+        results["materialize_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        results["bitmap_kb"] = round(
+            sum(len(segment.bitmap.data) for segment in materialized.values()) / 1024
+        )
+
+        conditions = {
+            name: and_(*compile_filters(filters)) for name, filters in SEGMENTS.items()
+        }
+        condition = and_(
+            conditions["signed_up"],
+            or_(conditions["twenties"], conditions["last_range"]),
+            not_(conditions["mid_twenties"]),
+        )
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            size = db.session.execute(
+                select(func.count()).select_from(Candidate).where(condition)
+            ).scalar()
+            db.session.execute(
+                select(Candidate).where(condition).order_by(Candidate.id).limit(20)
+            ).all()
+            latencies.append(time.perf_counter() - started)
+        results["sql"] = summarize(latencies)
+
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        response = client.post("/v1/segments/query", json={"expression": EXPRESSION})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+        assert response.get_json()["size"] == size
+    results["bitmaps_endpoint"] = summarize(latencies)
+
+    results["update_with_segments"] = measure_updates(client, args.requests)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""List serialization microbenchmark.
+
+Compares two ways of producing a page of candidates as JSON:
+
+* orm: load hydrated `Candidate` objects, call `serialize()` on each and
+  encode with `jsonify`, as the list endpoints used to.
+* projection: select the columns as row tuples, convert them with
+  `row_to_dict` and encode with the configured fast encoder, as the list
+  endpoints do now. A narrow `id,email` projection is measured as well.
+
+Example:
+    $ python -m benchmarks.serialization --candidates 5000 --repeat 200
+"""
+
+import argparse
+import json
+import timeit
+
+from flask import jsonify
+from sqlalchemy import select
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--page-sizes", default="10,100,1000")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    # pylint: disable=import-outside-toplevel
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.serializers import (
+        CANDIDATE_FIELDS,
+        candidate_columns,
+        encode_json,
+        row_to_dict,
+    )
+
+    def orm_page(size):
+        candidates = Candidate.query.order_by(Candidate.id).limit(size).all()
+        body = jsonify([candidate.serialize() for candidate in candidates]).data
+        db.session.remove()
+        return body
+
+    def projection_page(size, fields=CANDIDATE_FIELDS):
+        query = select(*candidate_columns(fields)).order_by(Candidate.id).limit(size)
+        rows = db.session.execute(query).all()
+        body = encode_json([row_to_dict(row, fields) for row in rows])
+        db.session.remove()
+        return body
+
+    results = {}
+    with app.test_request_context():
+        for size in (int(size) for size in args.page_sizes.split(",")):
+            variants = {
+                "orm": lambda size=size: orm_page(size),
+                "projection": lambda size=size: projection_page(size),
+                "projection_id_email": lambda size=size: projection_page(
+                    size, ("id", "email")
+                ),
+            }
+            results[size] = {
+                name: round(
+                    min(timeit.repeat(variant, number=1, repeat=args.repeat)) * 1000,
+                    4,
+                )
+                for name, variant in variants.items()
+            }
+            results[size]["speedup"] = round(
+                results[size]["orm"] / results[size]["projection"], 2
+            )
+
+    print(json.dumps({"unit": "ms per page (best of repeats)", **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
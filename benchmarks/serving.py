@@ -0,0 +1,204 @@
+"""Production serving benchmark.
+
+Serves the application with gunicorn, configured by `gunicorn.conf.py`,
+once per core count of `--cores` (default: 1, 2, 4, ... up to every core
+but one, which is left to the load generator), with the server pinned to
+that many cores and running `--workers-per-core` workers per core. Each
+server is driven by `--clients` concurrent keep-alive clients for
+`--duration` seconds, and the throughput and latency percentiles are
+reported per core count, showing how throughput scales with cores.
+
+On a single core, the server shares it with the load generator, and a
+run with `--workers-per-core 2` shows what oversubscribing costs.
+
+`--db-latency-ms` adds a delay to every SQL statement, standing in for
+the round trip to a MySQL server (see `benchmarks.async_load`): the
+threads of each worker (`--threads`) overlap these waits.
+
+Finally, the server is reloaded (SIGHUP) in the middle of a run of the
+largest worker count, and the run's errors are reported: a graceful
+reload drains in-flight requests, so there should be none. Exiting workers
+do close their idle keep-alive connections, which races with clients
+sending a request on them; like HTTP clients do for idempotent requests,
+the benchmark clients then resend the request on a new connection once,
+and these `reconnects` are reported separately.
+
+Example:
+    $ python -m benchmarks.serving --clients 200 --duration 10 --db-latency-ms 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+from benchmarks.async_load import _free_port, _wait_for
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _request(reader, writer, path):
+    """Send a GET over a connection and return the response status."""
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode("ascii"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    if b"connection: close" in head.lower():
+        writer.close()
+        return int(head.split(b" ", 2)[1]), True
+    return int(head.split(b" ", 2)[1]), False
+
+
+async def _client(port, paths, deadline, report):
+    """Send requests over keep-alive connections until `deadline`."""
+    reader = writer = None
+    while time.monotonic() < deadline:
+        path = random.choice(paths)
+        started = time.perf_counter()
+        for attempt in range(2):
+            reused = writer is not None
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                status, closed = await _request(reader, writer, path)
+                if closed:
+                    reader = writer = None
+                break
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                if reused and attempt == 0:
+                    # The server closed an idle connection: resend once.
+                    report["reconnects"] += 1
+                    continue
+                status = type(e).__name__
+                await asyncio.sleep(0.05)
+        report["latencies"].append(time.perf_counter() - started)
+        if status != 200:
+            report["errors"][str(status)] = report["errors"].get(str(status), 0) + 1
+    if writer is not None:
+        writer.close()
+
+
+async def _drive(port, paths, clients, duration):
+    report = {"latencies": [], "errors": {}, "reconnects": 0}
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_client(port, paths, deadline, report) for _ in range(clients))
+    )
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": round(len(report["latencies"]) / elapsed, 1),
+        "latency": summarize(report["latencies"]),
+        "errors": report["errors"],
+        "reconnects": report["reconnects"],
+    }
+
+
+def run_gunicorn(cores, paths, args, reload_after=None):
+    """Start gunicorn on the given cores, load it and stop it."""
+    workers = len(cores) * args.workers_per_core
+    port = _free_port()
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "--config",
+            os.path.join(ROOT, "gunicorn.conf.py"),
+            "--workers",
+            str(workers),
+            "--threads",
+            str(args.threads),
+            "--bind",
+            f"127.0.0.1:{port}",
+            "benchmarks.async_load:wsgi_app()",
+        ],
+        cwd=ROOT,
+        env=dict(
+            os.environ, BENCH_DB_LATENCY_MS=str(args.db_latency_ms), LOG_LEVEL="WARNING"
+        ),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # Workers inherit the affinity of the master.
+        preexec_fn=lambda: os.sched_setaffinity(0, cores),
+    )
+
+    async def drive():
+        if reload_after is not None:
+            asyncio.get_running_loop().call_later(
+                reload_after, server.send_signal, signal.SIGHUP
+            )
+        return await _drive(port, paths, args.clients, args.duration)
+
+    try:
+        _wait_for(port)
+        # Let every worker boot before measuring.
+        time.sleep(1 + workers * 0.2)
+        return asyncio.run(drive())
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    """Load gunicorn with every worker count and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--cores", type=int, nargs="+")
+    parser.add_argument("--workers-per-core", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    available = sorted(os.sched_getaffinity(0))
+    core_counts = args.cores or [
+        count
+        for count in (1, 2, 4, 8, 16, 32, 64)
+        if count <= max(len(available) - 1, 1)
+    ]
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+    paths = [f"/v1/candidates?per_page=20&page={page}" for page in range(1, 51)]
+    paths += [
+        f"/v1/candidates/{candidate_id}"
+        for candidate_id in random.sample(range(1, args.candidates + 1), 200)
+    ]
+
+    results = {
+        "available_cores": len(available),
+        "workers_per_core": args.workers_per_core,
+        "threads": args.threads,
+        "clients": args.clients,
+        "duration_seconds": args.duration,
+        "db_latency_ms": args.db_latency_ms,
+        "cores": {},
+    }
+    for count in core_counts:
+        results["cores"][count] = run_gunicorn(available[:count], paths, args)
+    results["reload_under_load"] = run_gunicorn(
+        available[: core_counts[-1]], paths, args, reload_after=args.duration / 2
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Application startup benchmark.
+
+Measures what a newly spawned worker pays before it can serve: the time to
+import the application package and the time to run its factory, each in a
+fresh interpreter so nothing is already imported or connected. Every run
+also counts the database connections the factory opened, which should be
+zero: schema provisioning is left to `flask db create`.
+
+Both the Flask factory (`app:create_app`) and the ASGI factory
+(`app.asgi:create_asgi_app`) are measured.
+
+Example:
+    $ python -m benchmarks.startup --runs 20
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.common import build_app, configure_environment, summarize
+
+# Run in a fresh interpreter: prints the import time, factory time and
+# number of connections opened by the factory, as JSON.
+PROBE = """
+import importlib, json, sys, time
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+connections = []
+event.listen(Pool, "connect", lambda *args: connections.append(1))
+listening = time.perf_counter()
+getattr(module, sys.argv[2])("production")
+created = time.perf_counter()
+print(json.dumps({
+    "import": imported - started,
+    "factory": created - listening,
+    "connections": len(connections),
+}))
+"""
+
+FACTORIES = {
+    "flask": ("app", "create_app"),
+    "asgi": ("app.asgi", "create_asgi_app"),
+}
+
+
+def measure(module: str, factory: str, runs: int) -> dict:
+    """Start `runs` fresh interpreters and summarize their startup."""
+    imports, factories, totals, connections = [], [], [], 0
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, module, factory],
+            check=True,
+            capture_output=True,
+            text=True,
+            env=os.environ,
+        ).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        imports.append(sample["import"])
+        factories.append(sample["factory"])
+        totals.append(sample["import"] + sample["factory"])
+        connections += sample["connections"]
+    return {
+        "import": summarize(imports),
+        "factory": summarize(factories),
+        "import_and_factory": summarize(totals),
+        "database_connections": connections,
+    }
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    # Provisioned once up front, as a deployment would.
+    build_app()
+
+    results = {"runs": args.runs}
+    for name, (module, factory) in FACTORIES.items():
+        results[name] = measure(module, factory, args.runs)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Candidate statistics benchmark.
+
+Compares the latency of computing the dashboard statistics with GROUP BY
+over the whole Candidate table (as `reconcile_stats` does) against reading
+them from the materialized summary table (as `GET /v1/candidates/stats`
+does), at the given table size.
+
+Example:
+    $ python -m benchmarks.stats --candidates 200000 --requests 50
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+
+def main():
+    """Run the benchmark and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    configure_environment(args.database_url)
+    app = build_app()
+    seed_candidates(app, args.candidates)
+
+    # pylint: disable=import-outside-toplevel
+    from app.handlers.stats import reconcile_stats
+
+    with app.app_context():
+        # Candidates were seeded behind the handlers' back.
+        reconcile_stats(fix=True)
+
+    client = app.test_client()
+    results = {"candidates": args.candidates}
+    with app.app_context():
+        latencies = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            reconcile_stats(fix=False)
+            latencies.append(time.perf_counter() - started)
+        results["group_by"] = summarize(latencies)
+
+    latencies = []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        response = client.get("/v1/candidates/stats?days=30")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    results["materialized_endpoint"] = summarize(latencies)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Candidate API benchmark suite.
+
+Seeds `--candidates` candidates (e.g. 10000, 100000 or 1000000) into a
+local SQLite file, or the database given with `--database-url`, then runs
+one scenario per route of `app/routes/v1.py` and the dashboard view
+in-process, with `--concurrency` threads sending `--requests` requests
+each after `--warmup` unmeasured ones. Request parameters are drawn from a
+generator seeded with `--seed`, so two runs send the same requests.
+
+Each scenario reports its throughput, latency percentiles and errors
+(responses with an unexpected status). Results are printed as JSON and
+written to `--output` if given.
+
+Given a `--baseline` (the output of an earlier run), the suite exits with
+status 1 when a scenario's `--metric` (p95 by default) exceeds the
+baseline's by more than `--threshold` (a fraction), or when a scenario
+has errors, so it can gate changes in CI:
+
+    $ python -m benchmarks.suite --candidates 100000 --output baseline.json
+    $ python -m benchmarks.suite --candidates 100000 --baseline baseline.json
+
+Baselines are only comparable between runs on the same machine, database
+and number of candidates. Use a fresh database for every run: created and
+imported candidates are not removed. `/v1/db/profile` is not covered, as
+it only exists when the SQL profiler is enabled. The diagnostic endpoints
+are called with `ADMIN_TOKEN`, set to a random token unless given.
+
+Example:
+    $ python -m benchmarks.suite --candidates 10000 --requests 200
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.common import build_app, configure_environment, seed_candidates
+from benchmarks.common import summarize
+
+PAGE_SIZE = 20
+IMPORT_ROWS = 50
+
+# A scenario returns the (method, path, keyword arguments of the test
+# client, expected status) of its next request.
+Request = Tuple[str, str, Dict[str, Any], int]
+
+
+def _admin_headers() -> Dict[str, Any]:
+    """Test client arguments authenticating with the admin token."""
+    return {"headers": {"Authorization": f"Bearer {os.environ['ADMIN_TOKEN']}"}}
+
+
+class Scenarios:
+    """Request generators of every scenario, in the order they run.
+
+    Args:
+        candidates: Number of seeded candidates.
+        deep_cursor: Cursor pointing near the end of the collection.
+        seed: Seed of the request parameters.
+    """
+
+    def __init__(self, candidates: int, deep_cursor: str, seed: int):
+        self.candidates = candidates
+        self.deep_cursor = deep_cursor
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.run = f"{seed}-{int(time.time())}"
+        self.sequence = 0
+        self.created: List[int] = []
+
+    def _next(self) -> int:
+        with self.lock:
+            self.sequence += 1
+            return self.sequence
+
+    def _candidate_id(self) -> int:
+        return self.rng.randint(1, self.candidates)
+
+    def create(self) -> Request:
+        """POST /v1/candidates"""
+        number = self._next()
+        payload = {
+            "firstname": f"Bench{number}",
+            "lastname": "Create",
+            "email": f"create-{self.run}-{number}@example.com",
+            "age": 18 + number % 40,
+        }
+        return "POST", "/v1/candidates", {"json": payload}, 201
+
+    def bulk_import(self) -> Request:
+        """POST /v1/candidates/bulk"""
+        number = self._next()
+        body = "\n".join(
+            json.dumps(
+                {
+                    "firstname": f"Bench{number}",
+                    "lastname": "Import",
+                    "email": f"import-{self.run}-{number}-{row}@example.com",
+                    "age": 18 + row % 40,
+                }
+            )
+            for row in range(IMPORT_ROWS)
+        )
+        return (
+            "POST",
+            "/v1/candidates/bulk",
+            {"data": body, "content_type": "application/x-ndjson"},
+            200,
+        )
+
+    def get_by_id(self) -> Request:
+        """GET /v1/candidates/<id>"""
+        return "GET", f"/v1/candidates/{self._candidate_id()}", {}, 200
+
+    def list_first_page(self) -> Request:
+        """GET /v1/candidates"""
+        return "GET", f"/v1/candidates?per_page={PAGE_SIZE}", {}, 200
+
+    def list_filtered(self) -> Request:
+        """GET /v1/candidates?age=..."""
+        age = self.rng.randint(18, 57)
+        return "GET", f"/v1/candidates?age={age}&per_page={PAGE_SIZE}", {}, 200
+
+    def list_deep_page(self) -> Request:
+        """GET /v1/candidates?page=<last pages>"""
+        last_page = max(self.candidates // PAGE_SIZE, 1)
+        page = max(last_page - self.rng.randint(0, 10), 1)
+        return "GET", f"/v1/candidates?page={page}&per_page={PAGE_SIZE}", {}, 200
+
+    def list_deep_cursor(self) -> Request:
+        """GET /v1/candidates?after=<cursor near the end>"""
+        path = f"/v1/candidates?after={self.deep_cursor}&limit={PAGE_SIZE}"
+        return "GET", path, {}, 200
+
+    def export_filtered(self) -> Request:
+        """GET /v1/candidates/export?age=..."""
+        age = self.rng.randint(18, 57)
+        return "GET", f"/v1/candidates/export?age={age}", {}, 200
+
+    def search(self) -> Request:
+        """GET /v1/candidates/search"""
+        number = self._candidate_id()
+        return "GET", f"/v1/candidates/search?q=First{number}&limit=10", {}, 200
+
+    def stats(self) -> Request:
+        """GET /v1/candidates/stats"""
+        return "GET", "/v1/candidates/stats?days=30", {}, 200
+
+    def update(self) -> Request:
+        """PUT /v1/candidates/<id>"""
+        payload = {"age": self.rng.randint(18, 57)}
+        return "PUT", f"/v1/candidates/{self._candidate_id()}", {"json": payload}, 200
+
+    def delete(self) -> Request:
+        """DELETE /v1/candidates/<id>, of candidates made by `create`"""
+        with self.lock:
+            candidate_id = self.created.pop() if self.created else 0
+        return "DELETE", f"/v1/candidates/{candidate_id}", {}, 200
+
+    def cache_stats(self) -> Request:
+        """GET /v1/cache/stats"""
+        return "GET", "/v1/cache/stats", _admin_headers(), 200
+
+    def db_stats(self) -> Request:
+        """GET /v1/db/stats"""
+        return "GET", "/v1/db/stats", _admin_headers(), 200
+
+    def dashboard(self) -> Request:
+        """GET /candidates"""
+        return "GET", f"/candidates?per_page={PAGE_SIZE}", {}, 200
+
+    def all(self) -> Dict[str, Callable[[], Request]]:
+        """Return the scenarios by name, in the order they run."""
+        return {
+            "create": self.create,
+            "bulk_import": self.bulk_import,
+            "get_by_id": self.get_by_id,
+            "list_first_page": self.list_first_page,
+            "list_filtered": self.list_filtered,
+            "list_deep_page": self.list_deep_page,
+            "list_deep_cursor": self.list_deep_cursor,
+            "export_filtered": self.export_filtered,
+            "search": self.search,
+            "stats": self.stats,
+            "update": self.update,
+            "delete": self.delete,
+            "cache_stats": self.cache_stats,
+            "db_stats": self.db_stats,
+            "dashboard": self.dashboard,
+        }
+
+
+def run_scenario(app, name, next_request, scenarios, args) -> Dict[str, Any]:
+    """Send the warmup and measured requests of a scenario."""
+    latencies, errors = [], {}
+    lock = threading.Lock()
+
+    def worker(_):
+        client = app.test_client()
+        for index in range(args.warmup + args.requests):
+            method, path, kwargs, expected = next_request()
+            started = time.perf_counter()
+            response = client.open(path, method=method, **kwargs)
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            if name == "create" and response.status_code == 201:
+                with lock:
+                    scenarios.created.append(response.get_json()["id"])
+            if index < args.warmup:
+                continue
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code != expected:
+                    key = str(response.status_code)
+                    errors[key] = errors.get(key, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(worker, range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency": summarize(latencies),
+        "errors": errors,
+    }
+
+
+def deep_cursor(app) -> str:
+    """Return a cursor pointing `PAGE_SIZE` candidates before the end."""
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import select
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.utils import encode_cursor
+
+    with app.app_context():
+        row = db.session.execute(
+            select(Candidate.created_at, Candidate.id)
+            .order_by(Candidate.created_at.desc(), Candidate.id.desc())
+            .offset(PAGE_SIZE)
+            .limit(1)
+        ).one()
+    return encode_cursor(row.created_at.isoformat(), row.id)
+
+
+def compare(results, baseline, metric: str, threshold: float) -> List[str]:
+    """Return a description of every regression against the baseline."""
+    regressions = []
+    for name, result in results["scenarios"].items():
+        if result["errors"]:
+            regressions.append(f"{name}: unexpected responses {result['errors']}")
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        before, after = previous["latency"][metric], result["latency"][metric]
+        if before and after > before * (1 + threshold):
+            regressions.append(
+                f"{name}: {metric} {after} ms > {before} ms (+{threshold:.0%} allowed)"
+            )
+    return regressions
+
+
+def main():
+    """Run the suite, print and save the results, and gate on the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--scenarios", help="Comma-separated scenarios to run.")
+    parser.add_argument("--output", help="File to write the results to.")
+    parser.add_argument("--baseline", help="Results of an earlier run.")
+    parser.add_argument(
+        "--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms")
+    )
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    database_url = configure_environment(args.database_url)
+    # Keep the search snapshot of other databases out of this run.
+    os.environ.setdefault(
+        "SEARCH_INDEX_PATH",
+        os.path.join(tempfile.mkdtemp(prefix="admitdash-suite-"), "search.bin"),
+    )
+    # The diagnostic endpoints require the admin token in production.
+    os.environ.setdefault("ADMIN_TOKEN", secrets.token_urlsafe())
+    app = build_app()
+
+    # pylint: disable=import-outside-toplevel
+    from sqlalchemy import func, select
+    from app.handlers.stats import reconcile_stats
+    from app.models import db
+    from app.models.candidates import Candidate
+    from app.search import search_index
+
+    with app.app_context():
+        existing = db.session.execute(select(func.count(Candidate.id))).scalar()
+    seed_candidates(app, max(args.candidates - existing, 0))
+    with app.app_context():
+        # Candidates were seeded behind the handlers' back.
+        reconcile_stats(fix=True)
+        # Searches are answered with 503 until the index is loaded.
+        search_index.state.load()
+
+    scenarios = Scenarios(args.candidates, deep_cursor(app), args.seed)
+    selected = scenarios.all()
+    if args.scenarios:
+        names = args.scenarios.split(",")
+        unknown = set(names) - set(selected)
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        selected = {name: selected[name] for name in names}
+
+    results = {
+        "meta": {
+            "candidates": args.candidates,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "database": database_url.split(":", 1)[0],
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+    for name, next_request in selected.items():
+        results["scenarios"][name] = run_scenario(
+            app, name, next_request, scenarios, args
+        )
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.metric, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Gunicorn settings for serving the application in production.
+
+Serves `create_app("production")` with a master process forking `workers`
+processes of `threads` threads each (gunicorn's `gthread` worker): the
+workers serve requests in parallel on every core, and each worker's
+threads overlap the time requests spend waiting on the database.
+
+Gunicorn reads this file from the current directory, so from the
+repository root:
+
+    $ gunicorn                          # or: python run.py --production
+
+Settings are read from the environment:
+
+    GUNICORN_BIND: Address to listen on (default is HOST:PORT).
+    GUNICORN_WORKERS (or WEB_CONCURRENCY): Worker processes (default is
+        the number of cores).
+    GUNICORN_THREADS: Threads per worker (default is 8). Admission control
+        (see `app.admission`) lets at most DATABASE_POOL_SIZE +
+        DATABASE_MAX_OVERFLOW of them use the database at once, queueing
+        the others by priority: threads beyond that sum absorb bursts.
+        Keep workers x that sum below the server's connection limit.
+    GUNICORN_TIMEOUT: Seconds a worker may go silent before it is killed
+        and replaced (default is 30).
+    GUNICORN_GRACEFUL_TIMEOUT: Seconds workers get to finish their
+        in-flight requests on shutdown or reload (default is 30).
+    GUNICORN_KEEPALIVE: Seconds to keep idle client connections open
+        (default is 5; raise it behind a load balancer keeping connections
+        open longer).
+    GUNICORN_MAX_REQUESTS: Requests after which a worker is replaced, to
+        bound memory growth (default is 10000, 0 to never replace).
+    GUNICORN_PRELOAD: Whether to import the application once in the master
+        before forking (default is false, see below).
+    LOG_LEVEL: Level of the application and gunicorn logs (default is INFO).
+
+Signals sent to the master:
+
+    HUP: Graceful reload. New workers are started (loading the current
+        code, unless preloaded), then the old ones stop accepting
+        connections and finish their in-flight requests.
+    TERM: Graceful shutdown, draining in-flight requests for up to
+        GUNICORN_GRACEFUL_TIMEOUT seconds.
+    USR2, then WINCH and QUIT to the old master: Zero-downtime upgrade of
+        the master itself, needed to load new code when preloading.
+
+Worker processes never share database connections: engines inherited from
+the master (when preloading) are discarded after the fork, and each worker
+connects on its first query. When `PROMETHEUS_MULTIPROC_DIR` is set (see
+`app.metrics`), the directory is emptied when the master starts, and the
+live gauges of exited workers are dropped.
+"""
+
+# pylint: disable=invalid-name
+
+import logging
+import os
+import shutil
+
+from app.utils import get_config
+
+logging.basicConfig(level=get_config("LOG_LEVEL", default_value="INFO").upper())
+logger = logging.getLogger("gunicorn.conf")
+
+wsgi_app = "app:create_app('production')"
+
+bind = get_config(
+    "GUNICORN_BIND",
+    default_value=(
+        f"{get_config('HOST', default_value='0.0.0.0')}:"
+        f"{get_config('PORT', default_value='8000')}"
+    ),
+)
+worker_class = "gthread"
+workers = int(
+    get_config(
+        "GUNICORN_WORKERS",
+        default_value=get_config("WEB_CONCURRENCY", default_value=str(os.cpu_count())),
+    )
+)
+threads = int(get_config("GUNICORN_THREADS", default_value="8"))
+backlog = 2048
+timeout = int(get_config("GUNICORN_TIMEOUT", default_value="30"))
+graceful_timeout = int(get_config("GUNICORN_GRACEFUL_TIMEOUT", default_value="30"))
+keepalive = int(get_config("GUNICORN_KEEPALIVE", default_value="5"))
+max_requests = int(get_config("GUNICORN_MAX_REQUESTS", default_value="10000"))
+# Spread worker replacements so they do not all restart at once.
+max_requests_jitter = max_requests // 10
+preload_app = get_config("GUNICORN_PRELOAD", default_value="false").lower() == "true"
+# Worker heartbeats are written to files here: keep them off disk, where a
+# slow fsync can get healthy workers killed.
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+loglevel = get_config("LOG_LEVEL", default_value="INFO").lower()
+errorlog = "-"
+# Requests are already counted and timed by `app.metrics`.
+accesslog = None
+
+
+def on_starting(server):  # pylint: disable=unused-argument
+    """Empty the metrics directory of a previous run."""
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+    if workers > 1 and not preload_app and "SECRET_KEY" not in os.environ:
+        logger.warning(
+            "SECRET_KEY is not set: every worker generates its own, so "
+            "session cookies signed by one are rejected by the others."
+        )
+
+
+def post_worker_init(worker):
+    """Discard the inherited database connections, load the search index."""
+    # pylint: disable=import-outside-toplevel
+    from app.models import db
+    from app.search import search_index
+
+    application = worker.wsgi
+    with application.app_context():
+        for engine in db.engines.values():
+            # Leave the connections open for the master: closing them here
+            # would close the master's sockets too.
+            engine.dispose(close=False)
+    search_index.warm_up(application)
+
+
+def child_exit(server, worker):  # pylint: disable=unused-argument
+    """Drop the live gauges of an exited worker from the metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # pylint: disable=import-outside-toplevel
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
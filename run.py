@@ -1,24 +1,63 @@
 """Start the Flask application.
 
-This script initializes and runs the Flask application using the 
-create_app factory function.
+By default, this script runs the application with Flask's development
+server: a single process, with the debugger and reloader settings of the
+'development' configuration. It is not meant to serve real traffic.
+
+With `--production`, it starts gunicorn with the settings of
+`gunicorn.conf.py` instead: `create_app("production")` served by several
+worker processes of several threads each, with graceful reloads (SIGHUP)
+and shutdowns (SIGTERM). The gunicorn master replaces this process, so
+signals sent to it reach the master directly.
+
+Logging is configured at the level set by the `LOG_LEVEL` environment
+variable (default is INFO).
 
 Example:
-    To start the Flask application:
+    To provision the database, then start the Flask application:
+    $ flask --app "app:create_app()" db create
     $ python run.py
+
+    After upgrading the application, to add the columns and indexes it
+    needs to the tables of an existing database:
+    $ flask --app "app:create_app()" db upgrade
+
+    To serve it in production, with 4 workers of 8 threads:
+    $ GUNICORN_WORKERS=4 GUNICORN_THREADS=8 python run.py --production
 """
 
-from logging import basicConfig, DEBUG
+import argparse
+import os
+import sys
+from logging import basicConfig
 from app import create_app
+from app.utils import get_config
+
+GUNICORN_CONFIG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py"
+)
+
 
-basicConfig(level=DEBUG)
+def main():
+    """Start the development server, or gunicorn with `--production`."""
+    parser = argparse.ArgumentParser(description="Start the AdmitDash application.")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        help="Serve with gunicorn, as configured by gunicorn.conf.py.",
+    )
+    args = parser.parse_args()
 
-app = create_app()
+    if args.production:
+        os.execv(
+            sys.executable,
+            [sys.executable, "-m", "gunicorn", "--config", GUNICORN_CONFIG],
+        )
 
-host = app.config["HOST"]
-port = app.config["PORT"]
+    basicConfig(level=get_config("LOG_LEVEL", default_value="INFO").upper())
+    app = create_app()
+    app.run(host=app.config["HOST"], port=app.config["PORT"])
 
-print(app.config["SECRET_KEY"])
 
 if __name__ == "__main__":
-    app.run(host=host, port=port)
+    main()
@@ -0,0 +1,48 @@
+"""Fixtures shared by the tests.
+
+The application reads its settings from the environment when `app.config`
+is imported, so the environment is filled in here, before any test module
+imports the application, with a SQLite database in a temporary directory.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_DATABASE_DIR = tempfile.mkdtemp(prefix="admitdash-tests-")
+for _name, _value in (
+    ("HOST", "127.0.0.1"),
+    ("PORT", "5000"),
+    ("MYSQL_DATABASE", "admitdash"),
+    ("MYSQL_USER", "admitdash"),
+    ("MYSQL_PASSWORD", "admitdash"),
+    ("MYSQL_HOST", "127.0.0.1"),
+):
+    os.environ.setdefault(_name, _value)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DATABASE_DIR, 'test.db')}"
+
+
+@pytest.fixture
+def app():
+    """An application with empty tables."""
+    # pylint: disable=import-outside-toplevel
+    from app import create_app
+    from app.models import db
+    from app.models.schema import seed_collection_versions
+
+    application = create_app("development")
+    with application.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_collection_versions()
+    yield application
+    with application.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):  # pylint: disable=redefined-outer-name
+    """A test client of `app`."""
+    return app.test_client()
@@ -0,0 +1,30 @@
+"""Tests of the candidate routes."""
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"lastname": "Lovelace", "email": "ada@example.com"},
+        {"firstname": "Ada", "lastname": "Lovelace"},
+        {"firstname": "Ada", "email": "ada@example.com", "age": "old"},
+        {"firstname": 1815, "email": "ada@example.com"},
+        {"firstname": "Ada", "email": "ada@example.com", "id": 7},
+        ["Ada", "ada@example.com"],
+    ],
+)
+def test_create_rejects_invalid_candidates(client, body):
+    response = client.post("/v1/candidates", json=body)
+    assert response.status_code == 400
+    assert response.json["message"]
+
+
+def test_create_normalizes_fields(client):
+    response = client.post(
+        "/v1/candidates", json={"firstname": " Ada ", "email": "ada@example.com"}
+    )
+    assert response.status_code == 201
+    assert response.json["firstname"] == "Ada"
+    assert response.json["lastname"] is None
+    assert response.json["age"] is None
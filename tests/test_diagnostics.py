@@ -0,0 +1,33 @@
+"""Tests of the access to the diagnostic endpoints."""
+
+import pytest
+
+DIAGNOSTICS = ("/v1/cache/stats", "/v1/admission/stats", "/v1/db/stats")
+
+
+@pytest.mark.parametrize("path", DIAGNOSTICS)
+def test_served_in_development_without_a_token(client, path):
+    assert client.get(path).status_code == 200
+
+
+@pytest.mark.parametrize("path", DIAGNOSTICS + ("/v1/db/profile",))
+def test_refused_outside_development_without_a_token(app, client, path):
+    app.debug = False
+    response = client.get(path)
+    assert response.status_code == 403
+    assert "ADMIN_TOKEN" in response.json["error"]
+
+
+@pytest.mark.parametrize("path", DIAGNOSTICS)
+def test_token_required_when_configured(app, client, path):
+    app.config["ADMIN_TOKEN"] = "s3cret"
+    assert client.get(path).status_code == 401
+    wrong = {"Authorization": "Bearer guess"}
+    assert client.get(path, headers=wrong).status_code == 401
+    right = {"Authorization": "Bearer s3cret"}
+    assert client.get(path, headers=right).status_code == 200
+
+
+def test_profile_keeps_its_token_check_before_the_profiler_check(app, client):
+    app.config["ADMIN_TOKEN"] = "s3cret"
+    assert client.get("/v1/db/profile").status_code == 401
@@ -0,0 +1,55 @@
+"""Tests of bulk candidate imports."""
+
+import json
+
+from sqlalchemy import text
+
+from app.models import db
+
+
+def _import(client, rows):
+    return client.post(
+        "/v1/candidates/bulk",
+        data="\n".join(json.dumps(row) for row in rows),
+        content_type="application/x-ndjson",
+    )
+
+
+def test_rejects_rows_breaking_other_constraints_as_such(app, client):
+    with app.app_context():
+        # A constraint the request validation does not know of.
+        db.session.execute(
+            text(
+                "CREATE TRIGGER reject_age_149 BEFORE INSERT ON candidate "
+                "WHEN NEW.age = 149 BEGIN "
+                "SELECT RAISE(ABORT, 'CHECK constraint failed: age'); END"
+            )
+        )
+        db.session.commit()
+
+    response = _import(
+        client,
+        [
+            {"firstname": "Ada", "email": "ada@example.com", "age": 36},
+            {"firstname": "Old", "email": "old@example.com", "age": 149},
+        ],
+    )
+    assert response.status_code == 200
+    assert response.json["inserted"] == 1
+    assert response.json["errors"] == [
+        {"line": 2, "error": "Candidate violates a database constraint."}
+    ]
+
+
+def test_rejects_duplicate_emails_as_duplicates(client):
+    assert (
+        _import(client, [{"firstname": "Ada", "email": "ada@example.com"}]).json[
+            "inserted"
+        ]
+        == 1
+    )
+    response = _import(client, [{"firstname": "Ada", "email": "ada@example.com"}])
+    assert response.json["inserted"] == 0
+    assert response.json["errors"] == [
+        {"line": 1, "error": "Candidate with this email already exists."}
+    ]
@@ -0,0 +1,48 @@
+"""Tests of the tombstones left by deleted candidates."""
+
+from sqlalchemy import select
+
+from app.models import db
+from app.models.tombstones import CandidateTombstone
+
+
+def _create(client, email):
+    response = client.post(
+        "/v1/candidates",
+        json={"firstname": "Ada", "lastname": "Lovelace", "email": email, "age": 36},
+    )
+    assert response.status_code == 201, response.json
+    return response.json["id"]
+
+
+def _tombstones(app):
+    with app.app_context():
+        return dict(
+            db.session.execute(
+                select(CandidateTombstone.candidate_id, CandidateTombstone.change_seq)
+            ).all()
+        )
+
+
+def test_deleting_a_reused_id_replaces_its_tombstone(app, client):
+    _create(client, "first@example.com")
+    candidate_id = _create(client, "second@example.com")
+    assert client.delete(f"/v1/candidates/{candidate_id}").status_code == 200
+    first_seq = _tombstones(app)[candidate_id]
+
+    # SQLite reuses the highest ID once it is deleted.
+    assert _create(client, "third@example.com") == candidate_id
+    assert client.delete(f"/v1/candidates/{candidate_id}").status_code == 200
+    assert _tombstones(app)[candidate_id] > first_seq
+
+
+def test_batch_delete_of_a_reused_id_replaces_its_tombstone(app, client):
+    _create(client, "first@example.com")
+    candidate_id = _create(client, "second@example.com")
+    assert client.delete(f"/v1/candidates/{candidate_id}").status_code == 200
+    first_seq = _tombstones(app)[candidate_id]
+
+    assert _create(client, "third@example.com") == candidate_id
+    response = client.delete("/v1/candidates", json={"ids": [candidate_id]})
+    assert response.status_code == 200, response.json
+    assert _tombstones(app)[candidate_id] > first_seq